@@ -0,0 +1,7 @@
+"""
+Performance benchmarks for PostPros Job Checker.
+
+synthetic generates realistic Accuzip/client mail files; run times the
+processing stages on them and writes JSON results comparable across
+commits (python -m benchmarks.run --help).
+"""
@@ -0,0 +1,237 @@
+"""
+Benchmark runner.
+Generates synthetic jobs and times file processing, dataset comparison,
+IMB validation, seed search and postal rate statistics, and optionally
+measures each stage's peak memory. Results are written as JSON together
+with the commit and library versions, so runs can be compared across
+commits.
+
+Usage:
+    python -m benchmarks.run --rows 10000 100000 --output bench.json
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import JobSpec, write_job
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('process_files', 'compare', 'imb_validation', 'seed_search', 'rate_statistics')
+
+
+def _git_commit() -> Optional[str]:
+    """Return the current commit hash, if available."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment() -> Dict[str, Any]:
+    """Describe the code and environment the benchmark ran on."""
+    return {
+        'commit': _git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+    }
+
+
+def _time(func: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """
+    Time a function over several runs.
+
+    Returns:
+        Dictionary with per-run seconds, min, median and the last result
+    """
+    runs = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        runs.append(time.perf_counter() - started)
+    return {'runs': runs, 'min': min(runs), 'median': statistics.median(runs), 'result': result}
+
+
+def _peak_memory(func: Callable[[], Any]) -> float:
+    """
+    Run a function once and return its peak traced allocation in MB.
+
+    tracemalloc sees Python and NumPy allocations (not Arrow buffers) and
+    slows the run down, so this is done separately from the timed runs.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def _open_all(paths: Sequence[str]) -> List:
+    return [open(path, 'rb') for path in paths]
+
+
+def run_benchmark(spec: JobSpec, repeat: int = 3, workdir: Optional[str] = None,
+                  memory: bool = False, out_of_core: bool = False) -> Dict[str, Any]:
+    """
+    Generate one job and time every stage on it.
+
+    The upload cache is cleared before each file processing run, the
+    normalized key cache before each compare run, and the persistent IMB
+    decode cache is not used, so every run does full work.
+
+    Args:
+        spec: Synthetic job parameters
+        repeat: Runs per stage
+        workdir: Directory for the generated files (temporary if None)
+        memory: Also measure each stage's peak memory in one extra run
+        out_of_core: Compare with match keys partitioned to disk
+
+    Returns:
+        Dictionary with the job parameters, stage timings (with 'peak_mb'
+        when memory is measured) and result counts
+    """
+    from config import DEFAULT_COLUMN_MAPPINGS, SEED_SEARCH_DEFAULTS
+    from utils.upload_cache import get_upload_cache
+    from utils.match_keys import get_normalized_cache
+    from utils.file_processor import process_uploaded_files
+    from utils.data_validator import compare_datasets
+    from utils.imb_validator import validate_imb_column
+    from utils.analysis import search_seed_records, postal_rate_statistics
+
+    with tempfile.TemporaryDirectory(dir=workdir) as directory:
+        started = time.perf_counter()
+        paths = write_job(spec, directory)
+        generate_seconds = time.perf_counter() - started
+
+        def process_files():
+            get_upload_cache().clear()
+            frames = []
+            for dataset in ('accuzip', 'client'):
+                files = _open_all(paths[dataset])
+                try:
+                    frames.append(process_uploaded_files(files)[0])
+                finally:
+                    for f in files:
+                        f.close()
+            return frames
+
+        timings = {'process_files': _time(process_files, repeat)}
+        df1, df2 = timings['process_files']['result']
+        if memory:
+            timings['process_files']['peak_mb'] = _peak_memory(process_files)
+
+    mapping = {src: dst for src, dst in DEFAULT_COLUMN_MAPPINGS.items()
+               if src in df1.columns and dst in df2.columns}
+    seeds = [(col, term) for col, term in SEED_SEARCH_DEFAULTS if col and term]
+
+    def compare():
+        get_normalized_cache().clear()
+        return compare_datasets(df1, df2, mapping, out_of_core=out_of_core)
+
+    stages = {
+        'compare': compare,
+        'imb_validation': lambda: validate_imb_column(df1, 'imbarcode', 'ZIP', use_cache=False),
+        'seed_search': lambda: search_seed_records(df1, seeds),
+        'rate_statistics': lambda: postal_rate_statistics(df1, 'rate_std'),
+    }
+    for stage, func in stages.items():
+        timings[stage] = _time(func, repeat)
+        if memory:
+            timings[stage]['peak_mb'] = _peak_memory(func)
+
+    comparison = timings['compare']['result']
+    imb_results = timings['imb_validation']['result']
+    return {
+        'spec': spec.as_dict(),
+        'out_of_core': out_of_core,
+        'generate_seconds': generate_seconds,
+        'rows': {'accuzip': len(df1), 'client': len(df2)},
+        'timings': {
+            stage: {key: timings[stage][key] for key in ('min', 'median', 'runs', 'peak_mb')
+                    if key in timings[stage]}
+            for stage in STAGES
+        },
+        'counts': {
+            'missing_records': comparison['missing_records'],
+            'valid_imbs': int(imb_results['valid_imbs']),
+            'matching_zips': int(imb_results['matching_zips']),
+        },
+    }
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    defaults = JobSpec()
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000],
+                        help='Accuzip record counts to benchmark (default: 10000 100000)')
+    parser.add_argument('--width', type=int, default=defaults.width, help='Columns per file')
+    parser.add_argument('--duplicate-rate', type=float, default=defaults.duplicate_rate)
+    parser.add_argument('--mismatch-rate', type=float, default=defaults.mismatch_rate)
+    parser.add_argument('--valid-imb-rate', type=float, default=defaults.valid_imb_rate)
+    parser.add_argument('--damaged-imb-rate', type=float, default=defaults.damaged_imb_rate)
+    parser.add_argument('--files', type=int, default=defaults.files,
+                        help='Accuzip files (or ZIP members) per job')
+    parser.add_argument('--format', dest='file_format', choices=('csv', 'zip'),
+                        default=defaults.file_format)
+    parser.add_argument('--mixed-dtypes', action='store_true',
+                        help='Client control numbers as floats and ZIPs as ZIP+4 text')
+    parser.add_argument('--seed', type=int, default=defaults.seed, help='Random seed')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per stage')
+    parser.add_argument('--memory', action='store_true',
+                        help='Also measure peak memory per stage (one extra, slower run each)')
+    parser.add_argument('--out-of-core', action='store_true',
+                        help='Run the compare stage out of core (match keys partitioned to disk)')
+    parser.add_argument('--workdir', help='Directory for generated files (default: system temp)')
+    parser.add_argument('-o', '--output', help='JSON results file (default: standard output)')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the benchmarks and write JSON results."""
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    results = []
+    for rows in args.rows:
+        spec = JobSpec(
+            rows=rows, width=args.width, duplicate_rate=args.duplicate_rate,
+            mismatch_rate=args.mismatch_rate, valid_imb_rate=args.valid_imb_rate,
+            damaged_imb_rate=args.damaged_imb_rate, files=args.files,
+            file_format=args.file_format, mixed_dtypes=args.mixed_dtypes, seed=args.seed
+        )
+        result = run_benchmark(spec, args.repeat, args.workdir, args.memory, args.out_of_core)
+        results.append(result)
+        summary = ', '.join(f"{stage} {t['min']:.3f}s" for stage, t in result['timings'].items())
+        print(f"{rows} rows: {summary}", file=sys.stderr)
+
+    text = json.dumps({'environment': _environment(), 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+Synthetic mail-file generator for benchmarks.
+Builds an Accuzip job and the matching client file with configurable size,
+width, duplicate rate, client mismatch rate and IMB quality, and writes
+them as CSV files or ZIP archives.
+"""
+import io
+import os
+import zipfile
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.usps_imb_decoder import encode_barcodes_batch
+
+FIRST_NAMES = np.array([
+    'James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda',
+    'David', 'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica',
+    'Thomas', 'Sarah', 'Maria', 'Daniel', 'Current', 'Karen', 'Nancy', 'Mark',
+])
+LAST_NAMES = np.array([
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+    'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Wilson', 'Anderson', 'Thomas',
+    'Taylor', 'Moore', 'Jackson', 'Martin', 'Lee', 'Thompson', 'White', 'Harris',
+])
+STREETS = np.array([
+    'Main St', 'Oak Ave', 'Pine Rd', 'Maple Dr', 'Cedar Ln', 'Elm St', 'Lake Blvd',
+    'Hill Rd', 'Park Ave', 'Washington St', 'Forest Dr', 'River Rd', 'Sunset Blvd',
+])
+CITIES = [
+    ('Spring', 'TX', 77380), ('Houston', 'TX', 77002), ('Austin', 'TX', 78701),
+    ('Denver', 'CO', 80202), ('Phoenix', 'AZ', 85004), ('Atlanta', 'GA', 30303),
+    ('Columbus', 'OH', 43215), ('Portland', 'OR', 97204), ('Tampa', 'FL', 33602),
+]
+
+MAILER_ID = '903693059'
+
+SEED_RECORDS = [('Post', 'Job'), ('Post', 'Office')]
+
+
+@dataclass
+class JobSpec:
+    """Parameters of a synthetic job."""
+    rows: int = 10_000               # Unique Accuzip records (before duplicates)
+    width: int = 30                  # Columns in each file (at least the core columns)
+    duplicate_rate: float = 0.01     # Extra exact copies of Accuzip rows, as a fraction of rows
+    mismatch_rate: float = 0.02      # Accuzip records missing or altered in the client file
+    valid_imb_rate: float = 0.95     # IMB codes that decode directly
+    damaged_imb_rate: float = 0.03   # IMB codes with one damaged bar (the rest are malformed)
+    files: int = 2                   # Accuzip files (or ZIP members) the rows are split over
+    file_format: str = 'zip'         # 'csv' or 'zip'
+    mixed_dtypes: bool = False       # Client control numbers as floats, ZIPs as ZIP+4 text
+    seed: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _imb_codes(zip5: np.ndarray, spec: JobSpec, rng: np.random.Generator) -> np.ndarray:
+    """Build the IMB column: valid, one-bar damaged, and malformed codes."""
+    n = len(zip5)
+    serial = pd.Series(np.arange(n) % 1000000).astype(str).str.zfill(6)
+    tracking = ('00271' + MAILER_ID + serial).to_numpy(dtype=object)
+    routing = (
+        pd.Series(zip5).astype(str).str.zfill(5)
+        + pd.Series(rng.integers(0, 10000, n)).astype(str).str.zfill(4)
+        + pd.Series(rng.integers(0, 100, n)).astype(str).str.zfill(2)
+    ).to_numpy(dtype=object)
+    bars = np.ascontiguousarray(
+        encode_barcodes_batch(tracking, routing).astype('S65')
+    ).view(np.uint8).reshape(n, 65).copy()
+
+    kind = rng.random(n)
+    damaged = np.flatnonzero(
+        (kind >= spec.valid_imb_rate) & (kind < spec.valid_imb_rate + spec.damaged_imb_rate)
+    )
+    malformed = kind >= spec.valid_imb_rate + spec.damaged_imb_rate
+
+    # Replace one bar of each damaged code with a different bar state
+    letters = np.frombuffer(b'ADFT', dtype=np.uint8)
+    position = rng.integers(0, 65, len(damaged))
+    current = np.searchsorted(letters, bars[damaged, position])
+    bars[damaged, position] = letters[(current + rng.integers(1, 4, len(damaged))) % 4]
+
+    codes = bars.view('S65').ravel().astype('U65').astype(object)
+    codes[malformed] = 'FT' * 20
+    return codes
+
+
+def generate_job(spec: JobSpec) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Generate an Accuzip DataFrame and the matching client DataFrame.
+
+    Client columns are named after DEFAULT_COLUMN_MAPPINGS. Mismatched
+    records are dropped from the client file (half) or have an altered
+    address (half); duplicate Accuzip rows are exact copies shuffled into
+    the job. With mixed_dtypes, the client key columns have other dtypes
+    than the Accuzip ones but the same values.
+
+    Args:
+        spec: Job parameters
+
+    Returns:
+        Tuple of (Accuzip DataFrame, client DataFrame)
+    """
+    from config import DEFAULT_COLUMN_MAPPINGS
+
+    rng = np.random.default_rng(spec.seed)
+    n = spec.rows
+
+    city_idx = rng.integers(0, len(CITIES), n)
+    cities = np.array([c[0] for c in CITIES])[city_idx]
+    states = np.array([c[1] for c in CITIES])[city_idx]
+    zip5 = np.array([c[2] for c in CITIES])[city_idx] + rng.integers(0, 20, n)
+
+    first = FIRST_NAMES[rng.integers(0, len(FIRST_NAMES), n)]
+    last = LAST_NAMES[rng.integers(0, len(LAST_NAMES), n)]
+    for i, (seed_first, seed_last) in enumerate(SEED_RECORDS[:n]):
+        first[i], last[i] = seed_first, seed_last
+
+    house = pd.Series(rng.integers(1, 20000, n)).astype(str)
+    address = (house + ' ' + STREETS[rng.integers(0, len(STREETS), n)]).to_numpy()
+
+    accuzip = pd.DataFrame({
+        'controlno': np.arange(100001, 100001 + n),
+        'yearly_pre': np.round(rng.uniform(200, 3000, n), 2),
+        'first': first,
+        'last': last,
+        'NAME': pd.Series(first) + ' ' + pd.Series(last),
+        'ADDRESS': address,
+        'CITY': cities,
+        'STATE': states,
+        'ZIP': zip5,
+        'dwelling_l': rng.integers(1, 50, n),
+        'imbarcode': _imb_codes(zip5, spec, rng),
+        'rate_std': np.round(rng.uniform(0.2, 0.6, n), 3),
+    })
+
+    # Client file: same records under client column names, some mismatched
+    client = accuzip[list(DEFAULT_COLUMN_MAPPINGS)].rename(columns=DEFAULT_COLUMN_MAPPINGS)
+    mismatched = rng.random(n) < spec.mismatch_rate
+    altered = mismatched & (rng.random(n) < 0.5)
+    client.loc[altered, 'address'] = client.loc[altered, 'address'] + ' Apt 2'
+    client = client[~(mismatched & ~altered)]
+    if spec.mixed_dtypes:
+        # As when a blank cell makes the column float64, and ZIPs are exported as text
+        client['CONTROLNO'] = client['CONTROLNO'].astype('float64')
+        plus4 = (client['CONTROLNO'] % 10000).astype('int64').astype(str).str.zfill(4)
+        client['zip'] = client['zip'].astype(str).str.zfill(5) + '-' + plus4
+
+    accuzip = _add_filler_columns(accuzip, spec.width, rng)
+    client = _add_filler_columns(client.reset_index(drop=True), spec.width, rng)
+
+    # Exact duplicates, shuffled so they can fall in other files
+    n_duplicates = int(n * spec.duplicate_rate)
+    if n_duplicates:
+        copies = accuzip.iloc[rng.integers(0, n, n_duplicates)]
+        accuzip = pd.concat([accuzip, copies], ignore_index=True)
+    accuzip = accuzip.iloc[rng.permutation(len(accuzip))].reset_index(drop=True)
+    client = client.iloc[rng.permutation(len(client))].reset_index(drop=True)
+
+    return accuzip, client
+
+
+def _add_filler_columns(df: pd.DataFrame, width: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Pad a DataFrame with unused text and numeric columns up to width columns."""
+    filler = {}
+    for i in range(max(0, width - df.shape[1])):
+        values = rng.integers(0, 100000, len(df))
+        filler[f"field_{i:02d}"] = values if i % 2 else pd.Series(values).astype(str).radd('X').to_numpy()
+    return pd.concat([df, pd.DataFrame(filler, index=df.index)], axis=1) if filler else df
+
+
+def _write_parts(frames: List[pd.DataFrame], directory: str, stem: str, file_format: str) -> List[str]:
+    """Write frames as CSV files, or as members of one ZIP archive."""
+    if file_format == 'csv':
+        paths = []
+        for i, frame in enumerate(frames):
+            path = os.path.join(directory, f"{stem}_{i + 1}.csv")
+            frame.to_csv(path, index=False)
+            paths.append(path)
+        return paths
+
+    path = os.path.join(directory, f"{stem}.zip")
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        for i, frame in enumerate(frames):
+            buffer = io.StringIO()
+            frame.to_csv(buffer, index=False)
+            z.writestr(f"{stem}_{i + 1}.csv", buffer.getvalue())
+    return [path]
+
+
+def write_job(spec: JobSpec, directory: str) -> Dict[str, List[str]]:
+    """
+    Generate a job and write its Accuzip and client files.
+
+    Args:
+        spec: Job parameters
+        directory: Output directory (created if needed)
+
+    Returns:
+        Dictionary with 'accuzip' and 'client' file paths
+    """
+    if spec.file_format not in ('csv', 'zip'):
+        raise ValueError(f"Unsupported file format: {spec.file_format}")
+    os.makedirs(directory, exist_ok=True)
+
+    accuzip, client = generate_job(spec)
+    parts = np.array_split(np.arange(len(accuzip)), max(1, spec.files))
+    return {
+        'accuzip': _write_parts([accuzip.iloc[p] for p in parts], directory, 'accuzip', spec.file_format),
+        'client': _write_parts([client], directory, 'client', spec.file_format),
+    }
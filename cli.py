@@ -0,0 +1,331 @@
+"""
+Headless batch mode for PostPros Job Checker.
+Runs the dataset comparison, seed search, postal rate statistics and IMB
+validation on Accuzip and client files without Streamlit, and writes a
+machine-readable JSON report.
+
+Usage:
+    postpros-check --accuzip job.zip --client client1.csv client2.csv \\
+        --mapping mapping.json --output report.json
+"""
+import argparse
+import json
+import logging
+import sys
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DATASETS = ('accuzip', 'client')
+
+
+class JobError(Exception):
+    """Raised when a job cannot be run with the given arguments."""
+    pass
+
+
+def load_mapping(path: Optional[str], df1: pd.DataFrame, df2: pd.DataFrame) -> Dict[str, str]:
+    """
+    Load the column mapping (Accuzip column -> Client column).
+
+    Without a mapping file, the default mappings whose columns exist in
+    both datasets are used, as in the app.
+
+    Args:
+        path: Path of a JSON object mapping Accuzip to Client columns, or None
+        df1: Accuzip DataFrame
+        df2: Client DataFrame
+
+    Returns:
+        Column mapping
+
+    Raises:
+        JobError: If the file is invalid or names missing columns
+    """
+    from config import DEFAULT_COLUMN_MAPPINGS
+
+    if path is None:
+        return {
+            src: dst for src, dst in DEFAULT_COLUMN_MAPPINGS.items()
+            if src in df1.columns and dst in df2.columns
+        }
+
+    try:
+        with open(path, encoding='utf-8') as f:
+            mapping = json.load(f)
+    except (OSError, ValueError) as e:
+        raise JobError(f"Cannot read column mapping '{path}': {e}")
+
+    if not isinstance(mapping, dict) or not all(
+        isinstance(k, str) and isinstance(v, str) for k, v in mapping.items()
+    ):
+        raise JobError(f"Column mapping '{path}' must be a JSON object of column names")
+
+    missing = [src for src in mapping if src not in df1.columns]
+    missing += [dst for dst in mapping.values() if dst not in df2.columns]
+    if missing:
+        raise JobError(f"Mapped columns not found: {', '.join(missing)}")
+
+    return mapping
+
+
+def read_mapping_columns(path: Optional[str]) -> Tuple[List[str], List[str]]:
+    """Return the (Accuzip, Client) columns named in a mapping file, if readable."""
+    if path is None:
+        return [], []
+    try:
+        with open(path, encoding='utf-8') as f:
+            mapping = json.load(f)
+        return list(mapping.keys()), list(mapping.values())
+    except (OSError, ValueError, AttributeError):
+        # Reported by load_mapping once the data is loaded
+        return [], []
+
+
+def load_files(paths: Sequence[str], extra_columns: Sequence[str] = ()) -> Tuple[pd.DataFrame, int]:
+    """
+    Load and merge CSV/ZIP files from disk.
+
+    With column projection enabled, only the columns the checks use plus
+    extra_columns are parsed.
+
+    Args:
+        paths: CSV or ZIP file paths
+        extra_columns: Columns to load in addition to the required ones
+                       (None entries are ignored)
+
+    Returns:
+        Tuple of (merged DataFrame, count of processed files)
+    """
+    from config import COLUMN_PROJECTION_ENABLED
+    from utils.file_processor import process_uploaded_files, sniff_headers
+    from utils.data_validator import get_required_columns
+
+    with ExitStack() as stack:
+        try:
+            files = [stack.enter_context(open(path, 'rb')) for path in paths]
+        except OSError as e:
+            raise JobError(f"Cannot open input file: {e}")
+
+        usecols = None
+        if COLUMN_PROJECTION_ENABLED:
+            headers = sniff_headers(files)
+            wanted = set(get_required_columns(headers)) | {col for col in extra_columns if col}
+            usecols = [col for col in headers if col in wanted] or None
+
+        return process_uploaded_files(files, usecols=usecols)
+
+
+def _default_imb_columns(df: pd.DataFrame) -> Tuple[Optional[str], Optional[str]]:
+    """Pick the IMB and ZIP columns the app would select by default."""
+    from utils.data_validator import get_default_columns
+
+    imb_cols = get_default_columns(df, 'imb')
+    imb_col = 'imbarcode' if 'imbarcode' in df.columns else next(iter(imb_cols), None)
+    zip_col = next(iter(get_default_columns(df, 'zip')), None)
+    return imb_col, zip_col
+
+
+def _frame_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Convert a DataFrame to JSON-safe records (missing values become null)."""
+    return json.loads(df.to_json(orient='records'))
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize numpy scalars in the report."""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _json_safe(value: Any) -> Any:
+    """Replace non-finite floats (NaN, inf) in the report with None, which JSON writes as null."""
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    if isinstance(value, (float, np.floating)) and not np.isfinite(value):
+        return None
+    return value
+
+
+def run_job(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run all checks for one job.
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        Report dictionary
+
+    Raises:
+        JobError: If inputs cannot be loaded or columns are missing
+        FileProcessingError: If no valid data could be read
+    """
+    from config import SEED_SEARCH_DEFAULTS
+    from utils.analysis import search_seed_records, find_rate_column, postal_rate_statistics
+    from utils.data_validator import compare_datasets
+    from utils.imb_validator import validate_imb_column
+
+    accuzip_mapped, client_mapped = read_mapping_columns(args.mapping)
+    seeds = args.seed or [(col, term) for col, term in SEED_SEARCH_DEFAULTS if col and term]
+
+    accuzip_extra = accuzip_mapped + [col for col, _ in seeds] + [args.rate_column]
+    client_extra = list(client_mapped)
+    imb_columns = [args.imb_column, args.zip_column]
+    if args.imb_dataset == 'accuzip':
+        accuzip_extra = accuzip_extra + imb_columns
+    else:
+        client_extra = client_extra + imb_columns
+
+    df1, processed1 = load_files(args.accuzip, accuzip_extra)
+    df2, processed2 = load_files(args.client, client_extra)
+
+    report: Dict[str, Any] = {
+        'accuzip': {'files': list(args.accuzip), 'processed_files': processed1, 'rows': len(df1)},
+        'client': {'files': list(args.client), 'processed_files': processed2, 'rows': len(df2)},
+    }
+
+    # Dataset comparison
+    mapping = load_mapping(args.mapping, df1, df2)
+    if mapping:
+        comparison = compare_datasets(df1, df2, mapping, fuzzy=args.fuzzy, out_of_core=args.out_of_core)
+        total = comparison['total_records']
+        report['comparison'] = {
+            'column_mapping': mapping,
+            'total_records': total,
+            'matching_records': comparison['matching_records'],
+            'missing_records': comparison['missing_records'],
+            'match_percent': comparison['matching_records'] / total * 100 if total else 0.0,
+            'mismatches': _frame_records(comparison['mismatches']),
+            'fuzzy_matched_records': comparison['fuzzy_matched_records'],
+            'near_miss_records': comparison['near_miss_records'],
+            'mismatch_columns': comparison['mismatch_columns'],
+            'two_column_near_miss_records': comparison['two_column_near_miss_records'],
+            'mismatch_column_pairs': comparison['mismatch_column_pairs'],
+            'client_records': comparison['client_records'],
+            'client_only_records': comparison['client_only_records'],
+            'client_only': _frame_records(comparison['client_only']),
+            'count_mismatch_keys': comparison['count_mismatch_keys'],
+            'count_mismatches': _frame_records(comparison['count_mismatches']),
+            'unmatched_accuzip_records': comparison['unmatched_accuzip_records'],
+            'unmatched_client_records': comparison['unmatched_client_records'],
+        }
+    else:
+        logger.warning("No mapped columns; skipping dataset comparison")
+        report['comparison'] = None
+
+    # Seed search and postal rates (Accuzip)
+    report['seed_search'] = search_seed_records(df1, seeds)
+
+    rate_col = args.rate_column or find_rate_column(df1.columns)
+    if rate_col and rate_col in df1.columns:
+        report['postal_rate'] = {'column': rate_col, **postal_rate_statistics(df1, rate_col)}
+    else:
+        report['postal_rate'] = None
+
+    # IMB validation
+    report['imb_validation'] = None
+    if not args.no_imb:
+        imb_df = df1 if args.imb_dataset == 'accuzip' else df2
+        default_imb, default_zip = _default_imb_columns(imb_df)
+        imb_col = args.imb_column or default_imb
+        zip_col = args.zip_column or default_zip
+        if imb_col:
+            results = validate_imb_column(imb_df, imb_col, zip_col, repair_budget=args.imb_repair)
+            if not results['success']:
+                raise JobError(results['error'])
+            report['imb_validation'] = {
+                'dataset': args.imb_dataset,
+                'imb_column': imb_col,
+                'zip_column': zip_col,
+                **{k: v for k, v in results.items() if k not in ('success', 'results_df')},
+            }
+        else:
+            logger.warning("No IMB column found; skipping IMB validation")
+
+    return report
+
+
+def _seed_arg(value: str) -> Tuple[str, str]:
+    """Parse a COLUMN=TERM seed search argument."""
+    column, sep, term = value.partition('=')
+    if not sep or not column or not term:
+        raise argparse.ArgumentTypeError(f"expected COLUMN=TERM, got '{value}'")
+    return column, term
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        prog='postpros-check',
+        description='Check a mailing job (Accuzip vs client files) and write a JSON report.'
+    )
+    parser.add_argument('--accuzip', nargs='+', required=True, metavar='PATH',
+                        help='Accuzip CSV or ZIP files')
+    parser.add_argument('--client', nargs='+', required=True, metavar='PATH',
+                        help='Client CSV or ZIP files')
+    parser.add_argument('--mapping', metavar='JSON',
+                        help='JSON object mapping Accuzip columns to Client columns '
+                             '(default: built-in mappings present in both datasets)')
+    parser.add_argument('--fuzzy', action='store_true', default=None,
+                        help='Fuzzy match name and address columns (default: FUZZY_MATCH_ENABLED)')
+    parser.add_argument('--out-of-core', action='store_true', default=None,
+                        help='Compare with match keys partitioned to disk (default: COMPARE_OUT_OF_CORE)')
+    parser.add_argument('--seed', action='append', type=_seed_arg, metavar='COLUMN=TERM',
+                        help='Seed search on the Accuzip data (repeatable; default: built-in searches)')
+    parser.add_argument('--rate-column', help='Accuzip postal rate column (default: detected)')
+    parser.add_argument('--imb-dataset', choices=DATASETS, default='accuzip',
+                        help='Dataset to validate IMB codes in (default: accuzip)')
+    parser.add_argument('--imb-column', help='IMB code column (default: detected)')
+    parser.add_argument('--zip-column', help='ZIP code column for IMB matching (default: detected)')
+    parser.add_argument('--imb-repair', choices=('off', 'single-bit', 'full'),
+                        help='Repair attempted for damaged IMB codes (default: IMB_REPAIR_BUDGET)')
+    parser.add_argument('--no-imb', action='store_true', help='Skip IMB validation')
+    parser.add_argument('-o', '--output', metavar='PATH',
+                        help='Report file (default: standard output)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log progress to stderr')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Command-line entry point.
+
+    Returns:
+        Exit status (0 on success, 1 if the job could not be run)
+    """
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    from utils.file_processor import FileProcessingError
+
+    try:
+        report = run_job(args)
+    except (JobError, FileProcessingError) as e:
+        logger.error(str(e).strip())
+        return 1
+
+    text = json.dumps(_json_safe(report), indent=2, default=_json_default, allow_nan=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
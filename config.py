@@ -2,6 +2,7 @@
 Configuration constants for PostPros Job Checker.
 Centralizes all magic numbers, thresholds, and settings.
 """
+import os
 
 # Match percentage thresholds
 MATCH_THRESHOLD_HIGH = 90  # Green - excellent match
@@ -10,6 +11,26 @@ MATCH_THRESHOLD_LOW = 70   # Red - poor match (between is orange/warning)
 # Postal rate thresholds
 POSTAL_RATE_THRESHOLD = 0.40  # Above this is considered high
 
+# Report which mapped column alone (or pair of columns) keeps each missing
+# record from matching
+MISMATCH_ATTRIBUTION_ENABLED = True
+MISMATCH_ATTRIBUTION_MAX_PAIRS = 45  # Column pairs tried for records differing in two columns
+
+# Fuzzy matching of name and address columns (records without an exact match)
+FUZZY_MATCH_ENABLED = False  # Opt-in; also selectable in the app and with --fuzzy
+FUZZY_MATCH_KEYWORDS = ['name', 'address', 'addr', 'street']  # Mapped columns compared by similarity
+FUZZY_MATCH_THRESHOLD = 0.75  # Minimum token-set Jaccard similarity of every fuzzy column
+FUZZY_BLOCK_PREFIX_CHARS = 3  # Leading characters of each fuzzy column's first token in the blocking key
+FUZZY_MAX_BLOCK_PAIRS = 100_000  # Blocks with more candidate pairs are not fuzzy matched
+FUZZY_PAIR_BATCH_SIZE = 1_000_000  # Candidate pairs scored per vectorized batch
+
+# Out-of-core comparison (match keys hash-partitioned to local disk)
+COMPARE_OUT_OF_CORE = False  # Opt-in, for jobs whose match keys do not fit in memory
+COMPARE_PARTITIONS = 16  # Hash buckets; each is matched on its own
+COMPARE_CHUNK_ROWS = 250_000  # Rows normalized per chunk
+COMPARE_MEMORY_BUDGET_BYTES = 1024 ** 3  # Buffered keys of all buckets before spilling
+COMPARE_SPILL_DIR = None  # Directory for spill files (None = system temp directory)
+
 # Display settings
 MAX_MISMATCH_DISPLAY = 5  # Maximum mismatched records to display
 CARDS_PER_ROW = 3  # Street View cards per row
@@ -19,6 +40,25 @@ MAX_NUM_CARDS = 21  # Maximum Street View cards
 # IMB validation settings
 IMB_CODE_LENGTH = 65  # Valid IMB code length
 IMB_VALID_CHARS = 'ADTF'  # Valid characters in IMB codes
+IMB_DECODE_TRACE = False  # Log every decoding step per barcode (slow, debugging only)
+# Repair attempted for damaged codes: 'off' (decode as given or upside down),
+# 'single-bit' (one damaged character) or 'full' (several damaged characters
+# and a missing or extra bar; slowest on heavily damaged files)
+IMB_REPAIR_BUDGET = 'full'
+
+# Persistent cache of IMB codes that needed the repairing decoder
+IMB_DECODE_CACHE_ENABLED = True
+IMB_DECODE_CACHE_DIR = os.environ.get(
+    'IMB_DECODE_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'postpros-job-checker')
+)
+IMB_DECODE_CACHE_MAX_ENTRIES = 500_000  # Least recently used entries are evicted beyond this
+
+# Parallel IMB validation (process pool)
+IMB_PARALLEL_ENABLED = False  # Opt-in; small columns are always decoded serially
+IMB_PARALLEL_WORKERS = None  # Worker processes (None = one per CPU)
+IMB_PARALLEL_CHUNK_SIZE = 50_000  # Distinct codes per work item
+IMB_PARALLEL_START_METHOD = 'spawn'  # Avoid forking the multi-threaded Streamlit server
 
 # Color palette
 COLORS = {
@@ -41,11 +81,72 @@ DEFAULT_COLUMN_MAPPINGS = {
     'ZIP': 'zip',
 }
 
+# Key normalization of mapped columns, keyed by Accuzip column and applied to
+# both sides of the mapping. Steps run in order: strip, lower, casefold,
+# collapse_whitespace, strip_punctuation, zip5 (ZIP/ZIP+4 to 5 digits),
+# number (canonical numbers) and usps_suffixes (ADDRESS_ABBREVIATIONS).
+# These entries change what counts as a match for their columns: ZIP compares
+# the first 5 digits only (a ZIP+4 difference is not a mismatch), and NAME,
+# ADDRESS and CITY ignore case, spacing and (ADDRESS) punctuation and suffix
+# spelling. Remove an entry to compare that column with DEFAULT_NORMALIZER.
+DEFAULT_NORMALIZER = ('strip', 'lower')
+NUMERIC_KEY_CANONICALIZATION = True  # Match 123, 123.0 and '00123' regardless of column dtype
+COLUMN_NORMALIZERS = {
+    'yearly_pre': ('strip', 'number'),
+    'NAME': ('casefold', 'collapse_whitespace', 'strip'),
+    'ADDRESS': ('casefold', 'strip_punctuation', 'collapse_whitespace', 'strip', 'usps_suffixes'),
+    'CITY': ('casefold', 'collapse_whitespace', 'strip'),
+    'ZIP': ('zip5',),
+}
+
+# Canonical forms of common address words (long form -> USPS abbreviation)
+ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'str': 'st', 'avenue': 'ave', 'av': 'ave', 'road': 'rd',
+    'drive': 'dr', 'lane': 'ln', 'boulevard': 'blvd', 'court': 'ct', 'place': 'pl',
+    'circle': 'cir', 'highway': 'hwy', 'parkway': 'pkwy', 'terrace': 'ter',
+    'square': 'sq', 'trail': 'trl',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+    'northeast': 'ne', 'northwest': 'nw', 'southeast': 'se', 'southwest': 'sw',
+    'apartment': 'apt', 'suite': 'ste', 'building': 'bldg', 'floor': 'fl',
+}
+
 # Column detection keywords
 ADDRESS_KEYWORDS = ['address', 'addr', 'street']
 ZIP_KEYWORDS = ['zip', 'postal']
 IMB_KEYWORDS = ['imb', 'barcode', 'intelligent']
 DISPLAY_KEYWORDS = ['first', 'dwelling_l', 'yearly_pre']
+RATE_KEYWORDS = ['rate_']
+
+# Default seed searches as (column, search term)
+SEED_SEARCH_DEFAULTS = [
+    ('first', 'Post'),
+    ('first', 'Current'),
+    ('last', 'Job'),
+    (None, ''),
+]
+
+# Only load the columns the checker uses (others are loaded when selected)
+COLUMN_PROJECTION_ENABLED = True
 
 # Flat rate for postage calculation
 FLAT_RATE_PER_RECORD = 0.005
+
+# Streaming CSV ingestion
+INGEST_STREAMING = True  # Read CSVs in chunks instead of one pd.read_csv call
+INGEST_CHUNK_ROWS = 250_000  # Rows parsed per chunk
+INGEST_MEMORY_BUDGET_BYTES = 4 * 1024 ** 3  # Parsed chunks held in memory before spilling
+INGEST_SPILL_DIR = None  # Directory for spill files (None = system temp directory)
+INGEST_PARALLEL_ENABLED = True  # Parse uploaded files and ZIP members concurrently
+INGEST_PARALLEL_WORKERS = None  # Parser threads (None = one per CPU, at most 8)
+INGEST_CSV_ENGINE = 'auto'  # pd.read_csv engine when not streaming ('auto' = pyarrow if installed)
+
+# Duplicate rows removed when merging uploads
+DEDUP_KEY_COLUMNS = None  # Columns identifying duplicate rows (None = all columns, loaded or not)
+
+# Parsed upload cache (reused across Streamlit reruns)
+UPLOAD_CACHE_MAX_BYTES = 2 * 1024 ** 3  # Memory budget for cached DataFrames
+UPLOAD_CACHE_MAX_ENTRIES = 16  # Maximum number of cached parse results
+
+# Normalized match-key column cache (reused when comparing again)
+NORMALIZED_CACHE_MAX_BYTES = 512 * 1024 ** 2  # Memory budget for normalized columns
+NORMALIZED_CACHE_MAX_ENTRIES = 64  # Maximum number of cached columns
@@ -20,17 +20,25 @@ from typing import Dict, List, Tuple, Optional, Any
 # Local imports
 from config import (
     COLORS, DEFAULT_COLUMN_MAPPINGS, MATCH_THRESHOLD_HIGH, MATCH_THRESHOLD_LOW,
-    FLAT_RATE_PER_RECORD, DEFAULT_NUM_CARDS, MAX_NUM_CARDS,
-    ADDRESS_KEYWORDS, ZIP_KEYWORDS, IMB_KEYWORDS, DISPLAY_KEYWORDS
+    DEFAULT_NUM_CARDS, MAX_NUM_CARDS,
+    ADDRESS_KEYWORDS, ZIP_KEYWORDS, IMB_KEYWORDS, DISPLAY_KEYWORDS,
+    SEED_SEARCH_DEFAULTS, COLUMN_PROJECTION_ENABLED, FUZZY_MATCH_ENABLED
+)
+from utils.file_processor import (
+    process_uploaded_files, FileProcessingError, sniff_headers, load_extra_columns,
+    set_reporter
+)
+from utils.streamlit_reporter import StreamlitReporter
+from utils.analysis import search_seed_records, find_rate_column, postal_rate_statistics
+from utils.data_validator import (
+    compare_datasets, find_column_by_keywords, get_default_columns, get_required_columns
 )
-from utils.file_processor import process_uploaded_files, FileProcessingError
-from utils.data_validator import compare_datasets, find_column_by_keywords, get_default_columns
 from utils.imb_validator import validate_imb_column
 from utils.streetview_processor import display_streetview_cards
 from utils.html_utils import (
     record_counts_html, match_results_html, seed_results_container_html,
     seed_result_html, postal_rate_metrics_html, imb_validation_metrics_html,
-    escape
+    escape, format_number
 )
 
 # Configure logging
@@ -40,6 +48,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Dataset labels (also used as radio options)
+ACCUZIP = "Accuzip Files"
+CLIENT = "Client Files"
+
 
 def load_css() -> None:
     """Load custom CSS from external file."""
@@ -52,6 +64,84 @@ def load_css() -> None:
         logger.warning(f"Could not load CSS: {e}")
 
 
+def column_options(df: pd.DataFrame, dataset: str) -> pd.Index:
+    """
+    Get the columns offered in column selectors for a dataset.
+    
+    With column projection this includes columns present in the uploaded
+    files but not loaded yet; they are loaded on the rerun that follows
+    their selection.
+    
+    Args:
+        df: Loaded DataFrame for the dataset
+        dataset: ACCUZIP or CLIENT
+        
+    Returns:
+        Index of selectable column names
+    """
+    available = st.session_state.get('available_columns', {}).get(dataset)
+    return pd.Index(available) if available else df.columns
+
+
+def selected_columns(dataset: str) -> List[str]:
+    """
+    Collect the columns currently selected in widgets for a dataset.
+    
+    Args:
+        dataset: ACCUZIP or CLIENT
+        
+    Returns:
+        List of selected column names
+    """
+    state = st.session_state
+    
+    if dataset == ACCUZIP:
+        columns = list(state.get('source_cols_select', []))
+        columns += [state.get(f"seed_col_{i}") for i in range(len(SEED_SEARCH_DEFAULTS))]
+        columns.append(state.get('postal_rate_col'))
+    else:
+        columns = list(state.get('compare_cols_select', []))
+    
+    if state.get('imb_dataset_choice', ACCUZIP) == dataset:
+        columns += [state.get('imb_col_select'), state.get('imb_zip_col_select')]
+    
+    if state.get('streetview_dataset', ACCUZIP) == dataset:
+        columns += [state.get('streetview_address_col'), state.get('streetview_zip_col')]
+        columns += list(state.get('streetview_display_cols', []))
+    
+    return [col for col in columns if col]
+
+
+def load_dataset(files: List, dataset: str) -> Tuple[pd.DataFrame, int]:
+    """
+    Load uploaded files, materializing only the columns the checker uses.
+    
+    Headers are sniffed first; the required columns plus any columns
+    selected in widgets are then loaded.
+    
+    Args:
+        files: Uploaded file objects
+        dataset: ACCUZIP or CLIENT
+        
+    Returns:
+        Tuple of (DataFrame, count of processed files)
+    """
+    if not COLUMN_PROJECTION_ENABLED:
+        return process_uploaded_files(files)
+    
+    headers = sniff_headers(files)
+    usecols = get_required_columns(headers)
+    if not usecols:
+        return process_uploaded_files(files)
+    
+    st.session_state.setdefault('available_columns', {})[dataset] = headers
+    df, processed_files = process_uploaded_files(files, usecols=usecols)
+    
+    header_set = set(headers)
+    extra = [col for col in selected_columns(dataset) if col in header_set]
+    return load_extra_columns(files, df, extra), processed_files
+
+
 def render_file_upload_section() -> Tuple[Optional[List], Optional[List]]:
     """
     Render the file upload section with two columns.
@@ -98,10 +188,10 @@ def render_dataset_info(df1: pd.DataFrame, df2: pd.DataFrame) -> None:
         col1, col2 = st.columns(2)
         with col1:
             st.write("**Accuzip File(s):**")
-            st.write("Columns:", ", ".join(df1.columns))
+            st.write("Columns:", ", ".join(column_options(df1, ACCUZIP)))
         with col2:
             st.write("**Client File(s):**")
-            st.write("Columns:", ", ".join(df2.columns))
+            st.write("Columns:", ", ".join(column_options(df2, CLIENT)))
 
 
 def render_column_mapping(df1: pd.DataFrame, df2: pd.DataFrame) -> Dict[str, str]:
@@ -116,6 +206,8 @@ def render_column_mapping(df1: pd.DataFrame, df2: pd.DataFrame) -> Dict[str, str
         Dictionary mapping Accuzip columns to Client columns
     """
     mapping = {}
+    options1 = column_options(df1, ACCUZIP)
+    options2 = column_options(df2, CLIENT)
     
     with st.expander("⚙️ Configure Column Mapping", expanded=False):
         st.write("Select the columns to compare between datasets:")
@@ -127,11 +219,11 @@ def render_column_mapping(df1: pd.DataFrame, df2: pd.DataFrame) -> Dict[str, str
             # Find default columns that exist
             default_source_cols = [
                 col for col in DEFAULT_COLUMN_MAPPINGS.keys() 
-                if col in df1.columns
+                if col in options1
             ]
             source_cols = st.multiselect(
                 "Select Accuzip columns",
-                df1.columns,
+                options1,
                 default=default_source_cols,
                 key="source_cols_select"
             )
@@ -144,11 +236,11 @@ def render_column_mapping(df1: pd.DataFrame, df2: pd.DataFrame) -> Dict[str, str
                     DEFAULT_COLUMN_MAPPINGS[src] 
                     for src in source_cols
                     if src in DEFAULT_COLUMN_MAPPINGS 
-                    and DEFAULT_COLUMN_MAPPINGS[src] in df2.columns
+                    and DEFAULT_COLUMN_MAPPINGS[src] in options2
                 ]
                 compare_cols = st.multiselect(
                     "Select matching Client columns",
-                    df2.columns,
+                    options2,
                     default=default_target_cols,
                     max_selections=len(source_cols),
                     key="compare_cols_select"
@@ -179,6 +271,10 @@ def render_comparison_results(comparison_results: Dict[str, Any]) -> None:
         unsafe_allow_html=True
     )
     
+    fuzzy_matched = comparison_results.get('fuzzy_matched_records', 0)
+    if fuzzy_matched:
+        st.caption(f"{format_number(fuzzy_matched)} matching records were matched by fuzzy matching")
+    
     # Display mismatches table if any
     if not comparison_results['mismatches'].empty:
         st.dataframe(
@@ -186,6 +282,39 @@ def render_comparison_results(comparison_results: Dict[str, Any]) -> None:
             use_container_width=True,
             hide_index=True
         )
+    
+    # Missing records that differ from a client record in one column only
+    near_misses = comparison_results.get('near_miss_records', 0)
+    if near_misses:
+        columns = ', '.join(
+            f"{col} ({format_number(count)})"
+            for col, count in comparison_results['mismatch_columns'].items() if count
+        )
+        st.caption(f"{format_number(near_misses)} missing records differ from a client record "
+                   f"in one column only: {columns}")
+    
+    # Missing records that differ from a client record in two columns
+    two_column_misses = comparison_results.get('two_column_near_miss_records', 0)
+    if two_column_misses:
+        pairs = '; '.join(
+            f"{cols} ({format_number(count)})"
+            for cols, count in comparison_results['mismatch_column_pairs'].items()
+        )
+        st.caption(f"{format_number(two_column_misses)} missing records differ from a client record "
+                   f"in two columns: {pairs}")
+    
+    # Client records missing from Accuzip
+    client_only = comparison_results.get('client_only_records', 0)
+    if client_only:
+        st.caption(f"{format_number(client_only)} client records are not in the Accuzip file")
+        st.dataframe(comparison_results['client_only'], use_container_width=True, hide_index=True)
+    
+    # Records present in both files, but a different number of times
+    count_keys = comparison_results.get('count_mismatch_keys', 0)
+    if count_keys:
+        st.caption(f"{format_number(count_keys)} records appear a different number of times "
+                   f"in the Accuzip and client files")
+        st.dataframe(comparison_results['count_mismatches'], use_container_width=True, hide_index=True)
 
 
 def render_seed_search_section(df: pd.DataFrame) -> List[Dict[str, Any]]:
@@ -198,25 +327,22 @@ def render_seed_search_section(df: pd.DataFrame) -> List[Dict[str, Any]]:
     Returns:
         List of search results
     """
-    search_results = []
+    searches = []
+    options = column_options(df, ACCUZIP)
     
     with st.expander("⚙️ Configure Seed Search", expanded=False):
-        # Default search configurations
-        default_columns = ["first", "first", "last", None]
-        default_terms = ["Post", "Current", "Job", ""]
-        
-        for i in range(4):
+        for i, (default_column, default_term) in enumerate(SEED_SEARCH_DEFAULTS):
             cols = st.columns([1, 1])
             
             with cols[0]:
                 # Get default index
                 default_idx = 0
-                if default_columns[i] and default_columns[i] in df.columns:
-                    default_idx = df.columns.get_loc(default_columns[i])
+                if default_column and default_column in options:
+                    default_idx = options.get_loc(default_column)
                 
                 selected_col = st.selectbox(
                     f"Field {i+1}",
-                    options=df.columns,
+                    options=options,
                     label_visibility="hidden",
                     index=default_idx,
                     key=f"seed_col_{i}"
@@ -225,33 +351,20 @@ def render_seed_search_section(df: pd.DataFrame) -> List[Dict[str, Any]]:
             with cols[1]:
                 search_term = st.text_input(
                     f"Search term {i+1}",
-                    value=default_terms[i],
+                    value=default_term,
                     label_visibility="hidden",
                     key=f"seed_term_{i}"
                 )
                 
-                if selected_col and search_term:
-                    # Perform search
-                    filtered_df = df[
-                        df[selected_col].astype(str).str.contains(
-                            search_term, case=False, na=False
-                        )
-                    ]
-                    search_results.append({
-                        'column': selected_col,
-                        'term': search_term,
-                        'count': len(filtered_df)
-                    })
+                searches.append((selected_col, search_term))
         
         # Postal rate column selection
         st.markdown("#### Postal Rate Column")
-        rate_col_idx = next(
-            (i for i, col in enumerate(df.columns) if 'rate_' in col.lower()), 
-            0
-        )
+        rate_col_default = find_rate_column(options)
+        rate_col_idx = options.get_loc(rate_col_default) if rate_col_default else 0
         rate_col = st.selectbox(
             "Rate Column",
-            options=df.columns,
+            options=options,
             label_visibility="hidden",
             index=rate_col_idx,
             key="postal_rate_col"
@@ -260,7 +373,7 @@ def render_seed_search_section(df: pd.DataFrame) -> List[Dict[str, Any]]:
         # Store rate column in session state
         st.session_state.rate_col = rate_col
     
-    return search_results
+    return search_seed_records(df, searches)
 
 
 def render_seed_results(search_results: List[Dict[str, Any]]) -> None:
@@ -305,7 +418,7 @@ def render_postal_rate_statistics(df: pd.DataFrame, rate_col: str) -> None:
         df: DataFrame containing rate data
         rate_col: Column name containing postal rates
     """
-    if not rate_col:
+    if not rate_col or rate_col not in df.columns:
         return
     
     try:
@@ -325,12 +438,7 @@ def render_postal_rate_statistics(df: pd.DataFrame, rate_col: str) -> None:
         """, unsafe_allow_html=True)
         
         # Calculate statistics
-        rate_data = pd.to_numeric(df[rate_col], errors='coerce')
-        total_sum = rate_data.sum()
-        total_records = rate_data.count()
-        flat_rate = total_records * FLAT_RATE_PER_RECORD
-        postage = flat_rate - total_sum
-        avg_rate = rate_data.mean()
+        stats = postal_rate_statistics(df, rate_col)
         
         # Display container
         st.markdown("""
@@ -342,7 +450,9 @@ def render_postal_rate_statistics(df: pd.DataFrame, rate_col: str) -> None:
         
         # Display metrics
         st.markdown(
-            postal_rate_metrics_html(avg_rate, rate_data.min(), rate_data.max(), postage),
+            postal_rate_metrics_html(
+                stats['average'], stats['minimum'], stats['maximum'], stats['postage']
+            ),
             unsafe_allow_html=True
         )
         
@@ -398,36 +508,37 @@ def render_imb_validation_section(df1: pd.DataFrame, df2: pd.DataFrame) -> None:
         with cols[0]:
             dataset_choice = st.radio(
                 "Select Dataset",
-                ["Accuzip Files", "Client Files"],
+                [ACCUZIP, CLIENT],
                 index=0,
                 key="imb_dataset_choice"
             )
-            active_df = df1 if dataset_choice == "Accuzip Files" else df2
+            active_df = df1 if dataset_choice == ACCUZIP else df2
+            options = column_options(active_df, dataset_choice)
             
             # Find default IMB column
-            imb_cols = get_default_columns(active_df, 'imb')
-            if 'imbarcode' in active_df.columns:
-                default_imb_idx = active_df.columns.get_loc('imbarcode')
+            imb_cols = get_default_columns(options, 'imb')
+            if 'imbarcode' in options:
+                default_imb_idx = options.get_loc('imbarcode')
             elif imb_cols:
-                default_imb_idx = active_df.columns.get_loc(imb_cols[0])
+                default_imb_idx = options.get_loc(imb_cols[0])
             else:
                 default_imb_idx = 0
             
             imb_col = st.selectbox(
                 "Select IMB Code Column",
-                options=active_df.columns,
+                options=options,
                 index=default_imb_idx,
                 key="imb_col_select"
             )
         
         with cols[1]:
             # Find default ZIP column
-            zip_cols = get_default_columns(active_df, 'zip')
-            default_zip_idx = active_df.columns.get_loc(zip_cols[0]) if zip_cols else 0
+            zip_cols = get_default_columns(options, 'zip')
+            default_zip_idx = options.get_loc(zip_cols[0]) if zip_cols else 0
             
             zip_col = st.selectbox(
                 "Select ZIP Code Column",
-                options=active_df.columns,
+                options=options,
                 index=default_zip_idx,
                 key="imb_zip_col_select"
             )
@@ -443,7 +554,7 @@ def render_imb_validation_section(df1: pd.DataFrame, df2: pd.DataFrame) -> None:
     # Validate button
     if st.button("Validate IMB Codes", type="primary", key="validate_imb_btn"):
         with st.spinner("Validating IMB codes..."):
-            active_df = df1 if st.session_state.imb_dataset_choice == "Accuzip Files" else df2
+            active_df = df1 if st.session_state.imb_dataset_choice == ACCUZIP else df2
             results = validate_imb_column(
                 active_df, 
                 st.session_state.imb_col, 
@@ -455,7 +566,7 @@ def render_imb_validation_section(df1: pd.DataFrame, df2: pd.DataFrame) -> None:
     if st.session_state.get('imb_validation_results'):
         render_imb_validation_results(
             st.session_state.imb_validation_results,
-            df1 if st.session_state.get('imb_dataset_choice') == "Accuzip Files" else df2
+            df1 if st.session_state.get('imb_dataset_choice') == ACCUZIP else df2
         )
 
 
@@ -492,6 +603,16 @@ def render_imb_validation_results(results: Dict[str, Any], active_df: pd.DataFra
         unsafe_allow_html=True
     )
     
+    # Decoder outcome counters for this run
+    decode_stats = results.get('decode_stats')
+    if decode_stats:
+        st.caption(
+            f"Decoder: {decode_stats['direct']:,} direct, {decode_stats['repaired']:,} repaired, "
+            f"{decode_stats['flipped']:,} upside down, {decode_stats['failed']:,} failed, "
+            f"{decode_stats.get('cache_hits', 0):,} from cache "
+            f"({decode_stats.get('unique_codes', 0):,} distinct codes)"
+        )
+    
     # Display mismatches if any
     if 'zip_match' in results['results_df'].columns:
         mismatched_df = results['results_df'][results['results_df']['zip_match'] == False].copy()
@@ -553,42 +674,43 @@ def render_streetview_section(df1: pd.DataFrame, df2: pd.DataFrame) -> None:
     with st.expander("⚙️ Configure Street View Settings", expanded=False):
         streetview_dataset = st.radio(
             "Select Dataset for Street View",
-            ["Accuzip Files", "Client Files"],
+            [ACCUZIP, CLIENT],
             index=0,
             key="streetview_dataset"
         )
         
-        sv_active_df = df1 if streetview_dataset == "Accuzip Files" else df2
+        sv_active_df = df1 if streetview_dataset == ACCUZIP else df2
+        sv_options = column_options(sv_active_df, streetview_dataset)
         
         col1, col2 = st.columns(2)
         
         with col1:
-            addr_cols = get_default_columns(sv_active_df, 'address')
-            default_addr_idx = sv_active_df.columns.get_loc(addr_cols[0]) if addr_cols else 0
+            addr_cols = get_default_columns(sv_options, 'address')
+            default_addr_idx = sv_options.get_loc(addr_cols[0]) if addr_cols else 0
             
             address_col = st.selectbox(
                 "Address Column",
-                options=sv_active_df.columns,
+                options=sv_options,
                 index=default_addr_idx,
                 key="streetview_address_col"
             )
         
         with col2:
-            zip_cols = get_default_columns(sv_active_df, 'zip')
-            default_zip_idx = sv_active_df.columns.get_loc(zip_cols[0]) if zip_cols else 0
+            zip_cols = get_default_columns(sv_options, 'zip')
+            default_zip_idx = sv_options.get_loc(zip_cols[0]) if zip_cols else 0
             
             zip_col = st.selectbox(
                 "ZIP Code Column",
-                options=sv_active_df.columns,
+                options=sv_options,
                 index=default_zip_idx,
                 key="streetview_zip_col"
             )
         
         # Additional display columns
-        display_default = get_default_columns(sv_active_df, 'display')[:4]
+        display_default = get_default_columns(sv_options, 'display')[:4]
         display_cols = st.multiselect(
             "Select columns to display on Street View cards",
-            options=sv_active_df.columns,
+            options=sv_options,
             default=display_default,
             key="streetview_display_cols"
         )
@@ -615,7 +737,7 @@ def render_streetview_section(df1: pd.DataFrame, df2: pd.DataFrame) -> None:
         if st.button("Generate Street View Images", type="primary", key="generate_streetview"):
             with st.spinner("Fetching Street View images..."):
                 config = st.session_state.streetview_config
-                active_df = df1 if config['dataset'] == "Accuzip Files" else df2
+                active_df = df1 if config['dataset'] == ACCUZIP else df2
                 
                 display_streetview_cards(
                     df=active_df,
@@ -645,6 +767,9 @@ def main() -> None:
     # Load custom CSS
     load_css()
     
+    # Show file processing progress and problems in the app
+    set_reporter(StreamlitReporter())
+    
     # Header
     st.title("💼 Post Pros Job Checker")
     st.markdown("For Post Pros Internal Use Only.")
@@ -656,8 +781,8 @@ def main() -> None:
     if source_files and compare_files:
         try:
             # Process files
-            df1, processed_files1 = process_uploaded_files(source_files)
-            df2, processed_files2 = process_uploaded_files(compare_files)
+            df1, processed_files1 = load_dataset(source_files, ACCUZIP)
+            df2, processed_files2 = load_dataset(compare_files, CLIENT)
             
             st.success(f"""
             Files processed successfully!
@@ -676,7 +801,14 @@ def main() -> None:
             mapping = render_column_mapping(df1, df2)
             
             if mapping:
-                comparison_results = compare_datasets(df1, df2, mapping)
+                fuzzy = st.checkbox(
+                    "Fuzzy match name and address columns",
+                    value=FUZZY_MATCH_ENABLED,
+                    help="Count records as matching when names and addresses differ only "
+                         "slightly (e.g. 'Street' vs 'ST') and the other columns are equal",
+                    key="fuzzy_match"
+                )
+                comparison_results = compare_datasets(df1, df2, mapping, fuzzy=fuzzy)
                 st.session_state.comparison_results = comparison_results
                 render_comparison_results(comparison_results)
             
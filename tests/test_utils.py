@@ -1,8 +1,11 @@
 """
 Unit tests for PostPros Job Checker.
 """
+import io
+import zipfile
 import pytest
 import pandas as pd
+import numpy as np
 import sys
 import os
 
@@ -14,8 +17,34 @@ from config import (
     IMB_CODE_LENGTH, IMB_VALID_CHARS
 )
 from utils.html_utils import escape, get_percentage_color, format_number
-from utils.data_validator import compare_datasets
-from utils.imb_validator import is_valid_imb_format, validate_imb_format_vectorized
+from utils.data_validator import compare_datasets, get_required_columns
+from utils.analysis import search_seed_records, postal_rate_statistics, find_rate_column
+from utils.file_processor import (
+    sniff_headers, process_uploaded_files, load_extra_columns, IngestReporter, set_reporter,
+    FileProcessingError
+)
+from utils.imb_validator import (
+    is_valid_imb_format, validate_imb_format_vectorized, validate_imb_column,
+    regenerate_imb_codes, imb_format_matrix
+)
+from utils.usps_imb_decoder import (
+    decode_barcode, decode_barcodes_batch, encode_barcode, encode_barcodes_batch, BATCH_FIELDS
+)
+from utils import match_keys
+from utils.match_keys import encode_keys, keys_present, find_duplicate_rows
+from utils.imb_cache import DecodeCache
+from utils.streaming_reader import ChunkStore, read_csv_streaming
+from utils.upload_cache import UploadCache, file_digest, make_cache_key
+
+KNOWN_IMB = "TAAFFATFFDTFTFAATDTTAAFDAFDFDAFFDTTADAADTATTADTTTAADAFDDDDTTDDDTA"
+
+
+def isolate_decode_cache(monkeypatch, tmp_path):
+    """Point the shared IMB decode cache at an empty directory for one test."""
+    import config
+    from utils import imb_cache
+    monkeypatch.setattr(config, 'IMB_DECODE_CACHE_DIR', str(tmp_path / 'imb_cache'))
+    monkeypatch.setattr(imb_cache, '_decode_cache', None)
 
 
 class TestConfig:
@@ -93,6 +122,403 @@ class TestDataValidator:
         assert result['total_records'] == 4
         assert result['matching_records'] == 2
         assert result['missing_records'] == 2
+    
+    def test_compare_datasets_normalizes_and_handles_missing_values(self):
+        df1 = pd.DataFrame({'col1': [' A ', None, 'c'], 'col2': [1, 2, 3]})
+        df2 = pd.DataFrame({'colA': ['a', None, 'c'], 'colB': [1, 2, 4]})
+        mapping = {'col1': 'colA', 'col2': 'colB'}
+        
+        result = compare_datasets(df1, df2, mapping)
+        
+        assert result['matching_records'] == 2
+        assert result['mismatches']['Record #'].tolist() == [3]
+    
+    def test_compare_datasets_reports_both_directions_and_counts(self):
+        df1 = pd.DataFrame({'col1': ['a', 'a', 'b', 'c', 'd', 'd']})
+        df2 = pd.DataFrame({'colA': ['a', 'b', 'b', 'c', 'e', 'f']})
+        
+        result = compare_datasets(df1, df2, {'col1': 'colA'})
+        
+        assert result['missing_records'] == 2
+        assert result['client_only_records'] == 2
+        assert result['client_only']['colA (Client)'].tolist() == ['e', 'f']
+        assert result['count_mismatch_keys'] == 2
+        counts = result['count_mismatches']
+        assert counts['col1 (Accuzip)'].tolist() == ['a', 'b']
+        assert counts['Accuzip Count'].tolist() == [2, 1]
+        assert counts['Client Count'].tolist() == [1, 2]
+        assert result['unmatched_accuzip_records'] == 3
+        assert result['unmatched_client_records'] == 3
+    
+    def test_compare_datasets_pages_detail_tables(self):
+        df1 = pd.DataFrame({'col1': list('abcdefg')})
+        df2 = pd.DataFrame({'colA': ['a']})
+        
+        result = compare_datasets(df1, df2, {'col1': 'colA'}, page=1, page_size=4)
+        
+        assert result['missing_records'] == 6
+        assert result['mismatches']['Record #'].tolist() == [6, 7]
+    
+    def test_compare_datasets_mismatches_leave_inputs_untouched(self):
+        df1 = pd.DataFrame({'col1': ['a', 'b', 'c'], 'extra': [1, 2, 3]}, index=[0, 0, 1])
+        df2 = pd.DataFrame({'colA': ['a']})
+        
+        result = compare_datasets(df1, df2, {'col1': 'colA'})
+        
+        mismatches = result['mismatches']
+        assert mismatches.columns.tolist() == [
+            'Record #', 'col1 (Accuzip)', 'extra (Accuzip)', 'Status', 'Differing Columns'
+        ]
+        assert mismatches['col1 (Accuzip)'].tolist() == ['b', 'c']
+        assert df1.columns.tolist() == ['col1', 'extra']
+    
+    def test_compare_datasets_attributes_near_misses(self):
+        df1 = pd.DataFrame({
+            'CITY': ['Spring', 'Austin', 'Denver', 'Tampa'],
+            'ZIP': ['77380', '78701', '80202', '33602'],
+        })
+        df2 = pd.DataFrame({
+            'city': ['Spring', 'Austin', 'Denvr', 'Miami'],
+            'zip': ['77380', '78702', '80202', '33101'],
+        })
+        
+        result = compare_datasets(df1, df2, {'CITY': 'city', 'ZIP': 'zip'})
+        
+        assert result['missing_records'] == 3
+        assert result['mismatches']['Differing Columns'].tolist() == ['ZIP', 'CITY', '']
+        assert result['near_miss_records'] == 2
+        assert result['mismatch_columns'] == {'CITY': 1, 'ZIP': 1}
+        assert result['two_column_near_miss_records'] == 0
+    
+    def test_compare_datasets_attributes_two_column_near_misses(self):
+        df1 = pd.DataFrame({
+            'NAME': ['Ann Lee', 'Bob Ray', 'Kim Fox'],
+            'CITY': ['Spring', 'Austin', 'Tampa'],
+            'ZIP': ['77380', '78701', '33602'],
+        })
+        df2 = pd.DataFrame({
+            'name': ['Ann Lee', 'Bob Ray', 'Kim Fox'],
+            'city': ['Sprng', 'Austin', 'Miami'],
+            'zip': ['77381-1234', '78702', '33101'],
+        })
+        
+        result = compare_datasets(df1, df2, {'NAME': 'name', 'CITY': 'city', 'ZIP': 'zip'})
+        
+        assert result['missing_records'] == 3
+        assert result['mismatches']['Differing Columns'].tolist() == ['CITY, ZIP', 'ZIP', 'CITY, ZIP']
+        assert result['near_miss_records'] == 1
+        assert result['mismatch_columns'] == {'NAME': 0, 'CITY': 0, 'ZIP': 1}
+        assert result['two_column_near_miss_records'] == 2
+        assert result['mismatch_column_pairs'] == {'CITY, ZIP': 2}
+    
+    def test_compare_datasets_out_of_core_matches_in_memory(self, tmp_path, monkeypatch):
+        import config
+        from benchmarks.synthetic import JobSpec, generate_job
+        monkeypatch.setattr(config, 'COMPARE_SPILL_DIR', str(tmp_path))
+        monkeypatch.setattr(config, 'COMPARE_MEMORY_BUDGET_BYTES', 1)  # Spill every chunk
+        monkeypatch.setattr(config, 'COMPARE_CHUNK_ROWS', 300)
+        monkeypatch.setattr(config, 'COMPARE_PARTITIONS', 4)
+        accuzip, client = generate_job(JobSpec(rows=1000, duplicate_rate=0.05, mismatch_rate=0.1, seed=2))
+        mapping = {'controlno': 'CONTROLNO', 'ADDRESS': 'address', 'ZIP': 'zip'}
+        
+        in_memory = compare_datasets(accuzip, client, mapping, page=1, page_size=10)
+        out_of_core = compare_datasets(accuzip, client, mapping, page=1, page_size=10, out_of_core=True)
+        
+        for key in ('total_records', 'matching_records', 'missing_records', 'client_only_records',
+                    'count_mismatch_keys', 'unmatched_accuzip_records', 'unmatched_client_records'):
+            assert out_of_core[key] == in_memory[key]
+        pd.testing.assert_frame_equal(out_of_core['mismatches'].drop(columns='Differing Columns'),
+                                      in_memory['mismatches'].drop(columns='Differing Columns'))
+        pd.testing.assert_frame_equal(out_of_core['client_only'], in_memory['client_only'])
+        pd.testing.assert_frame_equal(out_of_core['count_mismatches'], in_memory['count_mismatches'])
+        assert list(tmp_path.iterdir()) == []
+    
+    def test_compare_datasets_fuzzy_matches_similar_addresses(self):
+        df1 = pd.DataFrame({
+            'ADDRESS': ['123 Main Street NW', '45 Oak Avenue', '9 Pine Rd'],
+            'ZIP': ['77380', '78701', '80202'],
+        })
+        df2 = pd.DataFrame({
+            'address': ['123 MAIN ST.', '45 Oak Ave', '9 Pine Rd'],
+            'zip': ['77380', '78702', '80202'],
+        })
+        mapping = {'ADDRESS': 'address', 'ZIP': 'zip'}
+        
+        exact = compare_datasets(df1, df2, mapping, fuzzy=False)
+        fuzzy = compare_datasets(df1, df2, mapping, fuzzy=True)
+        
+        assert exact['missing_records'] == 2
+        assert fuzzy['fuzzy_matched_records'] == 1
+        assert fuzzy['matching_records'] == 2
+        assert fuzzy['mismatches']['ADDRESS (Accuzip)'].tolist() == ['45 Oak Avenue']
+        assert fuzzy['client_only']['address (Client)'].tolist() == ['45 Oak Ave']
+    
+    def test_numeric_keys_match_across_dtypes(self):
+        df1 = pd.DataFrame({
+            'controlno': [123, 124, 125, 126],
+            'ref': ['0042', 'A7', '3.50', '12345678901234567890'],
+        })
+        df2 = pd.DataFrame({
+            'CONTROLNO': [123.0, 124.0, np.nan, 126.0],
+            'REF': [42, 'a7', 3.5, '12345678901234567891'],
+        })
+        
+        result = compare_datasets(df1, df2, {'controlno': 'CONTROLNO', 'ref': 'REF'})
+        
+        assert result['missing_records'] == 2
+        assert result['mismatches']['controlno (Accuzip)'].tolist() == [125, 126]
+    
+    def test_compare_again_normalizes_only_changed_columns(self, monkeypatch):
+        monkeypatch.setattr(match_keys, '_normalized_cache', None)
+        normalized = []
+        
+        def counting_normalize_values(values, normalizer):
+            normalized.append(values.name)
+            return original_normalize_values(values, normalizer)
+        
+        original_normalize_values = match_keys.normalize_values
+        monkeypatch.setattr(match_keys, 'normalize_values', counting_normalize_values)
+        df1 = pd.DataFrame({'first': ['Post', 'Ann'], 'last': ['Job', 'Lee']})
+        df2 = pd.DataFrame({'First': ['post', 'Ann'], 'Last': ['Job', 'Lee'], 'Surname': ['Job', 'Ray']})
+        
+        first = compare_datasets(df1, df2, {'first': 'First', 'last': 'Last'})
+        runs_before = len(normalized)
+        second = compare_datasets(df1, df2, {'first': 'First', 'last': 'Surname'})
+        
+        assert runs_before == 4
+        assert normalized[runs_before:] == ['Surname']
+        assert (first['missing_records'], second['missing_records']) == (0, 1)
+
+
+class TestAnalysis:
+    """Test seed search and postal rate statistics."""
+    
+    def test_seed_search_counts_case_insensitive(self):
+        df = pd.DataFrame({'first': ['Post', 'post office', 'Ann'], 'last': ['Job', 'x', None]})
+        
+        results = search_seed_records(df, [('first', 'POST'), ('last', 'job'), ('missing', 'x'), ('first', '')])
+        
+        assert results == [
+            {'column': 'first', 'term': 'POST', 'count': 2},
+            {'column': 'last', 'term': 'job', 'count': 1},
+        ]
+    
+    def test_postal_rate_statistics_ignore_non_numeric(self):
+        from config import FLAT_RATE_PER_RECORD
+        df = pd.DataFrame({'rate_std': ['0.25', 'n/a', '0.75']})
+        
+        stats = postal_rate_statistics(df, 'rate_std')
+        
+        assert find_rate_column(['first', 'Rate_STD']) == 'Rate_STD'
+        assert stats['records'] == 2
+        assert stats['average'] == pytest.approx(0.5)
+        assert stats['postage'] == pytest.approx(2 * FLAT_RATE_PER_RECORD - 1.0)
+
+
+class TestCli:
+    """Test the headless batch mode."""
+    
+    def test_cli_writes_report(self, monkeypatch, tmp_path):
+        import json
+        import cli
+        isolate_decode_cache(monkeypatch, tmp_path)
+        pd.DataFrame({
+            'first': ['Post', 'Ann', 'Bob'], 'last': ['Job', 'Lee', 'Ray'],
+            'zip': ['77382', '12345', '77382'], 'imbarcode': [KNOWN_IMB, 'bad', KNOWN_IMB],
+            'rate_std': [0.3, 0.4, 0.5]
+        }).to_csv(tmp_path / 'accuzip.csv', index=False)
+        pd.DataFrame({'First': ['Post', 'Ann'], 'Last': ['Job', 'Lee']}).to_csv(
+            tmp_path / 'client.csv', index=False
+        )
+        (tmp_path / 'mapping.json').write_text(json.dumps({'first': 'First', 'last': 'Last'}))
+        report_path = tmp_path / 'report.json'
+        
+        status = cli.main([
+            '--accuzip', str(tmp_path / 'accuzip.csv'), '--client', str(tmp_path / 'client.csv'),
+            '--mapping', str(tmp_path / 'mapping.json'), '--output', str(report_path)
+        ])
+        
+        report = json.loads(report_path.read_text())
+        assert status == 0
+        assert report['comparison']['missing_records'] == 1
+        assert report['comparison']['mismatches'][0]['first (Accuzip)'] == 'Bob'
+        assert report['postal_rate']['column'] == 'rate_std'
+        assert report['imb_validation']['valid_imbs'] == 2
+        assert report['imb_validation']['matching_zips'] == 2
+    
+    def test_json_report_writes_non_finite_floats_as_null(self):
+        import json
+        import cli
+        report = {'stats': {'average': float('nan'), 'max': np.float64(np.inf), 'count': np.int64(2)}}
+        
+        text = json.dumps(cli._json_safe(report), default=cli._json_default, allow_nan=False)
+        
+        assert json.loads(text) == {'stats': {'average': None, 'max': None, 'count': 2}}
+    
+    def test_cli_rejects_unknown_mapped_column(self, tmp_path):
+        import cli
+        (tmp_path / 'a.csv').write_text("first\nAnn\n")
+        (tmp_path / 'm.json').write_text('{"first": "Nope"}')
+        
+        assert cli.main(['--accuzip', str(tmp_path / 'a.csv'), '--client', str(tmp_path / 'a.csv'),
+                         '--mapping', str(tmp_path / 'm.json'), '--no-imb']) == 1
+
+
+class TestMatchKeys:
+    """Test the hashed composite-key engine."""
+    
+    def test_encode_keys_shares_ids_for_equal_tuples(self):
+        left = [np.array(['a', 'b', 'a'], dtype=object), np.array(['1', '2', '1'], dtype=object)]
+        right = [np.array(['b', 'a'], dtype=object), np.array(['2', '9'], dtype=object)]
+        
+        left_ids, right_ids = encode_keys(left, right)
+        
+        assert left_ids[0] == left_ids[2]
+        assert left_ids[1] == right_ids[0]
+        assert right_ids[1] not in left_ids
+        assert keys_present(left_ids, right_ids).tolist() == [False, True, False]
+    
+    def test_encode_keys_resolves_hash_collisions(self, monkeypatch):
+        monkeypatch.setattr(
+            match_keys, 'hash_key_columns',
+            lambda columns: np.zeros(len(columns[0]), dtype=np.uint64)
+        )
+        left = [np.array(['a', 'b', 'c'], dtype=object)]
+        right = [np.array(['c', 'x'], dtype=object)]
+        
+        left_ids, right_ids = encode_keys(left, right)
+        
+        assert len(set(left_ids)) == 3
+        assert keys_present(left_ids, right_ids).tolist() == [False, False, True]
+    
+    def test_find_duplicate_rows_matches_pandas(self):
+        df = pd.DataFrame({
+            'a': [1, '1', 1, np.nan, np.nan, None, 1.0, 2],
+            'b': ['x', 'x', 'x', np.nan, np.nan, np.nan, 'x', 'y'],
+        })
+        
+        np.testing.assert_array_equal(find_duplicate_rows(df), df.duplicated().to_numpy())
+        np.testing.assert_array_equal(
+            find_duplicate_rows(df, ['b']), df.duplicated(subset=['b']).to_numpy()
+        )
+
+
+class TestNormalizers:
+    """Test declarative key normalization."""
+    
+    def test_normalizer_steps(self):
+        from utils.normalizers import compile_normalizer
+        values = pd.Series(['  123 North Main Street. ', '77380-1234', '7738.0', '1,200.50'])
+        
+        address = compile_normalizer(('casefold', 'strip_punctuation', 'collapse_whitespace',
+                                      'strip', 'usps_suffixes'))
+        assert address(values).tolist()[0] == '123 n main st'
+        assert compile_normalizer(('zip5',))(values).tolist()[1:3] == ['77380', '07738']
+        numbers = pd.Series(['1200', '1200.0', '1.2e3', '0.10', 'n/a'])
+        assert compile_normalizer(('number',))(numbers).tolist() == ['1200', '1200', '1200', '0.1', 'n/a']
+    
+    def test_zip5_keeps_values_without_digits(self):
+        from utils.normalizers import compile_normalizer
+        values = pd.Series(['N/A', 'unknown', '', '773', '77380-1234'])
+        
+        assert compile_normalizer(('zip5',))(values).tolist() == ['N/A', 'unknown', '', '00773', '77380']
+        
+        df1 = pd.DataFrame({'ZIP': ['N/A', '77380']})
+        df2 = pd.DataFrame({'zip': ['UNKNOWN', '77380']})
+        assert compare_datasets(df1, df2, {'ZIP': 'zip'})['missing_records'] == 1
+    
+    def test_unknown_normalizer_step_rejected(self):
+        from utils.normalizers import compile_normalizer
+        with pytest.raises(ValueError, match='soundex'):
+            compile_normalizer(('strip', 'soundex'))
+    
+    def test_configured_normalizers_change_matching(self):
+        df1 = pd.DataFrame({'ZIP': ['77380', '77381'], 'NOTES': ['a b', 'c']})
+        df2 = pd.DataFrame({'zip': ['77380-1234', '77381-0001'], 'notes': ['a  b', 'C ']})
+        
+        zip_only = compare_datasets(df1, df2, {'ZIP': 'zip'})
+        with_notes = compare_datasets(df1, df2, {'ZIP': 'zip', 'NOTES': 'notes'})
+        
+        # ZIP is reduced to 5 digits; unconfigured columns keep DEFAULT_NORMALIZER
+        assert zip_only['missing_records'] == 0
+        assert with_notes['missing_records'] == 1
+        assert with_notes['mismatches']['NOTES (Accuzip)'].tolist() == ['a b']
+    
+    def test_normalized_keys_follow_frame_changes(self):
+        df1 = pd.DataFrame({'NAME': ['ann', 'bob']})
+        df2 = pd.DataFrame({'name': ['Ann', 'Bob']})
+        assert compare_datasets(df1, df2, {'NAME': 'name'})['missing_records'] == 0
+        
+        df1.loc[1, 'NAME'] = 'zed'
+        assert compare_datasets(df1, df2, {'NAME': 'name'})['missing_records'] == 1
+        
+        df1['NAME'] = ['x', 'y']
+        assert compare_datasets(df1, df2, {'NAME': 'name'})['missing_records'] == 2
+    
+    def test_normalize_values_keeps_missing_as_nan(self):
+        from utils.normalizers import normalize_values
+        values = pd.Series([77380, None, 77380])
+        
+        assert normalize_values(values, ('strip', 'lower')).tolist() == ['77380', 'nan', '77380']
+        assert normalize_values(values, ('zip5',)).tolist() == ['77380', 'nan', '77380']
+    
+    def test_numeric_keys_exact_beyond_float_precision(self):
+        from utils.normalizers import normalize_values
+        # 2 ** 53 + 1 is not a float64; the decimals make the column non-integer
+        text = pd.Series(['9007199254740993', '9007199254740992', '09007199254740993', '3.50'])
+        
+        assert normalize_values(text, ('strip',)).tolist() == [
+            '9007199254740993', '9007199254740992', '09007199254740993', '3.5'
+        ]
+        assert normalize_values(text, ('number',)).tolist() == [
+            '9007199254740993', '9007199254740992', '9007199254740993', '3.5'
+        ]
+        
+        df1 = pd.DataFrame({'controlno': [9007199254740993, 9007199254740992]})
+        df2 = pd.DataFrame({'CONTROLNO': ['9007199254740992', '2.5']})
+        result = compare_datasets(df1, df2, {'controlno': 'CONTROLNO'})
+        assert result['mismatches']['controlno (Accuzip)'].tolist() == [9007199254740993]
+
+
+class TestFuzzyMatch:
+    """Test blocked fuzzy matching."""
+    
+    def test_fuzzy_match_scores_within_blocks(self):
+        from utils.fuzzy_match import fuzzy_match
+        left = [np.array(['john smith', 'mary jones', 'ann lee'], dtype=object),
+                np.array(['1', '2', '3'], dtype=object)]
+        right = [np.array(['john a. smith', 'mary jones', 'ann b lee', 'ann lee'], dtype=object),
+                 np.array(['1', '9', '3', '4'], dtype=object)]
+        
+        matches = fuzzy_match(left, right, [True, False], threshold=0.6)
+        
+        assert matches.left.tolist() == [True, False, True]
+        assert matches.right.tolist() == [True, False, True, False]
+    
+    def test_fuzzy_match_is_one_to_one(self):
+        from utils.fuzzy_match import fuzzy_match
+        left = [np.array(['john smith', 'john a smith'], dtype=object)]
+        
+        single = fuzzy_match(left, [np.array(['john a smith'], dtype=object)], [True], threshold=0.6)
+        assert single.left.tolist() == [False, True]
+        assert single.right.tolist() == [True]
+        
+        # The record that lost its best match takes its next best one
+        right = [np.array(['john a smith', 'john b smith'], dtype=object)]
+        both = fuzzy_match(left, right, [True], threshold=0.5)
+        assert both.left.tolist() == [True, True]
+        assert both.right.tolist() == [True, True]
+    
+    def test_fuzzy_match_skips_oversized_blocks(self, monkeypatch):
+        import config
+        from utils.fuzzy_match import fuzzy_match
+        monkeypatch.setattr(config, 'FUZZY_MAX_BLOCK_PAIRS', 3)
+        left = [np.array(['main st', 'main st', 'oak ave'], dtype=object)]
+        right = [np.array(['main street', 'main st', 'oak avenue'], dtype=object)]
+        
+        matches = fuzzy_match(left, right, [True])
+        
+        assert matches.left.tolist() == [False, False, True]
 
 
 class TestImbValidator:
@@ -133,6 +559,635 @@ class TestImbValidator:
         assert result[1] == True
         assert result[2] == False
         assert result[3] == False
+    
+    def test_validate_imb_column_decodes_and_compares_zip(self, monkeypatch, tmp_path):
+        isolate_decode_cache(monkeypatch, tmp_path)
+        df = pd.DataFrame({
+            'imb': [KNOWN_IMB, KNOWN_IMB, "A" * 64, "A" * 65],
+            'zip': ['77382', '12345', '77382', '77382'],
+        })
+        
+        result = validate_imb_column(df, 'imb', 'zip')
+        
+        assert result['decode_stats']['failed'] == 1
+        assert result['decode_stats']['cache_hits'] == 0
+        assert result['valid_imbs'] == 3
+        assert result['matching_zips'] == 1
+        assert result['results_df']['decoded_zip'].tolist() == [
+            '77382-1482', '77382-1482', '', 'N/A'
+        ]
+    
+    def test_imb_format_matrix_checks_length_and_alphabet(self):
+        codes = np.array([KNOWN_IMB, "A" * 64, "A" * 64 + "X", "A" * 64 + "é", "T" * 66], dtype=object)
+        
+        valid, matrix = imb_format_matrix(codes)
+        
+        assert valid.tolist() == [True, False, False, False, False]
+        assert matrix.shape == (5, 65)
+        assert bytes(matrix[0]) == KNOWN_IMB.encode()
+        assert not matrix[1:].any()
+    
+    def test_validate_imb_column_merges_whitespace_and_keeps_row_order(self):
+        df = pd.DataFrame(
+            {'imb': [f" {KNOWN_IMB} ", None, KNOWN_IMB, "A" * 65], 'zip': ['77382', '77382', '1', '77382']},
+            index=[7, 7, 3, 3],
+        )
+        
+        result = validate_imb_column(df, 'imb', 'zip', use_cache=False)
+        
+        results_df = result['results_df']
+        assert results_df.index.tolist() == [7, 7, 3, 3]
+        assert results_df['imb_valid'].tolist() == [True, False, True, True]
+        assert results_df['decoded_zip'].tolist() == ['77382-1482', '', '77382-1482', 'N/A']
+        assert results_df['zip_match'].tolist() == [True, False, False, False]
+        assert result['decode_stats']['unique_codes'] == 2
+    
+    def test_validate_imb_column_reports_decode_stats(self, monkeypatch, tmp_path):
+        isolate_decode_cache(monkeypatch, tmp_path)
+        df = pd.DataFrame({'imb': ["A" * 65, "D" * 65]})
+        
+        cold = validate_imb_column(df, 'imb')['decode_stats']
+        warm = validate_imb_column(df, 'imb')['decode_stats']
+        
+        assert cold['batch_rows'] == warm['batch_rows'] == 2
+        assert cold['direct'] == warm['direct'] == 0
+        assert (cold['failed'], cold['cache_hits']) == (2, 0)
+        assert (warm['failed'], warm['cache_hits']) == (0, 2)
+    
+    def test_validate_imb_column_caches_per_repair_budget(self, monkeypatch, tmp_path):
+        isolate_decode_cache(monkeypatch, tmp_path)
+        df = pd.DataFrame({'imb': ["A" * 65]})
+        
+        validate_imb_column(df, 'imb', repair_budget='full')
+        other_budget = validate_imb_column(df, 'imb', repair_budget='off')['decode_stats']
+        same_budget = validate_imb_column(df, 'imb', repair_budget='full')['decode_stats']
+        
+        assert (other_budget['failed'], other_budget['cache_hits']) == (1, 0)
+        assert (same_budget['failed'], same_budget['cache_hits']) == (0, 1)
+    
+    def test_validate_imb_column_decodes_each_code_once(self):
+        df = pd.DataFrame({'imb': [KNOWN_IMB] * 5 + ["A" * 65] * 3})
+        
+        result = validate_imb_column(df, 'imb', use_cache=False)
+        stats = result['decode_stats']
+        
+        assert stats['unique_codes'] == 2
+        assert stats['batch_rows'] == 2
+        assert stats['failed'] == 1
+        assert result['results_df']['decoded_zip'].tolist() == ['77382-1482'] * 5 + ['N/A'] * 3
+    
+    def test_validate_imb_column_leaves_decoder_defaults_unchanged(self):
+        from utils import usps_imb_decoder
+        level = usps_imb_decoder.logger.level
+        df = pd.DataFrame({'imb': ["A" * 65]})
+        
+        result = validate_imb_column(df, 'imb', trace=True, use_cache=False, repair_budget='off')
+        
+        assert result['decode_stats']['failed'] == 1
+        assert usps_imb_decoder.get_repair_budget() == 'full'
+        assert usps_imb_decoder._tracing() is False
+        assert usps_imb_decoder.logger.level == level
+        with pytest.raises(ValueError):
+            validate_imb_column(df, 'imb', repair_budget='some')
+    
+    def test_validate_imb_column_parallel_matches_serial(self, monkeypatch):
+        import config
+        monkeypatch.setattr(config, 'IMB_PARALLEL_CHUNK_SIZE', 2)
+        monkeypatch.setattr(config, 'IMB_PARALLEL_WORKERS', 2)
+        df = pd.DataFrame({
+            'imb': [KNOWN_IMB, "A" * 65, "D" * 65, "F" * 65, KNOWN_IMB, "T" * 65],
+            'zip': ['77382'] * 6,
+        })
+        
+        serial = validate_imb_column(df, 'imb', 'zip', use_cache=False, parallel=False)
+        parallel = validate_imb_column(df, 'imb', 'zip', use_cache=False, parallel=True)
+        
+        pd.testing.assert_frame_equal(serial['results_df'], parallel['results_df'])
+        assert parallel['matching_zips'] == serial['matching_zips'] == 2
+        assert parallel['decode_stats']['failed'] == serial['decode_stats']['failed']
+
+
+class TestImbDecodeCache:
+    """Test the persistent IMB decode cache."""
+    
+    def test_round_trip_and_persistence(self, tmp_path):
+        cache = DecodeCache(str(tmp_path), max_entries=10)
+        cache.put_many({'code1': ('12345-6789', '12345'), 'code2': ('N/A', '')}, 'v1')
+        
+        reopened = DecodeCache(str(tmp_path), max_entries=10)
+        
+        assert reopened.get_many(['code1', 'code2', 'code3'], 'v1') == {
+            'code1': ('12345-6789', '12345'),
+            'code2': ('N/A', ''),
+        }
+    
+    def test_ignores_entries_of_other_versions(self, tmp_path):
+        cache = DecodeCache(str(tmp_path), max_entries=10)
+        cache.put_many({'code1': ('N/A', '')}, 'v1/off')
+        cache.put_many({'code1': ('12345', '12345')}, 'v1/full')
+        
+        assert cache.get_many(['code1'], 'v1/full') == {'code1': ('12345', '12345')}
+        assert cache.get_many(['code1'], 'v1/off') == {'code1': ('N/A', '')}
+        assert cache.get_many(['code1'], 'v2/full') == {}
+    
+    def test_discards_unversioned_cache_file(self, tmp_path):
+        import sqlite3
+        conn = sqlite3.connect(tmp_path / DecodeCache.FILE_NAME)
+        conn.execute(
+            "CREATE TABLE imb_decode (code TEXT PRIMARY KEY, full_zip TEXT NOT NULL, "
+            "zip5 TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        conn.execute("INSERT INTO imb_decode VALUES ('code1', '12345', '12345', 0)")
+        conn.commit()
+        conn.close()
+        
+        cache = DecodeCache(str(tmp_path), max_entries=10)
+        
+        assert len(cache) == 0
+        cache.put_many({'code1': ('N/A', '')}, 'v1')
+        assert cache.get_many(['code1'], 'v1') == {'code1': ('N/A', '')}
+    
+    def test_evicts_least_recently_used(self, tmp_path):
+        import time
+        cache = DecodeCache(str(tmp_path), max_entries=2)
+        cache.put_many({'a': ('1', '1')}, 'v1')
+        time.sleep(0.01)
+        cache.put_many({'b': ('2', '2')}, 'v1')
+        time.sleep(0.01)
+        cache.get_many(['a'], 'v1')
+        time.sleep(0.01)
+        cache.put_many({'c': ('3', '3')}, 'v1')
+        
+        assert len(cache) == 2
+        assert set(cache.get_many(['a', 'b', 'c'], 'v1')) == {'a', 'c'}
+
+
+class TestImbDecoder:
+    """Test the USPS IMB decoder."""
+    
+    def test_decode_barcode_known_imb(self):
+        decoded = decode_barcode(KNOWN_IMB)
+        assert decoded['zip'] == '77382'
+        assert decoded['plus4'] == '1482'
+    
+    def test_batch_decode_matches_scalar_decode(self):
+        codes = [KNOWN_IMB, "A" * 65, KNOWN_IMB[:64], KNOWN_IMB.replace('T', 'X', 1)]
+        
+        batch = decode_barcodes_batch(codes)
+        
+        assert batch['success'].tolist() == [True, False, False, False]
+        expected = decode_barcode(KNOWN_IMB)
+        for field in BATCH_FIELDS:
+            assert batch[field][0] == expected.get(field, '')
+            assert batch[field][1] == ''
+    
+    def test_batch_decode_empty_input(self):
+        batch = decode_barcodes_batch([])
+        assert len(batch['success']) == 0
+    
+    def test_shipped_codeword_tables_match_definition(self):
+        from utils.imb_tables import INVALID, build_codeword_tables, get_codeword_tables
+        
+        tables = get_codeword_tables()
+        
+        assert tables == build_codeword_tables()
+        assert tables.decode.count(INVALID) == 8192 - 2 * 1365
+        assert all(tables.decode[c] == cw for cw, c in enumerate(tables.encode))
+    
+    def test_native_decode_matches_word_array_decode(self):
+        from utils.usps_imb_decoder import decode_chars, decode_chars_words, text_to_chars
+        from utils.imb_tables import get_codeword_tables
+        
+        rng = np.random.default_rng(3)
+        encode = get_codeword_tables().encode
+        tracking = [f"{rng.integers(0, 10)}{rng.integers(0, 5)}{rng.integers(0, 10**18):018d}"
+                    for _ in range(300)]
+        routing = [f"{rng.integers(0, 10**11):011d}"[:length]
+                   for length in rng.choice([0, 5, 9, 11], 300)]
+        corpus = []
+        for code in encode_barcodes_batch(tracking, routing):
+            chars = text_to_chars(code)
+            damaged = list(chars)
+            damaged[rng.integers(0, 10)] ^= 1 << int(rng.integers(0, 13))
+            corpus += [chars, damaged, [encode[i] for i in rng.integers(0, 1365, 10)]]
+        
+        assert [decode_chars(list(c)) for c in corpus] == [decode_chars_words(list(c)) for c in corpus]
+        assert sum(decode_chars(c) is not None for c in corpus) >= 300
+    
+    @pytest.mark.parametrize("budget,damaged_bar,missing_bar", [
+        ('off', False, False),
+        ('single-bit', True, False),
+        ('full', True, True),
+    ])
+    def test_repair_budget_limits_repairs(self, budget, damaged_bar, missing_bar):
+        from utils.usps_imb_decoder import set_repair_budget
+        
+        position = KNOWN_IMB.index('T')
+        damaged = KNOWN_IMB[:position] + 'D' + KNOWN_IMB[position + 1:]
+        missing = KNOWN_IMB[:10] + KNOWN_IMB[11:]
+        
+        set_repair_budget(budget)
+        try:
+            assert decode_barcode(KNOWN_IMB)['zip'] == '77382'
+            assert (decode_barcode(damaged).get('zip') == '77382') == damaged_bar
+            assert (decode_barcode(missing).get('zip') == '77382') == missing_bar
+        finally:
+            set_repair_budget('full')
+    
+    def test_set_repair_budget_rejects_unknown_budget(self):
+        from utils.usps_imb_decoder import set_repair_budget, get_repair_budget
+        
+        with pytest.raises(ValueError):
+            set_repair_budget('some')
+        assert get_repair_budget() == 'full'
+    
+    def test_decode_options_apply_to_calling_thread_only(self):
+        import threading
+        from utils.usps_imb_decoder import decode_options, get_repair_budget
+        entered, release = threading.Event(), threading.Event()
+        seen = []
+        
+        def decode_without_repair():
+            with decode_options(repair_budget='off'):
+                seen.append(get_repair_budget())
+                entered.set()
+                release.wait(5)
+        
+        worker = threading.Thread(target=decode_without_repair)
+        worker.start()
+        entered.wait(5)
+        seen.append(get_repair_budget())
+        release.set()
+        worker.join()
+        
+        assert seen == ['off', 'full']
+    
+    def test_encode_barcode_known_imb(self):
+        assert encode_barcode('00271903693059356779', '77382148200') == KNOWN_IMB
+    
+    def test_encode_barcode_rejects_invalid_input(self):
+        with pytest.raises(ValueError):
+            encode_barcode('0027190369305935677', '77382')
+        with pytest.raises(ValueError):
+            encode_barcode('05271903693059356779', '77382')
+        with pytest.raises(ValueError):
+            encode_barcode('00271903693059356779', '773821')
+    
+    def test_batch_encode_matches_scalar_encode(self):
+        rng = np.random.default_rng(7)
+        tracking = [
+            f"{rng.integers(0, 10)}{rng.integers(0, 5)}" + ''.join(map(str, rng.integers(0, 10, 18)))
+            for _ in range(200)
+        ]
+        routing = [
+            ''.join(map(str, rng.integers(0, 10, length)))
+            for length in rng.choice([0, 5, 9, 11], 200)
+        ]
+        
+        batch = encode_barcodes_batch(tracking + ['12'], routing + ['77382'])
+        
+        assert list(batch[:-1]) == [encode_barcode(t, r) for t, r in zip(tracking, routing)]
+        assert batch[-1] == ''
+        decoded = decode_barcodes_batch(list(batch[:-1]))
+        assert decoded['success'].all()
+        assert [f"{b}{s}{m}{n}" for b, s, m, n in zip(
+            decoded['barcode_id'], decoded['service_type'], decoded['mailer_id'], decoded['serial_num']
+        )] == tracking
+    
+    def test_regenerate_imb_codes_uses_record_zip(self):
+        codes = pd.Series([KNOWN_IMB, KNOWN_IMB, 'not a barcode'])
+        zips = pd.Series(['77382-1482', '10001', '77382'])
+        
+        regenerated = regenerate_imb_codes(codes, zips)
+        
+        assert regenerated[0] == encode_barcode('00271903693059356779', '773821482')
+        assert decode_barcode(regenerated[1])['zip'] == '10001'
+        assert regenerated[2] == ''
+
+
+class TestUploadCache:
+    """Test the parsed upload cache."""
+    
+    def test_file_digest_restores_position(self):
+        import io
+        buf = io.BytesIO(b"a,b\n1,2\n")
+        buf.seek(3)
+        digest = file_digest(buf)
+        assert buf.tell() == 3
+        assert digest == file_digest(io.BytesIO(b"a,b\n1,2\n"))
+        assert digest != file_digest(io.BytesIO(b"a,b\n1,3\n"))
+    
+    def test_cache_key_includes_options(self):
+        key1 = make_cache_key('csv', ('abc',), usecols=['a'])
+        key2 = make_cache_key('csv', ('abc',), usecols=['b'])
+        assert key1 != key2
+        assert key1 == make_cache_key('csv', ('abc',), usecols=['a'])
+    
+    def test_lru_eviction_by_entries(self):
+        cache = UploadCache(max_bytes=10 ** 9, max_entries=2)
+        for name in ['a', 'b']:
+            cache.put(name, pd.DataFrame({'x': [1]}))
+        cache.get('a')
+        cache.put('c', pd.DataFrame({'x': [1]}))
+        
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.get('c') is not None
+    
+    def test_eviction_by_memory_budget(self):
+        df = pd.DataFrame({'x': range(1000)})
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        cache = UploadCache(max_bytes=size * 2, max_entries=10)
+        
+        cache.put('a', df)
+        cache.put('b', df.copy())
+        cache.put('c', df.copy())
+        
+        assert len(cache) == 2
+        assert cache.total_bytes <= size * 2
+        assert cache.get('a') is None
+
+
+class TestStreamingReader:
+    """Test chunked CSV ingestion."""
+    
+    CSV = b"id,name,rate\n" + b"".join(
+        f"{i},name{i % 7},{i / 100}\n".encode() for i in range(1000)
+    )
+    
+    def test_streaming_matches_full_read_with_spilling(self, tmp_path):
+        import io
+        expected = pd.read_csv(io.BytesIO(self.CSV))
+        
+        df = read_csv_streaming(io.BytesIO(self.CSV), chunk_rows=64,
+                                memory_budget=2048, spill_dir=str(tmp_path))
+        
+        assert df['id'].dtype.itemsize < expected['id'].dtype.itemsize
+        pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+        assert list(tmp_path.iterdir()) == []
+    
+    def test_streaming_projects_columns(self):
+        import io
+        df = read_csv_streaming(io.BytesIO(self.CSV), usecols=['name', 'missing'], chunk_rows=100)
+        
+        assert list(df.columns) == ['name']
+        assert len(df) == 1000
+    
+    def test_streaming_column_changing_type_across_chunks(self, tmp_path):
+        import io
+        # Integer ZIPs in the first chunks, then a text one; the budget
+        # buffers chunks of both types into one spilled part
+        csv = "id,zip\n" + "".join(f"{i},{77380 + i}\n" for i in range(4)) + "4,7738A\n5,\n"
+        
+        df = read_csv_streaming(io.BytesIO(csv.encode()), chunk_rows=2,
+                                memory_budget=50, spill_dir=str(tmp_path))
+        
+        assert df['zip'].iloc[:5].tolist() == ['77380', '77381', '77382', '77383', '7738A']
+        assert df['zip'].isna().tolist() == [False] * 5 + [True]
+        assert df['id'].tolist() == list(range(6))
+    
+    def test_ingest_failure_is_not_skipped(self, monkeypatch):
+        import config
+        monkeypatch.setattr(config, 'INGEST_STREAMING', True)
+        monkeypatch.setattr(config, 'INGEST_MEMORY_BUDGET_BYTES', 0)
+        
+        def fail_spill(store):
+            raise OSError('disk full')
+        monkeypatch.setattr(ChunkStore, '_spill', fail_spill)
+        
+        with pytest.raises(FileProcessingError, match='disk full'):
+            process_uploaded_files([NamedBytesIO(b"spill_id\n1\n2\n", 'spill.csv')])
+    
+    def test_unexpected_parse_error_skips_only_that_file(self, monkeypatch):
+        from utils import file_processor
+        parse_csv = file_processor._parse_csv
+        
+        def parse_or_fail(source, *args):
+            df = parse_csv(source, *args)
+            if 'odd' in df.columns:
+                raise ValueError('could not convert column')
+            return df
+        monkeypatch.setattr(file_processor, '_parse_csv', parse_or_fail)
+        reporter = RecordingReporter()
+        set_reporter(reporter)
+        try:
+            df, processed = process_uploaded_files([NamedBytesIO(b"odd\n1\n", 'odd.csv'),
+                                                    NamedBytesIO(b"good\n2\n", 'good.csv')])
+        finally:
+            set_reporter(IngestReporter())
+        
+        assert processed == 1
+        assert df['good'].tolist() == [2]
+        assert any(kind == 'error' and 'odd.csv' in message for kind, message in reporter.events)
+    
+    def test_chunk_store_keeps_order_across_spills(self, tmp_path):
+        store = ChunkStore(memory_budget=1, spill_dir=str(tmp_path))
+        for start in range(0, 30, 10):
+            store.append(pd.DataFrame({'x': range(start, start + 10)}))
+        
+        assert store.spilled
+        assert store.to_frame()['x'].tolist() == list(range(30))
+
+
+class NamedBytesIO(io.BytesIO):
+    """In-memory upload with a file name, like Streamlit's UploadedFile."""
+    
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+
+
+class TestColumnProjection:
+    """Test loading only the required columns of uploads."""
+    
+    CSV_A = b"first,last,notes\nAnn,Lee,x\nAnn,Lee,x\nBob,Ray,y\n"
+    CSV_B = b"last,zip,notes\nKim,12345,z\n"
+    
+    def _uploads(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as z:
+            z.writestr('b.csv', self.CSV_B)
+        return [NamedBytesIO(self.CSV_A, 'a.csv'), NamedBytesIO(buffer.getvalue(), 'b.zip')]
+    
+    def test_sniff_headers_reads_csv_and_zip_members(self):
+        files = self._uploads()
+        
+        assert sniff_headers(files) == ['first', 'last', 'notes', 'zip']
+        assert all(f.tell() == 0 for f in files)
+    
+    def test_required_columns_skip_unused(self):
+        assert get_required_columns(['first', 'notes', 'zip', 'rate_std']) == ['first', 'zip', 'rate_std']
+    
+    def test_projected_load_and_extra_columns_align(self):
+        files = self._uploads()
+        df, processed = process_uploaded_files(files, usecols=['first', 'last'])
+        
+        assert processed == 2
+        assert list(df.columns) == ['first', 'last']
+        assert len(df) == 3
+        
+        extended = load_extra_columns(files, df, ['notes', 'missing'])
+        assert list(extended.columns) == ['first', 'last', 'notes']
+        assert extended['last'].tolist() == ['Lee', 'Ray', 'Kim']
+        assert extended['notes'].tolist() == ['x', 'y', 'z']
+
+    
+    @pytest.mark.parametrize('streaming', [True, False])
+    def test_parallel_load_keeps_upload_order(self, monkeypatch, streaming):
+        import config
+        monkeypatch.setattr(config, 'INGEST_PARALLEL_ENABLED', True)
+        monkeypatch.setattr(config, 'INGEST_PARALLEL_WORKERS', 4)
+        monkeypatch.setattr(config, 'INGEST_STREAMING', streaming)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as z:
+            for i in range(5):
+                z.writestr(f'part{i}.csv', f"n,member\n{i},{i}\n{i},{i}x\n")
+        files = [NamedBytesIO(buffer.getvalue(), f'order-{streaming}.zip'),
+                 NamedBytesIO(b"n,member\n9,last\n", f'order-{streaming}.csv')]
+        
+        df, processed = process_uploaded_files(files)
+        
+        assert processed == 6
+        assert df['n'].tolist() == [0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 9]
+    
+    @pytest.mark.parametrize('streaming', [True, False])
+    def test_projected_load_removes_full_row_duplicates_only(self, monkeypatch, streaming):
+        import config
+        monkeypatch.setattr(config, 'INGEST_STREAMING', streaming)
+        files = [NamedBytesIO(b"first,last,seq\nAnn,Lee,1\nAnn,Lee,2\nAnn,Lee,1\n", f'seq-{streaming}.csv'),
+                 NamedBytesIO(b"seq,last,first\n2.0,Lee,Ann\n3.5,Lee,Ann\n", f'seq-{streaming}-b.csv')]
+        
+        df, _ = process_uploaded_files(files, usecols=['first', 'last'])
+        
+        # Rows differing only in the unloaded 'seq' column are kept
+        assert list(df.columns) == ['first', 'last']
+        assert df.index.tolist() == [0, 1, 4]
+    
+    def test_projected_load_keeps_rows_with_colliding_row_hashes(self, monkeypatch):
+        from utils import streaming_reader
+        monkeypatch.setattr(streaming_reader, 'hash_rows', lambda df: np.zeros(len(df), dtype=np.uint64))
+        files = [NamedBytesIO(b"first,last,seq\nAnn,Lee,7\nAnn,Lee,8\nAnn,Lee,7\n", 'collide.csv')]
+        
+        df, _ = process_uploaded_files(files, usecols=['first', 'last'])
+        
+        # All rows share a row hash; only the real duplicate is removed
+        assert df.index.tolist() == [0, 1]
+    
+    def test_zip_members_read_without_copying_archive(self, monkeypatch):
+        import config
+        monkeypatch.setattr(config, 'INGEST_PARALLEL_ENABLED', True)
+        monkeypatch.setattr(config, 'INGEST_PARALLEL_WORKERS', 3)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as z:
+            for i in range(3):
+                z.writestr(f'm{i}.csv', "m,n\n" + "".join(f"{i},{j}\n" for j in range(500)))
+        upload = NamedBytesIO(buffer.getvalue(), 'nocopy.zip')
+        monkeypatch.setattr(upload, 'getvalue', lambda: pytest.fail('archive bytes copied'))
+        
+        df, processed = process_uploaded_files([upload])
+        
+        assert processed == 3
+        assert len(df) == 1500
+        assert upload.tell() == 0
+    
+    def test_duplicates_removed_on_key_columns(self, monkeypatch):
+        import config
+        monkeypatch.setattr(config, 'DEDUP_KEY_COLUMNS', ['id'])
+        files = [NamedBytesIO(b"id,note\n1,a\n2,b\n1,c\n", 'dedup-keys.csv')]
+        
+        df, _ = process_uploaded_files(files)
+        
+        assert df['note'].tolist() == ['a', 'b']
+        assert df.index.tolist() == [0, 1]
+
+
+class RecordingReporter(IngestReporter):
+    """Reporter collecting events for assertions."""
+    
+    def __init__(self):
+        self.events = []
+    
+    def debug(self, message):
+        self.events.append(('debug', message))
+    
+    def warning(self, message):
+        self.events.append(('warning', message))
+    
+    def error(self, message):
+        self.events.append(('error', message))
+
+
+class TestIngestReporting:
+    """Test that ingestion reports through the pluggable reporter."""
+    
+    def test_reporter_receives_warnings_and_errors(self):
+        reporter = RecordingReporter()
+        set_reporter(reporter)
+        try:
+            files = [
+                NamedBytesIO(b"a,b\n1,2\n", 'report-ok.csv'),
+                NamedBytesIO(b"x", 'notes.txt'),
+                NamedBytesIO(b"not a zip", 'broken.zip'),
+            ]
+            df, processed = process_uploaded_files(files)
+        finally:
+            set_reporter(IngestReporter())
+        
+        kinds = [kind for kind, _ in reporter.events]
+        assert processed == 1
+        assert ('warning', "Skipping unsupported file: notes.txt (Only .csv and .zip files are supported)") in reporter.events
+        assert ('error', "Invalid ZIP file: broken.zip") in reporter.events
+        assert kinds.count('debug') > 0
+    
+    def test_ingestion_does_not_import_streamlit(self):
+        import subprocess
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = "import sys, utils.file_processor, cli; print('streamlit' in sys.modules)"
+        
+        output = subprocess.run([sys.executable, '-c', code], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+        
+        assert output.strip() == 'False'
+
+
+class TestBenchmarks:
+    """Test the synthetic job generator and benchmark runner."""
+    
+    def test_generated_job_rates(self):
+        from benchmarks.synthetic import JobSpec, generate_job
+        spec = JobSpec(rows=2000, width=20, duplicate_rate=0.05, mismatch_rate=0.1, seed=3)
+        
+        accuzip, client = generate_job(spec)
+        
+        assert accuzip.shape == (2100, 20)
+        assert accuzip.duplicated().sum() == 100
+        mapping = {'controlno': 'CONTROLNO', 'ADDRESS': 'address'}
+        missing = compare_datasets(accuzip.drop_duplicates(), client, mapping)['missing_records']
+        assert 100 < missing < 300
+    
+    def test_mixed_dtype_job_matches_like_plain_job(self):
+        from benchmarks.synthetic import JobSpec, generate_job
+        mapping = {'controlno': 'CONTROLNO', 'ZIP': 'zip', 'ADDRESS': 'address'}
+        
+        plain = compare_datasets(*generate_job(JobSpec(rows=1000, seed=5)), mapping)
+        accuzip, client = generate_job(JobSpec(rows=1000, seed=5, mixed_dtypes=True))
+        mixed = compare_datasets(accuzip, client, mapping)
+        
+        assert client['CONTROLNO'].dtype == 'float64'
+        assert mixed['missing_records'] == plain['missing_records']
+    
+    def test_run_benchmark_reports_all_stages(self, tmp_path):
+        from benchmarks.synthetic import JobSpec
+        from benchmarks.run import run_benchmark, STAGES
+        
+        result = run_benchmark(JobSpec(rows=300, file_format='csv'), repeat=1,
+                               workdir=str(tmp_path), memory=True)
+        
+        assert set(result['timings']) == set(STAGES)
+        assert all(result['timings'][stage]['peak_mb'] > 0 for stage in STAGES)
+        assert result['rows']['accuzip'] == 300
+        assert result['counts']['valid_imbs'] > 270
+        assert list(tmp_path.iterdir()) == []
 
 
 class TestStreetViewProcessor:
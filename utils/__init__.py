@@ -1,42 +1,51 @@
 """
 Utility modules for PostPros Job Checker.
+
+Exports are imported lazily on first access, so importing one submodule
+(e.g. from the batch CLI or a worker process) does not import the others
+or Streamlit.
 """
-from .file_processor import process_uploaded_files, FileProcessingError
-from .data_validator import compare_datasets, find_column_by_keywords, get_default_columns
-from .imb_validator import validate_imb_column, decode_imb, is_valid_imb_format
-from .streetview_processor import display_streetview_cards, get_streetview_url
-from .html_utils import (
-    escape,
-    format_number,
-    get_percentage_color,
-    record_counts_html,
-    match_results_html,
-    seed_results_container_html,
-    seed_result_html,
-    postal_rate_metrics_html,
-    imb_validation_metrics_html,
-    streetview_card_html
-)
+import importlib
+
+# Exported name -> submodule defining it
+_EXPORTS = {
+    'process_uploaded_files': 'file_processor',
+    'FileProcessingError': 'file_processor',
+    'IngestReporter': 'file_processor',
+    'set_reporter': 'file_processor',
+    'compare_datasets': 'data_validator',
+    'find_column_by_keywords': 'data_validator',
+    'get_default_columns': 'data_validator',
+    'search_seed_records': 'analysis',
+    'postal_rate_statistics': 'analysis',
+    'validate_imb_column': 'imb_validator',
+    'decode_imb': 'imb_validator',
+    'is_valid_imb_format': 'imb_validator',
+    'display_streetview_cards': 'streetview_processor',
+    'get_streetview_url': 'streetview_processor',
+    'escape': 'html_utils',
+    'format_number': 'html_utils',
+    'get_percentage_color': 'html_utils',
+    'record_counts_html': 'html_utils',
+    'match_results_html': 'html_utils',
+    'seed_results_container_html': 'html_utils',
+    'seed_result_html': 'html_utils',
+    'postal_rate_metrics_html': 'html_utils',
+    'imb_validation_metrics_html': 'html_utils',
+    'streetview_card_html': 'html_utils',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{_EXPORTS[name]}", __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
 
-__all__ = [
-    'process_uploaded_files',
-    'FileProcessingError',
-    'compare_datasets',
-    'find_column_by_keywords',
-    'get_default_columns',
-    'validate_imb_column',
-    'decode_imb',
-    'is_valid_imb_format',
-    'display_streetview_cards',
-    'get_streetview_url',
-    'escape',
-    'format_number',
-    'get_percentage_color',
-    'record_counts_html',
-    'match_results_html',
-    'seed_results_container_html',
-    'seed_result_html',
-    'postal_rate_metrics_html',
-    'imb_validation_metrics_html',
-    'streetview_card_html',
-]
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
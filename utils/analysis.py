@@ -0,0 +1,87 @@
+"""
+Data analysis utilities shared by the Streamlit app and the batch CLI.
+Seed record search and postal rate statistics.
+"""
+import pandas as pd
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def search_seed_records(df: pd.DataFrame,
+                        searches: Sequence[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Count records containing each search term (case-insensitive).
+
+    Searches with an empty term or a column missing from df are skipped.
+
+    Args:
+        df: DataFrame to search
+        searches: Sequence of (column, search term)
+
+    Returns:
+        List of dictionaries with 'column', 'term' and 'count'
+    """
+    results = []
+    for column, term in searches:
+        if not column or not term or column not in df.columns:
+            continue
+        matches = df[column].astype(str).str.contains(term, case=False, na=False)
+        results.append({
+            'column': column,
+            'term': term,
+            'count': int(matches.sum())
+        })
+    return results
+
+
+def find_rate_column(columns: Sequence[str]) -> Optional[str]:
+    """
+    Find the first column that looks like a postal rate column.
+
+    Args:
+        columns: Column names to search
+
+    Returns:
+        Column name, or None if no column matches RATE_KEYWORDS
+    """
+    from config import RATE_KEYWORDS
+
+    return next(
+        (col for col in columns if any(kw in col.lower() for kw in RATE_KEYWORDS)),
+        None
+    )
+
+
+def postal_rate_statistics(df: pd.DataFrame, rate_col: str) -> Dict[str, float]:
+    """
+    Calculate postal rate statistics for a rate column.
+
+    Non-numeric rates are ignored. Postage is the flat rate for all rated
+    records minus the sum of their rates.
+
+    Args:
+        df: DataFrame containing rate data
+        rate_col: Column name containing postal rates
+
+    Returns:
+        Dictionary with records, total, average, minimum, maximum,
+        flat_rate and postage
+    """
+    from config import FLAT_RATE_PER_RECORD
+
+    rate_data = pd.to_numeric(df[rate_col], errors='coerce')
+    total_records = int(rate_data.count())
+    total_sum = float(rate_data.sum())
+    flat_rate = total_records * FLAT_RATE_PER_RECORD
+
+    return {
+        'records': total_records,
+        'total': total_sum,
+        'average': float(rate_data.mean()),
+        'minimum': float(rate_data.min()),
+        'maximum': float(rate_data.max()),
+        'flat_rate': flat_rate,
+        'postage': flat_rate - total_sum
+    }
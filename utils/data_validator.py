@@ -3,86 +3,218 @@ Data validation utilities for comparing Accuzip and Client datasets.
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+from itertools import combinations
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
 import logging
 
+from .match_keys import (
+    normalize_key_columns, encode_keys, encode_keys_leaving_one_out, encode_keys_leaving_out,
+    keys_present, match_key_ids
+)
+from .fuzzy_match import fuzzy_match, is_fuzzy_column
+from .normalizers import get_normalizer
+from .partitioned_compare import match_partitioned
+
 logger = logging.getLogger(__name__)
 
 
+def _page(positions: np.ndarray, page: int, page_size: int) -> np.ndarray:
+    """Return one page of a position array."""
+    return positions[page * page_size:(page + 1) * page_size]
+
+
+def _suffixed_records(df: pd.DataFrame, positions: np.ndarray, suffix: str,
+                      columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Select rows by position (then columns), with the dataset name appended to every column."""
+    records = df.iloc[positions]
+    if columns is not None:
+        records = records[columns]
+    return records.set_axis([f"{col} ({suffix})" for col in records.columns], axis=1)
+
+
+def _attribute_mismatches(df1_keys: List[np.ndarray], df2_keys: List[np.ndarray],
+                          positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find which mapped columns keep each unmatched Accuzip record from matching.
+    
+    For every mapped column, the keys of the unmatched records and of all
+    client records are encoded without that column; a record whose reduced
+    key exists in the client files differs from a client record in that
+    column only. All records are attributed together, column by column.
+    
+    Records that no single column explains are then tried the same way
+    with every pair of columns left out, when at least one column remains
+    and there are no more than MISMATCH_ATTRIBUTION_MAX_PAIRS pairs.
+    
+    Args:
+        df1_keys: Normalized mapped columns of the Accuzip data
+        df2_keys: Normalized mapped columns of the client data
+        positions: Positions of the unmatched Accuzip records
+        
+    Returns:
+        Tuple of (boolean array of shape (len(positions), number of mapped
+        columns) marking differing columns, boolean array marking the
+        records that differ in two columns)
+    """
+    from config import MISMATCH_ATTRIBUTION_MAX_PAIRS
+    
+    unmatched_keys = [values[positions] for values in df1_keys]
+    encoded = encode_keys_leaving_one_out(unmatched_keys, df2_keys)
+    differing = np.column_stack([keys_present(left, right) for left, right in encoded])
+    two_columns = np.zeros(len(positions), dtype=bool)
+    
+    pairs = list(combinations(range(len(df1_keys)), 2)) if len(df1_keys) > 2 else []
+    remaining = np.flatnonzero(~differing.any(axis=1))
+    if len(pairs) > MISMATCH_ATTRIBUTION_MAX_PAIRS:
+        logger.info(f"Skipping two-column attribution of {len(df1_keys)} mapped columns")
+    elif pairs and len(remaining):
+        remaining_keys = [values[remaining] for values in unmatched_keys]
+        encoded = encode_keys_leaving_out(remaining_keys, df2_keys, pairs)
+        for pair, (left, right) in zip(pairs, encoded):
+            attributed = remaining[keys_present(left, right)]
+            differing[np.ix_(attributed, pair)] = True
+            two_columns[attributed] = True
+    
+    return differing, two_columns
+
+
 def compare_datasets(df1: pd.DataFrame, df2: pd.DataFrame, 
-                     column_mapping: Dict[str, str]) -> Dict[str, Any]:
+                     column_mapping: Dict[str, str],
+                     page: int = 0, page_size: Optional[int] = None,
+                     fuzzy: Optional[bool] = None,
+                     out_of_core: Optional[bool] = None) -> Dict[str, Any]:
     """
     Compare datasets to ensure all Accuzip records exist in client files.
-    Uses vectorized operations for better performance.
+    Composite keys are hashed in vectorized passes and collision-checked,
+    so no per-row Python work is done.
+    
+    Both directions and duplicate counts come from the same pass: every
+    key is counted on each side, so Accuzip-only records, client-only
+    records and keys whose number of records differs between the files
+    (multiset comparison) are found together.
+    
+    With fuzzy matching, records left unmatched on both sides are paired
+    by similarity of their name and address columns (see fuzzy_match),
+    and paired records count as matching.
+    
+    Out of core, the match keys are hash-partitioned to local disk and
+    matched partition by partition (see match_partitioned); the counts and
+    detail pages are the same, but fuzzy matching and mismatch attribution
+    are not run.
     
     Args:
         df1: Accuzip DataFrame
         df2: Client DataFrame
         column_mapping: Dictionary mapping Accuzip columns to Client columns
+        page: Page of the detail tables to return (0-based)
+        page_size: Rows per detail page (defaults to MAX_MISMATCH_DISPLAY)
+        fuzzy: Fuzzy match name and address columns (defaults to FUZZY_MATCH_ENABLED)
+        out_of_core: Match with bounded memory (defaults to COMPARE_OUT_OF_CORE)
         
     Returns:
         Dictionary containing comparison results with keys:
         - total_records: Total records in Accuzip file
         - matching_records: Records that exist in both files
         - missing_records: Records missing from client file
-        - mismatches: DataFrame of missing records (limited for display)
+        - mismatches: DataFrame of missing records (one page)
+        - client_records: Total records in client files
+        - client_only_records: Client records missing from Accuzip file
+        - client_only: DataFrame of client-only records (one page)
+        - count_mismatch_keys: Keys present in both files with different counts
+        - count_mismatches: DataFrame of those keys with both counts (one page)
+        - unmatched_accuzip_records / unmatched_client_records: Records left
+          over on each side when records are paired key by key
+        - near_miss_records: Missing records that match a client record in
+          all mapped columns but one (with MISMATCH_ATTRIBUTION_ENABLED)
+        - mismatch_columns: Accuzip column -> number of missing records
+          that differ from a client record in that column only
+        - two_column_near_miss_records: Missing records that are not near
+          misses but match a client record in all mapped columns but two
+        - mismatch_column_pairs: Differing columns (comma-separated) ->
+          number of those records
+        - fuzzy_matched_records: Accuzip records matched only by fuzzy matching
     """
-    from config import MAX_MISMATCH_DISPLAY
+    from config import (
+        MAX_MISMATCH_DISPLAY, MISMATCH_ATTRIBUTION_ENABLED, FUZZY_MATCH_ENABLED, COMPARE_OUT_OF_CORE
+    )
+    
+    page_size = MAX_MISMATCH_DISPLAY if page_size is None else page_size
+    fuzzy = FUZZY_MATCH_ENABLED if fuzzy is None else fuzzy
+    out_of_core = COMPARE_OUT_OF_CORE if out_of_core is None else out_of_core
+    attribution = MISMATCH_ATTRIBUTION_ENABLED
     
     logger.info(f"Comparing datasets: {len(df1)} Accuzip records, {len(df2)} Client records")
     logger.debug(f"Column mapping: {column_mapping}")
     
-    # Create copies to avoid modifying original dataframes
-    df1_comp = df1.copy()
-    df2_comp = df2.copy()
-    
-    # Add suffixes to all columns for clarity
-    df1_comp.columns = [f"{col} (Accuzip)" for col in df1_comp.columns]
-    df2_comp.columns = [f"{col} (Client)" for col in df2_comp.columns]
-    
-    # Get mapped column names with suffixes
-    source_cols = [f"{col} (Accuzip)" for col in column_mapping.keys()]
-    target_cols = [f"{col} (Client)" for col in column_mapping.values()]
-    
-    # Select only mapped columns for comparison
-    df1_match = df1_comp[source_cols].copy()
-    df2_match = df2_comp[target_cols].copy()
-    
-    # Convert all comparison columns to string type for consistent matching
-    # Using vectorized operations instead of iterating
-    for col in df1_match.columns:
-        df1_match[col] = df1_match[col].astype(str).str.strip().str.lower()
-    for col in df2_match.columns:
-        df2_match[col] = df2_match[col].astype(str).str.strip().str.lower()
-    
-    # Create composite match keys using vectorized string concatenation
-    df1_match['_match_key'] = df1_match.apply(
-        lambda row: '_'.join(row.values.astype(str)), 
-        axis=1
-    )
-    df2_match['_match_key'] = df2_match.apply(
-        lambda row: '_'.join(row.values.astype(str)), 
-        axis=1
-    )
+    # Compare only the mapped columns; the frames are neither copied nor renamed
+    source_cols = list(column_mapping.keys())
+    target_cols = list(column_mapping.values())
     
-    # Find Accuzip records not in client files using set operations (faster)
-    client_keys = set(df2_match['_match_key'].values)
-    missing_mask = ~df1_match['_match_key'].isin(client_keys)
+    # Normalize mapped columns and encode composite keys as verified hash ids
+    # (each mapped pair uses the normalizer configured for its Accuzip column)
+    normalizers = [get_normalizer(col) for col in source_cols]
+    if out_of_core:
+        matches = match_partitioned(df1, df2, source_cols, target_cols, normalizers)
+        if fuzzy or attribution:
+            logger.info("Fuzzy matching and mismatch attribution are not run out of core")
+        fuzzy = attribution = False
+    else:
+        df1_keys = normalize_key_columns(df1, source_cols, normalizers)
+        df2_keys = normalize_key_columns(df2, target_cols, normalizers)
+        matches = match_key_ids(*encode_keys(df1_keys, df2_keys))
     
-    # Get indices of missing records
-    missing_indices = df1_match[missing_mask].index
+    # Accuzip records not in client files, and client records not in Accuzip
+    missing_positions = matches.left_only
+    client_only_positions = matches.right_only
     
-    # Get full records for missing entries (limited for display)
-    missing_records = df1_comp.loc[missing_indices].head(MAX_MISMATCH_DISPLAY).copy()
+    # Pair the remaining records of both sides by name/address similarity
+    fuzzy_matched = 0
+    if fuzzy and len(missing_positions) and len(client_only_positions):
+        fuzzy_matches = fuzzy_match(
+            [values[missing_positions] for values in df1_keys],
+            [values[client_only_positions] for values in df2_keys],
+            [is_fuzzy_column(col) for col in source_cols]
+        )
+        fuzzy_matched = int(fuzzy_matches.left.sum())
+        missing_positions = missing_positions[~fuzzy_matches.left]
+        client_only_positions = client_only_positions[~fuzzy_matches.right]
+    
+    # Columns (one, or else two) that explain each missing record (near misses)
+    if attribution and len(source_cols) > 1 and len(missing_positions):
+        differing, two_columns = _attribute_mismatches(df1_keys, df2_keys, missing_positions)
+    else:
+        differing = np.zeros((len(missing_positions), len(source_cols)), dtype=bool)
+        two_columns = np.zeros(len(missing_positions), dtype=bool)
+    one_column = differing[~two_columns]
+    column_pairs, pair_counts = np.unique(differing[two_columns], axis=0, return_counts=True)
+    
+    # Get full records for missing entries (one page), with suffixed column names
+    missing_page = _page(missing_positions, page, page_size)
+    missing_records = _suffixed_records(df1, missing_page, 'Accuzip')
     
     if not missing_records.empty:
         # Add record number column (1-indexed for user-friendliness)
         missing_records.insert(0, 'Record #', missing_records.index + 1)
         missing_records['Status'] = 'Missing in Client Files'
+        missing_records['Differing Columns'] = [
+            ', '.join(col for col, differs in zip(source_cols, row) if differs)
+            for row in _page(differing, page, page_size)
+        ]
+    
+    client_only = _suffixed_records(df2, _page(client_only_positions, page, page_size), 'Client')
+    if not client_only.empty:
+        client_only.insert(0, 'Record #', client_only.index + 1)
+        client_only['Status'] = 'Missing in Accuzip File'
+    
+    # Keys in both files with a different number of records (one page)
+    differing_page = _page(matches.count_differs, page, page_size)
+    count_mismatches = _suffixed_records(df1, differing_page, 'Accuzip', source_cols)
+    count_mismatches['Accuzip Count'] = _page(matches.left_counts, page, page_size)
+    count_mismatches['Client Count'] = _page(matches.right_counts, page, page_size)
     
     # Calculate statistics
-    total_records = len(df1_comp)
-    missing_count = len(missing_indices)
+    total_records = len(df1)
+    missing_count = len(missing_positions)
     matching_records = total_records - missing_count
     
     logger.info(f"Comparison complete: {matching_records}/{total_records} records matched "
@@ -92,7 +224,22 @@ def compare_datasets(df1: pd.DataFrame, df2: pd.DataFrame,
         'total_records': total_records,
         'matching_records': matching_records,
         'missing_records': missing_count,
-        'mismatches': missing_records
+        'mismatches': missing_records,
+        'client_records': len(df2),
+        'client_only_records': len(client_only_positions),
+        'client_only': client_only,
+        'count_mismatch_keys': len(matches.count_differs),
+        'count_mismatches': count_mismatches,
+        'unmatched_accuzip_records': matches.left_surplus,
+        'unmatched_client_records': matches.right_surplus,
+        'near_miss_records': int(one_column.any(axis=1).sum()),
+        'mismatch_columns': dict(zip(source_cols, one_column.sum(axis=0).tolist())),
+        'two_column_near_miss_records': int(two_columns.sum()),
+        'mismatch_column_pairs': {
+            ', '.join(col for col, differs in zip(source_cols, pair) if differs): int(count)
+            for pair, count in zip(column_pairs, pair_counts)
+        },
+        'fuzzy_matched_records': fuzzy_matched,
     }
 
 
@@ -116,12 +263,12 @@ def find_column_by_keywords(df: pd.DataFrame, keywords: list,
     return default_index
 
 
-def get_default_columns(df: pd.DataFrame, column_type: str) -> list:
+def get_default_columns(df: Union[pd.DataFrame, Sequence[str]], column_type: str) -> list:
     """
     Get default columns based on column type.
     
     Args:
-        df: DataFrame to search
+        df: DataFrame (or sequence of column names) to search
         column_type: Type of columns to find ('address', 'zip', 'imb', 'display')
         
     Returns:
@@ -138,10 +285,44 @@ def get_default_columns(df: pd.DataFrame, column_type: str) -> list:
     
     keywords = keyword_map.get(column_type, [])
     matches = []
+    columns = df.columns if isinstance(df, pd.DataFrame) else df
     
-    for col in df.columns:
+    for col in columns:
         col_lower = col.lower()
         if any(kw.lower() in col_lower for kw in keywords):
             matches.append(col)
     
     return matches
+
+
+def get_required_columns(columns: Sequence[str]) -> List[str]:
+    """
+    Select the columns the job checker uses by default.
+    
+    These are the default mapped columns (either side), the default seed
+    search fields, the duplicate key columns, and columns matched by the
+    address, ZIP, IMB, display and rate keywords.
+    
+    Args:
+        columns: Available column names (e.g. from sniffed headers)
+        
+    Returns:
+        Required column names in their original order
+    """
+    from config import (
+        DEFAULT_COLUMN_MAPPINGS, SEED_SEARCH_DEFAULTS, DEDUP_KEY_COLUMNS, ADDRESS_KEYWORDS,
+        ZIP_KEYWORDS, IMB_KEYWORDS, DISPLAY_KEYWORDS, RATE_KEYWORDS
+    )
+    
+    wanted = set(DEFAULT_COLUMN_MAPPINGS) | set(DEFAULT_COLUMN_MAPPINGS.values())
+    wanted |= {col for col, _ in SEED_SEARCH_DEFAULTS if col}
+    wanted |= set(DEDUP_KEY_COLUMNS or [])
+    keywords = [
+        kw.lower() for kw in
+        ADDRESS_KEYWORDS + ZIP_KEYWORDS + IMB_KEYWORDS + DISPLAY_KEYWORDS + RATE_KEYWORDS
+    ]
+    
+    return [
+        col for col in columns
+        if col in wanted or any(kw in col.lower() for kw in keywords)
+    ]
@@ -1,13 +1,25 @@
 """
 File processing utilities for CSV and ZIP files.
 Handles file upload, validation, and merging of dataframes.
+
+This module does not depend on Streamlit: progress, warnings and errors
+are sent to the active IngestReporter (see set_reporter), so ingestion
+can run from the CLI and in worker processes.
 """
+import os
+import time
 import pandas as pd
+import numpy as np
 import zipfile
-import io
 import logging
-from typing import List, Tuple, Optional
-import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from functools import partial
+from typing import Callable, Iterable, Iterator, List, Tuple, Optional
+
+from .match_keys import find_duplicate_rows
+from .upload_cache import file_digest, make_cache_key, get_upload_cache
+from .streaming_reader import HAS_PYARROW, read_csv_streaming, project_with_row_hash
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -18,28 +30,251 @@ class FileProcessingError(Exception):
     pass
 
 
+# Errors of the environment rather than of one file (e.g. a full spill disk);
+# they stop processing, while any other error skips the file that raised it
+_ENVIRONMENT_ERRORS = (OSError, MemoryError)
+
+# Hash of every full row, kept while merging projected uploads (see _drop_duplicate_rows)
+_ROW_HASH_COLUMN = '__row_hash__'
+
+
+class IngestReporter:
+    """
+    Receives ingestion progress and problems for display.
+    
+    The base class displays nothing (messages are logged by this module
+    regardless); UI front ends subclass it, see
+    utils.streamlit_reporter.StreamlitReporter. Methods are only called
+    from the thread that called into this module.
+    """
+    
+    @contextmanager
+    def processing(self) -> Iterator[None]:
+        """Wrap the processing of one set of uploaded files."""
+        yield
+    
+    def debug(self, message: str) -> None:
+        """Report a processing detail."""
+    
+    def warning(self, message: str) -> None:
+        """Report a problem that was skipped over."""
+    
+    def error(self, message: str) -> None:
+        """Report a file that could not be processed."""
+
+
+_reporter = IngestReporter()
+
+
+def set_reporter(reporter: IngestReporter) -> None:
+    """
+    Set the reporter that receives ingestion events.
+    
+    Args:
+        reporter: IngestReporter instance
+    """
+    global _reporter
+    _reporter = reporter
+
+
+def get_reporter() -> IngestReporter:
+    """Return the active ingestion reporter."""
+    return _reporter
+
+
 def write_debug_info(message: str) -> None:
     """
-    Write debug information to the debug container if available.
+    Log a processing detail and send it to the active reporter.
     
     Args:
         message: Debug message to write
     """
     logger.debug(message)
+    _reporter.debug(message)
+
+
+def _report_warning(message: str) -> None:
+    """Log a warning and send it to the active reporter."""
+    logger.warning(message)
+    _reporter.warning(message)
+
+
+def _report_error(message: str, detail: Optional[Exception] = None) -> None:
+    """Log an error (with optional exception detail) and send it to the active reporter."""
+    logger.error(f"{message}: {detail}" if detail is not None else message)
+    _reporter.error(message)
+
+
+@contextmanager
+def _rewound(file_obj) -> Iterator:
+    """
+    Yield a file object positioned at its start, rewinding it again afterwards.
+    
+    The file object is not closed, so it can be read again later.
+    """
+    file_obj.seek(0)
     try:
-        if 'debug_container' in st.session_state and st.session_state.debug_container is not None:
-            st.session_state.debug_container.write(message)
-    except Exception:
-        # Silently fail if debug container is not available
-        pass
+        yield file_obj
+    finally:
+        file_obj.seek(0)
+
+
+def _csv_members(z: zipfile.ZipFile) -> List[str]:
+    """
+    List CSV members of a ZIP archive, excluding hidden files and macOS metadata.
+    """
+    return [
+        f for f in z.namelist()
+        if f.lower().endswith('.csv')
+        and not f.startswith('__MACOSX')
+        and not f.startswith('.')
+    ]
+
+
+def _read_header(source) -> List[str]:
+    """Read only the header row of CSV data."""
+    return pd.read_csv(source, nrows=0).columns.tolist()
+
+
+def _csv_engine() -> str:
+    """Return the pd.read_csv engine for whole-file parsing."""
+    from config import INGEST_CSV_ENGINE
+    
+    if INGEST_CSV_ENGINE == 'auto':
+        return 'pyarrow' if HAS_PYARROW else 'c'
+    return INGEST_CSV_ENGINE
+
+
+def _parse_csv(source, usecols: Optional[List[str]],
+               memory_budget: Optional[int] = None,
+               row_hash_column: Optional[str] = None) -> pd.DataFrame:
+    """
+    Parse CSV data from a path or binary stream.
+    
+    Uses chunked streaming ingestion under the memory budget when
+    INGEST_STREAMING is enabled, and a single pd.read_csv (with the pyarrow
+    engine if available) otherwise. With row_hash_column, all columns are
+    parsed and hashed before the projection (see project_with_row_hash).
+    """
+    from config import INGEST_STREAMING
+    
+    if INGEST_STREAMING:
+        return read_csv_streaming(source, usecols=usecols, memory_budget=memory_budget,
+                                  row_hash_column=row_hash_column)
+    if row_hash_column is not None:
+        return project_with_row_hash(pd.read_csv(source, engine=_csv_engine()), usecols, row_hash_column)
+    return pd.read_csv(source, usecols=usecols, engine=_csv_engine())
+
+
+def _read_csv(open_source: Callable, usecols: Optional[Iterable[str]] = None,
+              memory_budget: Optional[int] = None,
+              row_hash_column: Optional[str] = None) -> pd.DataFrame:
+    """
+    Parse CSV data, optionally keeping only some columns.
+    
+    If none of the requested columns exist in the file, its first column is
+    read instead so the file still contributes its rows. Row positions in
+    the merged frame then stay the same for every projection, which lets
+    extra columns be loaded later and aligned by index.
+    
+    Args:
+        open_source: Context manager factory yielding the CSV data from the
+                     start; called once more to read the header when
+                     usecols is given
+        usecols: Optional columns to keep (missing ones are ignored)
+        memory_budget: Optional streaming memory budget in bytes
+        row_hash_column: Optional column to add with a hash of every full row
+        
+    Returns:
+        Pandas DataFrame with the CSV contents
+    """
+    if usecols is not None:
+        with open_source() as header_source:
+            header = _read_header(header_source)
+        wanted = set(usecols)
+        usecols = [col for col in header if col in wanted] or header[:1]
+    
+    with open_source() as source:
+        return _parse_csv(source, usecols, memory_budget, row_hash_column)
+
+
+def _csv_error_message(file_name: str, error: Exception) -> str:
+    """Describe a CSV parsing failure for the user."""
+    if isinstance(error, pd.errors.EmptyDataError):
+        return f"The file '{file_name}' is empty"
+    if isinstance(error, pd.errors.ParserError):
+        return f"Error parsing CSV file '{file_name}': File may be corrupted or not a valid CSV"
+    if isinstance(error, UnicodeDecodeError):
+        return f"Encoding error in file '{file_name}': Try saving the file as UTF-8"
+    return f"Error reading CSV file '{file_name}': {str(error)}"
+
+
+def sniff_headers(files) -> List[str]:
+    """
+    Read only the header rows of uploaded CSV files and ZIP members.
+    
+    Args:
+        files: List of uploaded file objects
+        
+    Returns:
+        Union of column names in first-seen order
+    """
+    columns = {}
+    for uploaded_file in files:
+        file_name = uploaded_file.name.lower()
+        try:
+            if file_name.endswith('.zip'):
+                with _rewound(uploaded_file), zipfile.ZipFile(uploaded_file) as z:
+                    for member in _csv_members(z):
+                        with z.open(member) as f:
+                            columns.update(dict.fromkeys(_read_header(f)))
+            elif file_name.endswith('.csv'):
+                with _rewound(uploaded_file):
+                    columns.update(dict.fromkeys(_read_header(uploaded_file)))
+        except Exception as e:
+            # Unreadable files are reported when their data is loaded
+            logger.warning(f"Could not read header of {uploaded_file.name}: {e}")
+    return list(columns)
+
+
+def _parse_csv_file(file_obj, usecols: Optional[List[str]] = None,
+                    memory_budget: Optional[int] = None,
+                    row_hash_column: Optional[str] = None) -> pd.DataFrame:
+    """
+    Parse an uploaded CSV file, reusing a cached parse of identical bytes.
+    
+    Does not report to the UI, so it can run in a worker thread.
+    
+    Raises:
+        FileProcessingError: If the file contains no rows
+        Exception: Parsing errors from pandas
+    """
+    file_name = getattr(file_obj, 'name', 'unknown')
+    
+    cache = get_upload_cache()
+    cache_key = make_cache_key('csv', (file_digest(file_obj),), usecols=usecols,
+                               row_hash_column=row_hash_column)
+    df = cache.get(cache_key)
+    if df is not None:
+        return df
+    
+    df = _read_csv(lambda: _rewound(file_obj), usecols, memory_budget, row_hash_column)
+    
+    # Validate the DataFrame
+    if df.empty:
+        raise FileProcessingError(f"The CSV file '{file_name}' is empty")
+    
+    cache.put(cache_key, df)
+    return df
 
 
-def read_csv_file(file_obj) -> pd.DataFrame:
+def read_csv_file(file_obj, usecols: Optional[List[str]] = None) -> pd.DataFrame:
     """
     Read a CSV file object and return a pandas DataFrame.
     
     Args:
         file_obj: File-like object containing CSV data
+        usecols: Optional columns to load (None loads all columns)
         
     Returns:
         Pandas DataFrame with the CSV contents
@@ -51,48 +286,23 @@ def read_csv_file(file_obj) -> pd.DataFrame:
     
     try:
         write_debug_info(f"Processing CSV file: {file_name}")
-        
-        # Try to read the CSV file
-        df = pd.read_csv(file_obj)
-        
-        # Validate the DataFrame
-        if df.empty:
-            raise FileProcessingError(f"The CSV file '{file_name}' is empty")
-        
+        df = _parse_csv_file(file_obj, usecols)
         write_debug_info(f"Successfully read CSV file with {len(df)} rows")
         return df
         
-    except pd.errors.EmptyDataError:
-        error_msg = f"The file '{file_name}' is empty"
-        logger.error(error_msg)
-        st.error(error_msg)
-        raise FileProcessingError(error_msg)
-        
-    except pd.errors.ParserError as e:
-        error_msg = f"Error parsing CSV file '{file_name}': File may be corrupted or not a valid CSV"
-        logger.error(f"{error_msg}: {e}")
-        st.error(error_msg)
-        raise FileProcessingError(error_msg)
-        
-    except UnicodeDecodeError as e:
-        error_msg = f"Encoding error in file '{file_name}': Try saving the file as UTF-8"
-        logger.error(f"{error_msg}: {e}")
-        st.error(error_msg)
-        raise FileProcessingError(error_msg)
-        
     except Exception as e:
-        error_msg = f"Error reading CSV file '{file_name}': {str(e)}"
-        logger.error(error_msg)
-        st.error(error_msg)
+        error_msg = _csv_error_message(file_name, e)
+        _report_error(error_msg, e)
         raise FileProcessingError(error_msg)
 
 
-def process_zip_file(zip_file) -> List[pd.DataFrame]:
+def process_zip_file(zip_file, usecols: Optional[List[str]] = None) -> List[pd.DataFrame]:
     """
     Extract and process CSV files from a ZIP archive.
     
     Args:
         zip_file: File-like object containing ZIP archive
+        usecols: Optional columns to load (None loads all columns)
         
     Returns:
         List of DataFrames extracted from CSV files in the ZIP
@@ -112,12 +322,7 @@ def process_zip_file(zip_file) -> List[pd.DataFrame]:
             write_debug_info(f"Found {len(all_files)} files in ZIP archive")
             
             # Filter CSV files (excluding hidden files and macOS metadata)
-            csv_files = [
-                f for f in all_files 
-                if f.lower().endswith('.csv') 
-                and not f.startswith('__MACOSX')
-                and not f.startswith('.')
-            ]
+            csv_files = _csv_members(z)
             
             if not csv_files:
                 raise FileProcessingError(f"No CSV files found in ZIP file '{file_name}'")
@@ -127,28 +332,25 @@ def process_zip_file(zip_file) -> List[pd.DataFrame]:
             for filename in csv_files:
                 try:
                     write_debug_info(f"Extracting and processing: {filename}")
-                    with z.open(filename) as f:
-                        df = pd.read_csv(io.BytesIO(f.read()))
-                        if not df.empty:
-                            dataframes.append(df)
-                            write_debug_info(f"Successfully processed {filename} with {len(df)} rows")
-                        else:
-                            st.warning(f"Skipping empty CSV file: {filename}")
+                    # Parse straight from the member stream (no in-memory copy)
+                    df = _read_csv(lambda: z.open(filename), usecols)
+                    if not df.empty:
+                        dataframes.append(df)
+                        write_debug_info(f"Successfully processed {filename} with {len(df)} rows")
+                    else:
+                        _report_warning(f"Skipping empty CSV file: {filename}")
                 except Exception as e:
-                    st.warning(f"Error processing {filename} in ZIP: {str(e)}")
-                    logger.warning(f"Error processing {filename}: {e}")
+                    _report_warning(f"Error processing {filename} in ZIP: {str(e)}")
                     continue
                     
     except zipfile.BadZipFile:
         error_msg = f"Invalid ZIP file: {file_name}"
-        logger.error(error_msg)
-        st.error(error_msg)
+        _report_error(error_msg)
         raise FileProcessingError(error_msg)
         
     except Exception as e:
         error_msg = f"Error processing ZIP file '{file_name}': {str(e)}"
-        logger.error(error_msg)
-        st.error(error_msg)
+        _report_error(error_msg)
         raise FileProcessingError(error_msg)
     
     if not dataframes:
@@ -157,12 +359,303 @@ def process_zip_file(zip_file) -> List[pd.DataFrame]:
     return dataframes
 
 
-def process_uploaded_files(files) -> Tuple[pd.DataFrame, int]:
+def _parse_zip_member(archive: zipfile.ZipFile, member: str, usecols: Optional[List[str]] = None,
+                      memory_budget: Optional[int] = None,
+                      row_hash_column: Optional[str] = None) -> pd.DataFrame:
+    """
+    Parse one CSV member of an open ZIP archive (safe to run in a worker thread).
+    
+    ZipFile serializes reads of the archive file under its own lock, so the
+    members of one archive can be parsed concurrently.
+    """
+    return _read_csv(lambda: archive.open(member), usecols, memory_budget, row_hash_column)
+
+
+def _run_parse_tasks(tasks: List[Tuple[str, Callable]]) -> List[Tuple[Optional[pd.DataFrame], float, Optional[Exception]]]:
+    """
+    Run parse tasks, concurrently when enabled, and time each one.
+    
+    Parsing happens in threads: decompression and the pyarrow and C CSV
+    parsers release the GIL. Each task receives an equal share of the
+    ingestion memory budget.
+    
+    Args:
+        tasks: List of (label, parse function taking a memory budget)
+        
+    Returns:
+        List of (DataFrame or None, seconds, error or None) in task order
+    """
+    from config import (
+        INGEST_PARALLEL_ENABLED, INGEST_PARALLEL_WORKERS, INGEST_MEMORY_BUDGET_BYTES
+    )
+    
+    workers = 1
+    if INGEST_PARALLEL_ENABLED and len(tasks) > 1:
+        workers = min(len(tasks), INGEST_PARALLEL_WORKERS or min(8, os.cpu_count() or 1))
+    memory_budget = INGEST_MEMORY_BUDGET_BYTES // workers
+    
+    def run(task: Tuple[str, Callable]):
+        _, parse = task
+        started = time.perf_counter()
+        try:
+            return parse(memory_budget), time.perf_counter() - started, None
+        except Exception as e:
+            return None, time.perf_counter() - started, e
+    
+    if workers == 1:
+        return [run(task) for task in tasks]
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ingest') as executor:
+        # map() yields results in task order, keeping the merge deterministic
+        return list(executor.map(run, tasks))
+
+
+def _parse_tasks(files, usecols: Optional[List[str]], row_hash_column: Optional[str],
+                 archives: ExitStack) -> List[Tuple[str, Callable, Optional[str]]]:
+    """
+    Build one parse task per uploaded CSV file and per CSV member of uploaded ZIP files.
+    
+    Unsupported and unreadable uploads are reported and skipped.
+    
+    Args:
+        files: List of uploaded file objects
+        usecols: Optional columns to load (None loads all columns)
+        row_hash_column: Optional column to add with a hash of every full row
+        archives: Stack that keeps the opened ZIP archives open
+        
+    Returns:
+        List of (label, parse function taking a memory budget, ZIP member
+        name or None for CSV uploads)
+    """
+    tasks = []
+    
+    for uploaded_file in files:
+        file_name = uploaded_file.name.lower()
+        
+        # Validate file extension
+        if not (file_name.endswith('.csv') or file_name.endswith('.zip')):
+            _report_warning(f"Skipping unsupported file: {uploaded_file.name} (Only .csv and .zip files are supported)")
+            continue
+        
+        if file_name.endswith('.csv'):
+            write_debug_info(f"Processing CSV file: {uploaded_file.name}")
+            tasks.append((
+                uploaded_file.name,
+                partial(_parse_csv_file, uploaded_file, usecols, row_hash_column=row_hash_column),
+                None
+            ))
+            continue
+        
+        try:
+            write_debug_info(f"Processing ZIP file: {uploaded_file.name}")
+            # Opened on the upload itself, without copying the archive
+            # bytes; it stays open until the parse tasks have finished
+            archives.enter_context(_rewound(uploaded_file))
+            archive = archives.enter_context(zipfile.ZipFile(uploaded_file))
+            write_debug_info(f"Found {len(archive.namelist())} files in ZIP archive")
+            csv_files = _csv_members(archive)
+        except zipfile.BadZipFile:
+            _report_error(f"Invalid ZIP file: {uploaded_file.name}")
+            continue
+        except Exception as e:
+            _report_error(f"Error processing ZIP file '{uploaded_file.name}': {str(e)}")
+            continue
+        
+        if not csv_files:
+            logger.error(f"No CSV files found in ZIP file '{uploaded_file.name}'")
+            continue
+        
+        write_debug_info(f"Found {len(csv_files)} CSV files in ZIP archive")
+        for member in csv_files:
+            tasks.append((
+                f"{uploaded_file.name}/{member}",
+                partial(_parse_zip_member, archive, member, usecols, row_hash_column=row_hash_column),
+                member
+            ))
+    
+    return tasks
+
+
+def _load_frames(files, usecols: Optional[List[str]] = None,
+                 row_hash_column: Optional[str] = None) -> Tuple[List[pd.DataFrame], List[str]]:
+    """
+    Read every uploaded CSV file and CSV member of uploaded ZIP files.
+    
+    Files and ZIP members are parsed concurrently (see _run_parse_tasks);
+    the frames are returned in upload and archive order regardless.
+    Files that fail to parse are reported and skipped.
+    
+    Args:
+        files: List of uploaded file objects
+        usecols: Optional columns to load (None loads all columns)
+        row_hash_column: Optional column to add with a hash of every full row
+        
+    Returns:
+        Tuple of (DataFrames in upload order, source label of each DataFrame)
+        
+    Raises:
+        FileProcessingError: If parsing fails because of the environment
+                             (_ENVIRONMENT_ERRORS), e.g. out of disk space
+    """
+    with ExitStack() as archives:
+        tasks = _parse_tasks(files, usecols, row_hash_column, archives)
+        results = _run_parse_tasks([(label, parse) for label, parse, _ in tasks])
+    
+    dataframes = []
+    labels = []
+    for (label, _, member), (df, seconds, error) in zip(tasks, results):
+        if error is None and df.empty:
+            _report_warning(f"Skipping empty CSV file: {member}")
+            continue
+        
+        if isinstance(error, _ENVIRONMENT_ERRORS):
+            error_msg = _csv_error_message(label, error)
+            _report_error(error_msg, error)
+            raise FileProcessingError(error_msg) from error
+        
+        if error is not None:
+            if member is None:
+                _report_error(_csv_error_message(label, error), error)
+            else:
+                _report_warning(f"Error processing {member} in ZIP: {str(error)}")
+            continue
+        
+        dataframes.append(df)
+        labels.append(label)
+        write_debug_info(f"Read {label}: {len(df)} rows in {seconds:.2f}s")
+    
+    return dataframes, labels
+
+
+def _verify_row_hash_duplicates(files, merged_df: pd.DataFrame, duplicated: np.ndarray,
+                                row_hash_column: str) -> np.ndarray:
+    """
+    Check duplicates found on a row hash against the columns it stands for.
+    
+    Only rows whose row hash repeats are candidates. The columns that were
+    not loaded are read (aligned by position, as in load_extra_columns),
+    and duplicates among the candidate rows are found again exactly on all
+    columns, so a hash collision never removes a distinct row.
+    
+    Args:
+        files: The uploaded file objects merged_df was loaded from
+        merged_df: Concatenated projected DataFrames, with the row hash column
+        duplicated: Duplicate flags found with the row hash column
+        row_hash_column: Name of the row hash column
+        
+    Returns:
+        Verified duplicate flags aligned with merged_df
+    """
+    unloaded = [col for col in sniff_headers(files) if col not in merged_df.columns]
+    if not unloaded:
+        # The loaded columns are all columns, so the flags are already exact
+        return duplicated
+    
+    hash_ids, _ = pd.factorize(merged_df[row_hash_column])
+    candidates = np.flatnonzero(np.bincount(hash_ids)[hash_ids] > 1)
+    
+    dataframes, _ = _load_frames(files, unloaded)
+    extra = pd.concat(dataframes, ignore_index=True, sort=False) if dataframes else pd.DataFrame()
+    if len(extra) != len(merged_df):
+        logger.warning("Could not re-read unloaded columns to verify duplicates; "
+                       "keeping row hash duplicates")
+        return duplicated
+    
+    extra = extra[[col for col in unloaded if col in extra.columns]]
+    rows = pd.concat([
+        merged_df.drop(columns=row_hash_column).take(candidates).reset_index(drop=True),
+        extra.take(candidates).reset_index(drop=True)
+    ], axis=1)
+    verified = np.zeros(len(merged_df), dtype=bool)
+    verified[candidates] = find_duplicate_rows(rows)
+    
+    collisions = int(duplicated.sum() - verified.sum())
+    if collisions:
+        logger.warning(f"Kept {collisions} row(s) whose row hash collided with a different row")
+    return verified
+
+
+def _drop_duplicate_rows(merged_df: pd.DataFrame, dataframes: List[pd.DataFrame],
+                         labels: List[str], files=None,
+                         row_hash_column: Optional[str] = None) -> pd.DataFrame:
+    """
+    Remove repeated rows from the merged DataFrame, keeping first occurrences.
+    
+    Rows are compared on DEDUP_KEY_COLUMNS when configured (and loaded),
+    otherwise on all columns. For projected loads these include the row
+    hash column, which stands for the columns that were not loaded; rows
+    found this way are verified on the actual columns (see
+    _verify_row_hash_duplicates). The number of removed rows is reported
+    per source file.
+    
+    Args:
+        merged_df: Concatenation of dataframes
+        dataframes: Source DataFrames in merge order
+        labels: Source file label of each DataFrame
+        files: The uploaded file objects (needed with row_hash_column)
+        row_hash_column: Row hash column of a projected load, if any
+        
+    Returns:
+        DataFrame without duplicate rows (merged_df itself if there are none)
+    """
+    from config import DEDUP_KEY_COLUMNS
+    
+    key_columns = None
+    if DEDUP_KEY_COLUMNS:
+        key_columns = [col for col in DEDUP_KEY_COLUMNS if col in merged_df.columns]
+        if not key_columns:
+            logger.warning("None of DEDUP_KEY_COLUMNS were loaded; comparing all columns")
+            key_columns = None
+        else:
+            write_debug_info(f"Detecting duplicates on: {', '.join(key_columns)}")
+    
+    duplicated = find_duplicate_rows(merged_df, key_columns)
+    if row_hash_column is not None and key_columns is None and duplicated.any():
+        duplicated = _verify_row_hash_duplicates(files, merged_df, duplicated, row_hash_column)
+    duplicates_removed = int(duplicated.sum())
+    if duplicates_removed == 0:
+        return merged_df
+    
+    write_debug_info(f"Removed {duplicates_removed} duplicate rows")
+    source = np.repeat(np.arange(len(dataframes)), [len(df) for df in dataframes])
+    per_source = np.bincount(source[duplicated], minlength=len(dataframes))
+    for label, count in zip(labels, per_source):
+        if count:
+            write_debug_info(f"  {label}: {count} duplicate rows")
+    
+    return merged_df[~duplicated]
+
+
+def _upload_cache_key(kind: str, files, **options):
+    """Build an upload cache key from file contents, names and options."""
+    return make_cache_key(
+        kind,
+        tuple(file_digest(f) for f in files),
+        names=tuple(f.name.lower() for f in files),
+        **options
+    )
+
+
+def process_uploaded_files(files, usecols: Optional[List[str]] = None) -> Tuple[pd.DataFrame, int]:
     """
     Process uploaded files (CSV or ZIP) and return a merged DataFrame.
     
+    Results are cached on the content digest of the uploaded files, so a
+    Streamlit rerun with the same uploads returns the already-merged
+    DataFrame without re-parsing. The returned DataFrame may be shared with
+    the cache and must not be modified in place.
+    
+    When usecols is given only those columns are materialized. Duplicate
+    rows are still detected on all columns (unless DEDUP_KEY_COLUMNS is
+    set), using a hash of every full row taken while parsing; the unloaded
+    columns are read back to confirm rows found that way. The index
+    holds each row's position in the concatenated upload, so further
+    columns can be added with load_extra_columns.
+    
     Args:
         files: List of uploaded file objects
+        usecols: Optional columns to load (None loads all columns); see
+                 sniff_headers and get_required_columns
         
     Returns:
         Tuple of (merged DataFrame, count of processed files)
@@ -170,67 +663,91 @@ def process_uploaded_files(files) -> Tuple[pd.DataFrame, int]:
     Raises:
         FileProcessingError: If no valid files could be processed
     """
+    from config import DEDUP_KEY_COLUMNS
+    
     if not files:
         raise FileProcessingError("No files were uploaded. Please upload CSV files or ZIP files containing CSVs.")
     
-    dataframes = []
-    processed_files = 0
+    cache = get_upload_cache()
+    cache_key = _upload_cache_key('merged', files, usecols=usecols)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        logger.debug(f"Using cached merge of {len(files)} uploaded file(s)")
+        return cached
     
-    with st.spinner("Processing uploaded files..."):
-        # Create a debug expander
-        with st.expander("📋 View File Processing Details", expanded=False) as debug_expander:
-            st.session_state.debug_container = debug_expander
-            write_debug_info("Starting file processing...")
-            
-            for uploaded_file in files:
-                try:
-                    file_name = uploaded_file.name.lower()
-                    
-                    # Validate file extension
-                    if not (file_name.endswith('.csv') or file_name.endswith('.zip')):
-                        st.warning(f"Skipping unsupported file: {uploaded_file.name} (Only .csv and .zip files are supported)")
-                        continue
-                    
-                    # Process based on file type
-                    if file_name.endswith('.zip'):
-                        dfs = process_zip_file(uploaded_file)
-                        dataframes.extend(dfs)
-                        processed_files += len(dfs)
-                    else:
-                        df = read_csv_file(uploaded_file)
-                        dataframes.append(df)
-                        processed_files += 1
-                        
-                except FileProcessingError:
-                    # Already logged and displayed, continue with next file
-                    continue
-                except Exception as e:
-                    st.error(f"Unexpected error processing '{uploaded_file.name}': {str(e)}")
-                    logger.exception(f"Unexpected error processing {uploaded_file.name}")
-                    continue
-            
-            if not dataframes:
-                raise FileProcessingError("""
-                    No valid CSV files were processed. Please ensure:
-                    1. You've uploaded either .csv files or .zip files containing .csv files
-                    2. The CSV files are not empty
-                    3. The CSV files are properly formatted
-                    4. The ZIP files contain valid CSV files
-                """)
-            
-            write_debug_info(f"Successfully processed {processed_files} files")
-            
-            # Merge all dataframes
-            merged_df = pd.concat(dataframes, ignore_index=True, sort=False)
-            
-            # Remove duplicate rows if any
-            initial_rows = len(merged_df)
-            merged_df.drop_duplicates(inplace=True)
-            duplicates_removed = initial_rows - len(merged_df)
-            
-            if duplicates_removed > 0:
-                write_debug_info(f"Removed {duplicates_removed} duplicate rows")
-            
-            write_debug_info(f"Final dataset contains {len(merged_df)} rows")
-            
-            return merged_df, processed_files
+    with _reporter.processing():
+        write_debug_info("Starting file processing...")
+        if usecols is not None:
+            write_debug_info(f"Loading {len(usecols)} selected columns")
+        
+        # Projected loads keep a hash of the unloaded columns for duplicate detection
+        row_hash_column = None
+        if usecols is not None and not DEDUP_KEY_COLUMNS:
+            row_hash_column = _ROW_HASH_COLUMN
+        
+        dataframes, labels = _load_frames(files, usecols, row_hash_column)
+        processed_files = len(dataframes)
+        
+        if not dataframes:
+            raise FileProcessingError("""
+                No valid CSV files were processed. Please ensure:
+                1. You've uploaded either .csv files or .zip files containing .csv files
+                2. The CSV files are not empty
+                3. The CSV files are properly formatted
+                4. The ZIP files contain valid CSV files
+            """)
+        
+        write_debug_info(f"Successfully processed {processed_files} files")
+        
+        # Merge all dataframes
+        merged_df = pd.concat(dataframes, ignore_index=True, sort=False)
+        
+        # Remove duplicate rows if any
+        merged_df = _drop_duplicate_rows(merged_df, dataframes, labels, files, row_hash_column)
+        if row_hash_column is not None:
+            merged_df = merged_df.drop(columns=row_hash_column)
+        
+        write_debug_info(f"Final dataset contains {len(merged_df)} rows")
+        
+        cache.put(cache_key, (merged_df, processed_files))
+        return merged_df, processed_files
+
+
+def load_extra_columns(files, df: pd.DataFrame, columns: Iterable[str]) -> pd.DataFrame:
+    """
+    Add columns that were not loaded by a projected process_uploaded_files call.
+    
+    Only the missing columns are read, and they are aligned to the existing
+    rows by their position index. The result is cached like the merged
+    DataFrame and must not be modified in place.
+    
+    Args:
+        files: The uploaded file objects df was loaded from
+        df: DataFrame returned by process_uploaded_files(files, usecols=...)
+        columns: Columns that should be present
+        
+    Returns:
+        DataFrame with the requested columns appended (df itself if none
+        were missing)
+    """
+    missing = [col for col in dict.fromkeys(columns) if col not in df.columns]
+    if not missing:
+        return df
+    
+    cache = get_upload_cache()
+    cache_key = _upload_cache_key('extended', files, base=tuple(df.columns), extra=tuple(missing))
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    write_debug_info(f"Loading additional columns: {', '.join(missing)}")
+    dataframes, _ = _load_frames(files, missing)
+    if not dataframes:
+        return df
+    
+    extra = pd.concat(dataframes, ignore_index=True, sort=False)
+    extra = extra[[col for col in missing if col in extra.columns]]
+    extended = pd.concat([df, extra.reindex(df.index)], axis=1)
+    
+    cache.put(cache_key, extended)
+    return extended
@@ -0,0 +1,250 @@
+"""
+Blocked fuzzy matching of name and address columns.
+Records left unmatched by the exact composite keys are paired only within
+blocks (equal non-fuzzy columns and equal leading characters of each fuzzy
+column), and every candidate pair is scored with a vectorized token-set
+Jaccard similarity after address abbreviations are canonicalized.
+"""
+import pandas as pd
+import numpy as np
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+import logging
+
+from .match_keys import encode_keys
+
+logger = logging.getLogger(__name__)
+
+
+class FuzzyMatches(NamedTuple):
+    """Records of each side that have a fuzzy match on the other side."""
+    left: np.ndarray
+    right: np.ndarray
+
+
+class _TokenSets(NamedTuple):
+    """Distinct token ids per row, stored as one sorted array with row offsets."""
+    indptr: np.ndarray
+    tokens: np.ndarray
+    first_token: np.ndarray
+
+
+def is_fuzzy_column(column: str) -> bool:
+    """Check whether a mapped column holds names or addresses (FUZZY_MATCH_KEYWORDS)."""
+    from config import FUZZY_MATCH_KEYWORDS
+
+    column = column.lower()
+    return any(keyword in column for keyword in FUZZY_MATCH_KEYWORDS)
+
+
+def _gather_ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenate the index ranges [start, start + length) without a Python loop."""
+    total = int(lengths.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + offsets
+
+
+def _tokenize(values: np.ndarray) -> _TokenSets:
+    """
+    Split normalized values into canonical word tokens.
+
+    Punctuation separates tokens and ADDRESS_ABBREVIATIONS maps long forms
+    (e.g. 'street') to their abbreviation, so 'Main Street' and 'MAIN ST.'
+    have the same tokens.
+
+    Args:
+        values: Normalized (stripped, lowercase) strings
+
+    Returns:
+        Token sets of every row, with ids shared by all rows
+    """
+    from config import ADDRESS_ABBREVIATIONS
+
+    n = len(values)
+    words = (
+        pd.Series(values, dtype=object)
+        .str.replace(r'[^\w\s]', ' ', regex=True)
+        .str.split()
+        .explode()
+        .dropna()
+    )
+    canonical = words.map(ADDRESS_ABBREVIATIONS)
+    words = canonical.where(canonical.notna(), words)
+
+    rows = words.index.to_numpy(dtype=np.int64)
+    token_ids, uniques = pd.factorize(words.to_numpy(dtype=object))
+
+    # First token of every row (in word order) for the blocking prefix
+    first_token = np.full(n, '', dtype=object)
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]]) if len(rows) else rows
+    first_token[rows[starts]] = uniques[token_ids[starts]]
+
+    # Distinct (row, token) pairs, sorted by row
+    n_tokens = max(len(uniques), 1)
+    keys = np.unique(rows * n_tokens + token_ids)
+    indptr = np.searchsorted(keys // n_tokens, np.arange(n + 1))
+    return _TokenSets(indptr, keys % n_tokens, first_token)
+
+
+def _jaccard(token_sets: _TokenSets, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Token-set Jaccard similarity of row pairs (a[i], b[i]).
+
+    The tokens of both rows of every pair are laid out as (pair, token)
+    keys; a key present on both sides is a shared token.
+
+    Returns:
+        float64 array of similarities (1.0 when both rows have no tokens)
+    """
+    indptr, tokens = token_sets.indptr, token_sets.tokens
+    size_a = indptr[a + 1] - indptr[a]
+    size_b = indptr[b + 1] - indptr[b]
+
+    n_tokens = int(tokens.max(initial=0)) + 1
+    pairs = np.arange(len(a), dtype=np.int64)
+    pairs_a = np.repeat(pairs, size_a)
+    keys_a = pairs_a * n_tokens + tokens[_gather_ranges(indptr[a], size_a)]
+    keys_b = np.repeat(pairs, size_b) * n_tokens + tokens[_gather_ranges(indptr[b], size_b)]
+
+    shared = np.bincount(pairs_a[np.isin(keys_a, keys_b)], minlength=len(a))
+    union = size_a + size_b - shared
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(union > 0, shared / union, 1.0)
+
+
+def _candidate_batches(left_blocks: np.ndarray, right_blocks: np.ndarray
+                       ) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Pair every left row with the right rows of its block, in bounded batches.
+
+    Blocks with more than FUZZY_MAX_BLOCK_PAIRS candidate pairs are
+    skipped (their rows stay unmatched), which keeps the total work
+    linear in the number of rows.
+
+    Returns:
+        List of (left rows, right rows) pair arrays
+    """
+    from config import FUZZY_MAX_BLOCK_PAIRS, FUZZY_PAIR_BATCH_SIZE
+
+    right_order = np.argsort(right_blocks, kind='stable')
+    sorted_blocks = right_blocks[right_order]
+    starts = np.searchsorted(sorted_blocks, left_blocks, side='left')
+    counts = np.searchsorted(sorted_blocks, left_blocks, side='right') - starts
+
+    block_pairs = np.bincount(left_blocks)[left_blocks] * counts
+    oversized = block_pairs > FUZZY_MAX_BLOCK_PAIRS
+    if oversized.any():
+        logger.warning(f"Fuzzy matching skipped {int(oversized.sum())} records in blocks "
+                       f"with more than {FUZZY_MAX_BLOCK_PAIRS} candidate pairs")
+        counts = np.where(oversized, 0, counts)
+
+    rows = np.flatnonzero(counts)
+    ends = np.cumsum(counts[rows])
+    batches = []
+    begin = 0
+    while begin < len(rows):
+        # At least one row per batch, then as many as fit in the batch size
+        done = ends[begin - 1] if begin else 0
+        stop = max(begin + 1, int(np.searchsorted(ends, done + FUZZY_PAIR_BATCH_SIZE, side='right')))
+        batch, batch_counts = rows[begin:stop], counts[rows[begin:stop]]
+        batches.append((
+            np.repeat(batch, batch_counts),
+            right_order[_gather_ranges(starts[batch], batch_counts)],
+        ))
+        begin = stop
+    return batches
+
+
+def _assign_one_to_one(a: np.ndarray, b: np.ndarray, score: np.ndarray
+                       ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pick pairs greedily by descending similarity, each record used at most once.
+
+    Ties are broken by left then right row. Every round takes the pairs
+    that are the best remaining pair of both their records; these are
+    exactly the pairs sequential greedy picks next, so the result is the
+    greedy assignment without a loop over pairs.
+
+    Returns:
+        (left rows, right rows) of the chosen pairs
+    """
+    order = np.lexsort((b, a, -score))
+    a, b = a[order], b[order]
+    chosen_a, chosen_b = [], []
+    while len(a):
+        best_for_a = np.zeros(len(a), dtype=bool)
+        best_for_a[np.unique(a, return_index=True)[1]] = True
+        best_for_b = np.zeros(len(b), dtype=bool)
+        best_for_b[np.unique(b, return_index=True)[1]] = True
+        mutual = best_for_a & best_for_b
+        chosen_a.append(a[mutual])
+        chosen_b.append(b[mutual])
+        remaining = ~(np.isin(a, a[mutual]) | np.isin(b, b[mutual]))
+        a, b = a[remaining], b[remaining]
+    if not chosen_a:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(chosen_a), np.concatenate(chosen_b)
+
+
+def fuzzy_match(left: Sequence[np.ndarray], right: Sequence[np.ndarray],
+                fuzzy: Sequence[bool], threshold: Optional[float] = None) -> FuzzyMatches:
+    """
+    Find records that match a record on the other side approximately.
+
+    Non-fuzzy columns must be equal. Every fuzzy column must reach the
+    token-set Jaccard threshold. Matching is one-to-one: pairs are taken
+    by descending similarity and each record is used at most once. Candidate pairs are limited to records
+    whose non-fuzzy columns and the first FUZZY_BLOCK_PREFIX_CHARS
+    characters of each fuzzy column's first token are equal, so the cost
+    grows with the block sizes rather than with len(left) * len(right).
+
+    Args:
+        left: Normalized key columns of the first dataset
+        right: Normalized key columns of the second dataset (same order)
+        fuzzy: Per column, whether it is compared by similarity
+        threshold: Minimum similarity (defaults to FUZZY_MATCH_THRESHOLD)
+
+    Returns:
+        FuzzyMatches with a boolean array per side
+    """
+    from config import FUZZY_MATCH_THRESHOLD, FUZZY_BLOCK_PREFIX_CHARS
+
+    threshold = FUZZY_MATCH_THRESHOLD if threshold is None else threshold
+    n_left = len(left[0]) if left else 0
+    n_right = len(right[0]) if right else 0
+    matches = FuzzyMatches(np.zeros(n_left, dtype=bool), np.zeros(n_right, dtype=bool))
+    fuzzy_cols = [i for i, is_fuzzy in enumerate(fuzzy) if is_fuzzy]
+    if not fuzzy_cols or not n_left or not n_right:
+        return matches
+
+    # Tokenize both sides together so token ids are shared
+    token_sets = [
+        _tokenize(np.concatenate([np.asarray(left[i]), np.asarray(right[i])]))
+        for i in fuzzy_cols
+    ]
+
+    # Blocking key: exact columns plus the leading characters of each fuzzy column
+    block_cols = [np.concatenate([np.asarray(left[i]), np.asarray(right[i])])
+                  for i, is_fuzzy in enumerate(fuzzy) if not is_fuzzy]
+    block_cols += [
+        pd.Series(sets.first_token, dtype=object).str[:FUZZY_BLOCK_PREFIX_CHARS].to_numpy(dtype=object)
+        for sets in token_sets
+    ]
+    left_blocks, right_blocks = encode_keys(
+        [values[:n_left] for values in block_cols], [values[n_left:] for values in block_cols]
+    )
+
+    pairs = []
+    for a, b in _candidate_batches(left_blocks, right_blocks):
+        score = np.ones(len(a))
+        for sets in token_sets:
+            np.minimum(score, _jaccard(sets, a, b + n_left), out=score)
+        matched = score >= threshold
+        pairs.append((a[matched], b[matched], score[matched]))
+
+    if pairs:
+        a, b = _assign_one_to_one(*(np.concatenate(part) for part in zip(*pairs)))
+        matches.left[a] = True
+        matches.right[b] = True
+
+    logger.info(f"Fuzzy matching paired {int(matches.left.sum())} of {n_left} records")
+    return matches
@@ -0,0 +1,153 @@
+"""
+Persistent IMB decode cache.
+Stores the ZIP fields of barcodes that needed the slow repairing decoder in
+a local SQLite file, so repeated jobs for the same mailer skip the repair
+search. Every entry records the decoder version and repair budget it was
+decoded with, and only entries of the requested version are returned.
+Entries are evicted least-recently-used beyond a fixed bound.
+"""
+import os
+import sqlite3
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_BATCH_SIZE = 900
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS imb_decode (
+    code TEXT NOT NULL,
+    version TEXT NOT NULL,
+    full_zip TEXT NOT NULL,
+    zip5 TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (code, version)
+)
+"""
+
+
+class DecodeCache:
+    """
+    Bounded on-disk mapping of (IMB code, version) -> (display ZIP, 5-digit ZIP).
+
+    The version names what produced a result (see decode_cache_version in
+    imb_validator), so results of another decoder version or repair budget
+    are never served. A new connection is opened for every operation, so
+    one instance can be shared between Streamlit sessions and threads.
+    """
+
+    FILE_NAME = 'imb_decode_cache.sqlite3'
+
+    def __init__(self, directory: str, max_entries: int):
+        self.path = os.path.join(directory, self.FILE_NAME)
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(imb_decode)")]
+            if columns and 'version' not in columns:
+                # Cache file written before entries were versioned
+                logger.info(f"Discarding unversioned IMB decode cache entries in {self.path}")
+                conn.execute("DROP TABLE imb_decode")
+            conn.execute(_SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS imb_decode_last_used ON imb_decode (last_used)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection, commit on success and always close it."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, codes: Iterable[str], version: str) -> Dict[str, Tuple[str, str]]:
+        """
+        Look up cached results and mark them as recently used.
+
+        Args:
+            codes: IMB codes to look up
+            version: Version the results must have been stored with
+
+        Returns:
+            Dictionary of code -> (display ZIP, 5-digit ZIP) for cached codes
+        """
+        codes = list(codes)
+        found = {}
+        with self._connect() as conn:
+            for start in range(0, len(codes), _QUERY_BATCH_SIZE):
+                batch = codes[start:start + _QUERY_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                rows = conn.execute(
+                    f"SELECT code, full_zip, zip5 FROM imb_decode "
+                    f"WHERE version = ? AND code IN ({placeholders})",
+                    [version, *batch]
+                ).fetchall()
+                found.update((code, (full_zip, zip5)) for code, full_zip, zip5 in rows)
+
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE imb_decode SET last_used = ? WHERE code = ? AND version = ?",
+                    ((now, code, version) for code in found)
+                )
+        return found
+
+    def put_many(self, results: Dict[str, Tuple[str, str]], version: str) -> None:
+        """
+        Store decode results, evicting the least recently used beyond the bound.
+
+        Args:
+            results: Dictionary of code -> (display ZIP, 5-digit ZIP)
+            version: Version of the decoder setup that produced the results
+        """
+        if not results:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO imb_decode (code, version, full_zip, zip5, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((code, version, full_zip, zip5, now) for code, (full_zip, zip5) in results.items())
+            )
+            count = conn.execute("SELECT COUNT(*) FROM imb_decode").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM imb_decode WHERE rowid IN ("
+                    "SELECT rowid FROM imb_decode ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM imb_decode").fetchone()[0]
+
+
+_decode_cache: Optional[DecodeCache] = None
+
+
+def get_decode_cache() -> Optional[DecodeCache]:
+    """
+    Return the shared decode cache, or None if disabled or unavailable.
+
+    Returns:
+        DecodeCache instance or None
+    """
+    global _decode_cache
+    from config import (
+        IMB_DECODE_CACHE_ENABLED, IMB_DECODE_CACHE_DIR, IMB_DECODE_CACHE_MAX_ENTRIES
+    )
+
+    if not IMB_DECODE_CACHE_ENABLED:
+        return None
+    if _decode_cache is None:
+        try:
+            _decode_cache = DecodeCache(IMB_DECODE_CACHE_DIR, IMB_DECODE_CACHE_MAX_ENTRIES)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"IMB decode cache unavailable at {IMB_DECODE_CACHE_DIR}: {e}")
+            return None
+    return _decode_cache
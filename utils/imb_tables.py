@@ -0,0 +1,190 @@
+"""
+Codeword and bar permutation tables for the USPS Intelligent Mail Barcode.
+
+The tables are stored precomputed in compact form instead of being built
+at import time. The 1365-entry codeword table is shipped as little-endian
+uint16 data; the 8192-entry decode and frame check tables are derived from
+it with a few array operations the first time they are needed.
+
+All tables are typed arrays (array module), so scalar lookups return plain
+Python ints, and np.frombuffer gives zero-copy NumPy views for vectorized
+lookups. Invalid characters map to INVALID (-1) in the decode table.
+
+Regenerate the data with:
+    python -m utils.imb_tables
+"""
+import base64
+import textwrap
+import threading
+from array import array
+from typing import NamedTuple
+
+import numpy as np
+
+# Decode table value of a 13-bit character that is not a valid codeword
+INVALID = -1
+
+# barcode-to-bit permutation tables (constants)
+DESC_CHAR = array('B', [
+    7, 1, 9, 5, 8, 0, 2, 4, 6, 3, 5, 8, 9, 7, 3, 0, 6, 1, 7, 4, 6, 8, 9, 2, 5, 1, 7, 5, 4, 3,
+    8, 7, 6, 0, 2, 5, 4, 9, 3, 0, 1, 6, 8, 2, 0, 4, 5, 9, 6, 7, 5, 2, 6, 3, 8, 5, 1, 9, 8, 7,
+    4, 0, 2, 6, 3,
+])
+DESC_BIT = array('H', [
+    4, 1024, 4096, 32, 512, 2, 32, 16, 8, 512, 2048, 32, 1024, 2, 64, 8, 16, 2,
+    1024, 1, 4, 2048, 256, 64, 2, 4096, 8, 256, 64, 16, 16, 2048, 1, 64, 2, 512, 2048, 32, 8,
+    128, 8, 1024, 128, 2048, 256, 4, 1024, 8, 32, 256, 1, 8, 4096, 2048, 256, 16, 32, 2, 8, 1,
+    128, 4096, 512, 256, 1024,
+])
+ASC_CHAR = array('B', [
+    4, 0, 2, 6, 3, 5, 1, 9, 8, 7, 1, 2, 0, 6, 4, 8, 2, 9, 5, 3, 0, 1, 3, 7, 4, 6, 8, 9, 2, 0,
+    5, 1, 9, 4, 3, 8, 6, 7, 1, 2, 4, 3, 9, 5, 7, 8, 3, 0, 2, 1, 4, 0, 9, 1, 7, 0, 2, 4, 6, 3,
+    7, 1, 9, 5, 8,
+])
+ASC_BIT = array('H', [
+    8, 1, 256, 2048, 2, 4096, 256, 2048, 1024, 64, 16, 4096, 4, 128, 512, 64, 128,
+    512, 4, 256, 16, 1, 4096, 128, 1024, 512, 1, 128, 1024, 32, 128, 512, 64, 256, 4, 4096, 2,
+    16, 4, 1, 2, 32, 16, 64, 4096, 2, 1, 512, 16, 128, 32, 1024, 4, 64, 512, 2048, 4, 4096, 64,
+    128, 32, 2048, 1, 8, 4,
+])
+
+# Codeword -> 13-bit character (base64 of little-endian uint16), as built
+# by build_codeword_tables
+_ENCODE_DATA = (
+    'HwAAHy8AgB43AIAdOwCAGz0AgBc+AIAPTwBAHlcAQB1bAEAbXQBAF14AQA9nAMAcawDAGm0AwBZu'
+    'AMAOcwDAGXUAwBV2AMANeQDAE3oAwAt8AMAHjwAgHpcAIB2bACAbnQAgF54AIA+nAKAcqwCgGq0A'
+    'oBauAKAOswCgGbUAoBW2AKANuQCgE7oAoAu8AKAHxwBgHMsAYBrNAGAWzgBgDtMAYBnVAGAV1gBg'
+    'DdkAYBPaAGAL3ABgB+MA4BjlAOAU5gDgDOkA4BLqAOAK7ADgBvEA4BHyAOAJ9ADgBfgA4AMPARAe'
+    'FwEQHRsBEBsdARAXHgEQDycBkBwrAZAaLQGQFi4BkA4zAZAZNQGQFTYBkA05AZATOgGQCzwBkAdH'
+    'AVAcSwFQGk0BUBZOAVAOUwFQGVUBUBVWAVANWQFQE1oBUAtcAVAHYwHQGGUB0BRmAdAMaQHQEmoB'
+    '0ApsAdAGcQHQEXIB0Al0AdAFeAHQA4cBMByLATAajQEwFo4BMA6TATAZlQEwFZYBMA2ZATATmgEw'
+    'C5wBMAejAbAYpQGwFKYBsAypAbASqgGwCqwBsAaxAbARsgGwCbQBsAW4AbADwwFwGMUBcBTGAXAM'
+    'yQFwEsoBcArMAXAG0QFwEdIBcAnUAXAF2AFwA+EB8BDiAfAI5AHwBOgB8AIPAggeFwIIHRsCCBsd'
+    'AggXHgIIDycCiBwrAogaLQKIFi4CiA4zAogZNQKIFTYCiA05AogTOgKICzwCiAdHAkgcSwJIGk0C'
+    'SBZOAkgOUwJIGVUCSBVWAkgNWQJIE1oCSAtcAkgHYwLIGGUCyBRmAsgMaQLIEmoCyApsAsgGcQLI'
+    'EXICyAl0AsgFeALIA4cCKByLAigajQIoFo4CKA6TAigZlQIoFZYCKA2ZAigTmgIoC5wCKAejAqgY'
+    'pQKoFKYCqAypAqgSqgKoCqwCqAaxAqgRsgKoCbQCqAW4AqgDwwJoGMUCaBTGAmgMyQJoEsoCaArM'
+    'AmgG0QJoEdICaAnUAmgF2AJoA+EC6BDiAugI5ALoBAcDGBwLAxgaDQMYFg4DGA4TAxgZFQMYFRYD'
+    'GA0ZAxgTGgMYCxwDGAcjA5gYJQOYFCYDmAwpA5gSKgOYCiwDmAYxA5gRMgOYCTQDmAU4A5gDQwNY'
+    'GEUDWBRGA1gMSQNYEkoDWApMA1gGUQNYEVIDWAlUA1gFYQPYEGID2AhkA9gEgwM4GIUDOBSGAzgM'
+    'iQM4EooDOAqMAzgGkQM4EZIDOAmUAzgFoQO4EKIDuAikA7gEwQN4EMIDeAjEA3gEDwQEHhcEBB0b'
+    'BAQbHQQEFx4EBA8nBIQcKwSEGi0EhBYuBIQOMwSEGTUEhBU2BIQNOQSEEzoEhAs8BIQHRwREHEsE'
+    'RBpNBEQWTgREDlMERBlVBEQVVgREDVkERBNaBEQLXAREB2MExBhlBMQUZgTEDGkExBJqBMQKbATE'
+    'BnEExBFyBMQJdATEBYcEJByLBCQajQQkFo4EJA6TBCQZlQQkFZYEJA2ZBCQTmgQkC5wEJAejBKQY'
+    'pQSkFKYEpAypBKQSqgSkCqwEpAaxBKQRsgSkCbQEpAXDBGQYxQRkFMYEZAzJBGQSygRkCswEZAbR'
+    'BGQR0gRkCdQEZAXhBOQQ4gTkCAcFFBwLBRQaDQUUFg4FFA4TBRQZFQUUFRYFFA0ZBRQTGgUUCxwF'
+    'FAcjBZQYJQWUFCYFlAwpBZQSKgWUCiwFlAYxBZQRMgWUCTQFlAVDBVQYRQVUFEYFVAxJBVQSSgVU'
+    'CkwFVAZRBVQRUgVUCWEF1BBiBdQIgwU0GIUFNBSGBTQMiQU0EooFNAqMBTQGkQU0EZIFNAmhBbQQ'
+    'ogW0CMEFdBDCBXQIBwYMHAsGDBoNBgwWDgYMDhMGDBkVBgwVFgYMDRkGDBMaBgwLHAYMByMGjBgl'
+    'BowUJgaMDCkGjBIqBowKLAaMBjEGjBEyBowJQwZMGEUGTBRGBkwMSQZMEkoGTApRBkwRUgZMCWEG'
+    'zBBiBswIgwYsGIUGLBSGBiwMiQYsEooGLAqRBiwRkgYsCaEGrBCiBqwIwQZsEMIGbAgDBxwYBQcc'
+    'FAYHHAwJBxwSCgccChEHHBESBxwJIQecECIHnAhBB1wQQgdcCIEHPBCCBzwIDwgCHhcIAh0bCAIb'
+    'HQgCFx4IAg8nCIIcKwiCGi0IghYuCIIOMwiCGTUIghU2CIINOQiCEzoIggtHCEIcSwhCGk0IQhZO'
+    'CEIOUwhCGVUIQhVWCEINWQhCE1oIQgtjCMIYZQjCFGYIwgxpCMISagjCCnEIwhFyCMIJhwgiHIsI'
+    'IhqNCCIWjggiDpMIIhmVCCIVlggiDZkIIhOaCCILowiiGKUIohSmCKIMqQiiEqoIogqxCKIRsgii'
+    'CcMIYhjFCGIUxghiDMkIYhLKCGIK0QhiEdIIYgnhCOIQBwkSHAsJEhoNCRIWDgkSDhMJEhkVCRIV'
+    'FgkSDRkJEhMaCRILIwmSGCUJkhQmCZIMKQmSEioJkgoxCZIRMgmSCUMJUhhFCVIURglSDEkJUhJK'
+    'CVIKUQlSEWEJ0hCDCTIYhQkyFIYJMgyJCTISigkyCpEJMhGhCbIQwQlyEAcKChwLCgoaDQoKFg4K'
+    'Cg4TCgoZFQoKFRYKCg0ZCgoTGgoKCyMKihglCooUJgqKDCkKihIqCooKMQqKEUMKShhFCkoURgpK'
+    'DEkKShJRCkoRYQrKEIMKKhiFCioUhgoqDIkKKhKRCioRoQqqEMEKahADCxoYBQsaFAYLGgwJCxoS'
+    'EQsaESELmhBBC1oQgQs6EAcMBhwLDAYaDQwGFg4MBg4TDAYZFQwGFRYMBg0ZDAYTIwyGGCUMhhQm'
+    'DIYMKQyGEjEMhhFDDEYYRQxGFEkMRhJRDEYRYQzGEIMMJhiFDCYUiQwmEpEMJhGhDKYQwQxmEAMN'
+    'FhgFDRYUCQ0WEhENFhEhDZYQQQ1WEIENNhADDg4YBQ4OFAkODhIRDg4RIQ6OEEEOThCBDi4QAQ8e'
+    'EA8QAR4XEAEdGxABGx0QARcnEIEcKxCBGi0QgRYzEIEZNRCBFTkQgRNHEEEcSxBBGk0QQRZTEEEZ'
+    'VRBBFVkQQRNjEMEYZRDBFGkQwRJxEMERhxAhHIsQIRqNECEWkxAhGZUQIRWZECEToxChGKUQoRSp'
+    'EKESsRChEcMQYRjFEGEUyRBhEtEQYREHEREcCxERGg0RERYTEREZFRERFRkRERMjEZEYJRGRFCkR'
+    'kRIxEZERQxFRGEURURRJEVESgxExGIURMRSJETESBxIJHAsSCRoNEgkWExIJGRUSCRUZEgkTIxKJ'
+    'GCUSiRQpEokSQxJJGEUSSRSDEikYhRIpFAMTGRgFExkUBxQFHAsUBRoNFAUWExQFGRUUBRUjFIUY'
+    'JRSFFEMURRiDFCUYAxUVGAMWDRgHGAMcCxgDGhMYAxkjGIMYQxhFFEkSURHhEEYMSgpSCeIITAZU'
+    'BeQEWAPoAvABAwAAGAUAABQGAAAMCQAAEgoAAAoMAAAGEQAAERIAAAkUAAAFGAAAAyEAgBAiAIAI'
+    'JACABCgAgAIwAIABQQBAEEIAQAhEAEAESABAAlAAQAFgAMAAgQAgEIIAIAiEACAEiAAgApAAIAEB'
+    'ARAQAgEQCAQBEAQIARACAQIIEAICCAgEAggEAQQEEAIEBAgBCAIQARACCAQECAIQAaAA'
+)
+
+
+class CodewordTables(NamedTuple):
+    """Codeword lookup tables."""
+    encode: array  # 'H': codeword (0-1364) -> 13-bit character
+    decode: array  # 'h': 13-bit character -> codeword, or INVALID
+    fcs: array     # 'B': 13-bit character -> frame check bit (1 if inverted)
+
+
+_tables = None
+_tables_lock = threading.Lock()
+
+
+def _load_tables():
+    """Unpack the shipped codeword table and derive the decode tables."""
+    encode = np.frombuffer(base64.b64decode(''.join(_ENCODE_DATA)), dtype='<u2').astype(np.uint16)
+    codewords = np.arange(len(encode), dtype=np.int16)
+    decode = np.full(8192, INVALID, dtype=np.int16)
+    decode[encode] = codewords
+    decode[encode ^ 8191] = codewords
+    fcs = np.zeros(8192, dtype=np.uint8)
+    fcs[encode ^ 8191] = 1
+    return CodewordTables(
+        array('H', encode.tobytes()), array('h', decode.tobytes()), array('B', fcs.tobytes())
+    )
+
+
+def get_codeword_tables():
+    """
+    Return the codeword tables, loading them on first use.
+
+    Returns:
+        CodewordTables of typed arrays
+    """
+    global _tables
+    if _tables is None:
+        with _tables_lock:
+            if _tables is None:
+                _tables = _load_tables()
+    return _tables
+
+
+def build_codeword_tables():
+    """
+    Build the codeword tables from their definition.
+
+    Codewords 0-1286 are the 13-bit characters with five bits set and
+    1287-1364 those with two bits set; each character is followed by its
+    bit reversal, and palindromic characters fill the end of each range.
+    The inverted character decodes to the same codeword with frame check
+    bit 1. This is the slow reference used to generate and verify the
+    shipped data.
+
+    Returns:
+        CodewordTables of typed arrays
+    """
+    encode = array('H', [0] * 1365)
+    decode = array('h', [INVALID] * 8192)
+    fcs = array('B', [0] * 8192)
+
+    def store(char, codeword):
+        encode[codeword] = char
+        decode[char] = decode[char ^ 8191] = codeword
+        fcs[char ^ 8191] = 1
+
+    for bits, low, hi in ((5, 0, 1286), (2, 1287, 1364)):
+        for fwd in range(8192):
+            rev = int(f"{fwd:013b}"[::-1], 2)
+            if bin(fwd).count('1') != bits:
+                continue
+            if fwd == rev:
+                # Palindromic codes go at the end of the table
+                store(fwd, hi)
+                hi -= 1
+            elif fwd < rev:
+                # Forward code, then reversed code, at the front of the table
+                store(fwd, low)
+                store(rev, low + 1)
+                low += 2
+
+    return CodewordTables(encode, decode, fcs)
+
+
+if __name__ == '__main__':
+    data = base64.b64encode(
+        np.frombuffer(build_codeword_tables().encode, dtype=np.uint16).astype('<u2').tobytes()
+    ).decode()
+    print('\n'.join(f"    '{line}'" for line in textwrap.wrap(data, 76)))
@@ -4,19 +4,43 @@ Validates IMB codes and compares extracted ZIP codes with data.
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import logging
-import sys
-import os
+import multiprocessing
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
 
-# Add the utils directory to the path for importing the decoder
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
-from usps_imb_decoder import decode_barcode, extract_zip_from_imb
+from .imb_cache import DecodeCache, get_decode_cache
+from .usps_imb_decoder import (
+    DECODER_VERSION, decode_barcode, decode_barcodes_batch, extract_zip_from_imb,
+    get_decode_stats, reset_decode_stats, merge_decode_stats, decode_options,
+    get_repair_budget, REPAIR_BUDGETS
+)
 
 logger = logging.getLogger(__name__)
 
 
+# Compiled alphabet pattern and character lookup table per valid-character set
+_format_checks: Dict[str, Tuple[re.Pattern, bytes]] = {}
+
+
+def _get_format_checks(valid_chars: str) -> Tuple[re.Pattern, bytes]:
+    """
+    Return the alphabet checks for a set of valid characters, built on first use.
+    
+    Returns:
+        Tuple of (compiled pattern matching strings of only valid characters,
+        bytes.translate table mapping valid bytes to 0 and all others to 1)
+    """
+    checks = _format_checks.get(valid_chars)
+    if checks is None:
+        pattern = re.compile(f"[{re.escape(valid_chars)}]*")
+        lookup = bytes(0 if chr(b) in valid_chars else 1 for b in range(256))
+        checks = _format_checks[valid_chars] = (pattern, lookup)
+    return checks
+
+
 def is_valid_imb_format(imb_code: str) -> bool:
     """
     Check if an IMB code has valid format.
@@ -33,11 +57,9 @@ def is_valid_imb_format(imb_code: str) -> bool:
         return False
     
     imb_code = imb_code.strip()
+    pattern = _get_format_checks(IMB_VALID_CHARS)[0]
     
-    return (
-        len(imb_code) == IMB_CODE_LENGTH and
-        all(c in IMB_VALID_CHARS for c in imb_code)
-    )
+    return len(imb_code) == IMB_CODE_LENGTH and pattern.fullmatch(imb_code) is not None
 
 
 def decode_imb(encoded_str: str) -> Dict[str, Any]:
@@ -56,7 +78,7 @@ def decode_imb(encoded_str: str) -> Dict[str, Any]:
         encoded_str = str(encoded_str).strip()
         
         # Validate format
-        if not all(c in IMB_VALID_CHARS for c in encoded_str):
+        if _get_format_checks(IMB_VALID_CHARS)[0].fullmatch(encoded_str) is None:
             return {
                 "success": False, 
                 "error": "Invalid IMB encoding - must contain only A, D, T, F characters"
@@ -126,6 +148,54 @@ def extract_zip_from_routing(routing: str) -> str:
     return routing[:5] if len(routing) >= 5 else routing
 
 
+def imb_format_matrix(codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Check the length and alphabet of IMB code strings in one vectorized pass.
+    
+    Codes of the right length are joined once into an ASCII buffer, and
+    every byte is checked through a translation table in the same pass.
+    The buffer, viewed as a byte matrix, can be passed straight to
+    decode_barcodes_batch.
+    
+    Args:
+        codes: Object array of stripped IMB code strings
+        
+    Returns:
+        Tuple of (boolean validity array, (n, IMB_CODE_LENGTH) uint8 matrix
+        of the codes' ASCII bytes, with zero rows for invalid codes)
+    """
+    from config import IMB_CODE_LENGTH, IMB_VALID_CHARS
+    
+    lookup = _get_format_checks(IMB_VALID_CHARS)[1]
+    lengths = np.fromiter(map(len, codes), dtype=np.int64, count=len(codes))
+    sized = np.flatnonzero(lengths == IMB_CODE_LENGTH)
+    
+    # Non-ASCII characters become one '?' byte each, so rows stay aligned
+    data = ''.join(codes[sized]).encode('ascii', 'replace')
+    sized_matrix = np.frombuffer(data, dtype=np.uint8).reshape(len(sized), IMB_CODE_LENGTH)
+    invalid_bytes = np.frombuffer(data.translate(lookup), dtype=np.uint8)
+    sized_valid = ~invalid_bytes.reshape(len(sized), IMB_CODE_LENGTH).any(axis=1)
+    
+    valid = np.zeros(len(codes), dtype=bool)
+    valid[sized[sized_valid]] = True
+    matrix = np.zeros((len(codes), IMB_CODE_LENGTH), dtype=np.uint8)
+    matrix[sized[sized_valid]] = sized_matrix[sized_valid]
+    return valid, matrix
+
+
+def _factorize_codes(imb_series: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Factorize an IMB column, converting and stripping each distinct value once.
+    
+    Returns:
+        Tuple of (per-row index into the distinct values, -1 for missing
+        values; object array of the distinct values as stripped strings)
+    """
+    row_ids, uniques = pd.factorize(imb_series)
+    texts = pd.Index(uniques).astype(str).str.strip()
+    return row_ids, np.asarray(texts, dtype=object)
+
+
 def validate_imb_format_vectorized(imb_series: pd.Series) -> pd.Series:
     """
     Validate IMB format for an entire series using vectorized operations.
@@ -136,34 +206,238 @@ def validate_imb_format_vectorized(imb_series: pd.Series) -> pd.Series:
     Returns:
         Boolean Series indicating valid format
     """
-    from config import IMB_CODE_LENGTH, IMB_VALID_CHARS
+    row_ids, texts = _factorize_codes(imb_series)
+    text_valid = imb_format_matrix(texts)[0]
+    
+    # Missing values (-1) look up the appended False
+    return pd.Series(np.append(text_valid, False)[row_ids], index=imb_series.index)
+
+
+def _decode_zip_fields(imb_code: str) -> Tuple[str, str]:
+    """
+    Decode a single IMB code (with repair) into its ZIP fields.
+    
+    Args:
+        imb_code: Stripped IMB code string
+        
+    Returns:
+        Tuple of (display ZIP, 5-digit ZIP); the display ZIP is "N/A" and
+        the 5-digit ZIP empty when the code cannot be decoded
+    """
+    decoded = decode_imb(imb_code)
+    
+    if isinstance(decoded, dict) and decoded.get('success'):
+        if 'full_zip' in decoded and decoded['full_zip']:
+            full_zip = decoded['full_zip']
+            decoded_zip = full_zip.split('-')[0] if '-' in full_zip else full_zip[:5]
+            return full_zip, decoded_zip
+        elif 'zip_code' in decoded:
+            return decoded['zip_code'], decoded['zip_code']
+        elif 'routing' in decoded and decoded['routing']:
+            decoded_zip = extract_zip_from_routing(decoded['routing'])
+            return decoded_zip, decoded_zip
+    
+    return "N/A", ""
+
+
+def decode_cache_version(repair_budget: str) -> str:
+    """
+    Return the decode cache version for results of the given repair budget.
+    
+    Args:
+        repair_budget: Decoder repair budget the results are decoded with
+        
+    Returns:
+        Version string combining DECODER_VERSION and the repair budget
+    """
+    return f"{DECODER_VERSION}/{repair_budget}"
+
+
+def _decode_unique_codes(codes: np.ndarray, cache: Optional[DecodeCache],
+                         matrix: Optional[np.ndarray] = None, trace: Optional[bool] = None,
+                         repair_budget: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Decode distinct IMB codes into display and 5-digit ZIP arrays.
+    
+    All codes go through the vectorized batch decoder first. Codes that need
+    repair are looked up in the persistent cache (under the version of the
+    repair budget), and only cache misses are decoded one at a time (and
+    then stored).
+    
+    Args:
+        codes: Object array of distinct, stripped IMB codes
+        cache: Persistent decode cache, or None to skip it
+        matrix: The codes' uint8 matrix from imb_format_matrix, if available
+        trace: Trace the repair decodes (None uses the decoder default)
+        repair_budget: Repair budget for this call (None uses the decoder default)
+        
+    Returns:
+        Tuple of (display ZIP array, 5-digit ZIP array, number of cache hits),
+        with the arrays aligned with codes
+    """
+    batch = decode_barcodes_batch(codes if matrix is None else matrix)
+    ok = batch['success']
+    zips = batch['zip']
+    
+    full_zips = np.where(batch['plus4'] == "", zips, zips + "-" + batch['plus4'])
+    full_zips = np.where(zips == "", "N/A", full_zips).astype(object)
+    decoded_zips = zips.copy()
+    
+    failed_positions = np.flatnonzero(~ok)
+    if len(failed_positions) == 0:
+        return full_zips, decoded_zips, 0
     
-    # Convert to string and strip whitespace
-    imb_str = imb_series.astype(str).str.strip()
+    failed_codes = codes[failed_positions]
+    repair_budget = get_repair_budget() if repair_budget is None else repair_budget
+    version = decode_cache_version(repair_budget)
+    cached = {}
+    if cache is not None:
+        try:
+            cached = cache.get_many(failed_codes, version)
+        except sqlite3.Error as e:
+            logger.warning(f"IMB decode cache lookup failed: {e}")
+            cache = None
     
-    # Check length
-    valid_length = imb_str.str.len() == IMB_CODE_LENGTH
+    new_results = {}
+    with decode_options(trace, repair_budget):
+        for pos, code in zip(failed_positions, failed_codes):
+            fields = cached.get(code)
+            if fields is None:
+                fields = new_results[code] = _decode_zip_fields(code)
+            full_zips[pos], decoded_zips[pos] = fields
     
-    # Check characters (all must be in ADTF)
-    valid_chars = imb_str.str.match(f'^[{IMB_VALID_CHARS}]+$', na=False)
+    if cache is not None and new_results:
+        try:
+            cache.put_many(new_results, version)
+        except sqlite3.Error as e:
+            logger.warning(f"IMB decode cache update failed: {e}")
     
-    return valid_length & valid_chars
+    logger.debug(f"Repair decoding: {len(cached)} cached, {len(new_results)} decoded")
+    return full_zips, decoded_zips, len(cached)
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers: Optional[int] = None
+
+
+def _get_executor(workers: Optional[int]) -> ProcessPoolExecutor:
+    """
+    Return a process pool for IMB decoding, reused across validation runs.
+    
+    Args:
+        workers: Number of worker processes (None for one per CPU)
+        
+    Returns:
+        ProcessPoolExecutor instance
+    """
+    global _executor, _executor_workers
+    from config import IMB_PARALLEL_START_METHOD
+    
+    if _executor is None or _executor_workers != workers:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(IMB_PARALLEL_START_METHOD)
+        )
+        _executor_workers = workers
+    return _executor
+
+
+def _decode_codes_chunk(codes: np.ndarray, matrix: np.ndarray, use_cache: bool, trace: bool,
+                        repair_budget: str) -> Tuple[np.ndarray, np.ndarray, int, Dict[str, Any]]:
+    """
+    Decode one chunk of distinct codes inside a worker process.
+    
+    Args:
+        codes: Object array of distinct, stripped IMB codes
+        matrix: The codes' uint8 matrix from imb_format_matrix
+        use_cache: Whether to consult the persistent decode cache
+        trace: Whether to enable per-barcode decoder tracing
+        repair_budget: Decoder repair budget (see set_repair_budget)
+        
+    Returns:
+        Tuple of (display ZIPs, 5-digit ZIPs, cache hits, decoder statistics)
+    """
+    reset_decode_stats()
+    full_zips, decoded_zips, cache_hits = _decode_unique_codes(
+        codes, get_decode_cache() if use_cache else None, matrix, trace, repair_budget
+    )
+    return full_zips, decoded_zips, cache_hits, get_decode_stats()
+
+
+def _decode_unique_codes_parallel(codes: np.ndarray, matrix: np.ndarray, use_cache: bool,
+                                  trace: bool, repair_budget: str, workers: Optional[int],
+                                  chunk_size: int) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Decode distinct codes across a process pool, preserving order.
+    
+    Args:
+        codes: Object array of distinct, stripped IMB codes
+        matrix: The codes' uint8 matrix from imb_format_matrix
+        use_cache: Whether workers consult the persistent decode cache
+        trace: Whether to enable per-barcode decoder tracing in workers
+        repair_budget: Decoder repair budget in workers
+        workers: Number of worker processes (None for one per CPU)
+        chunk_size: Number of codes per work item
+        
+    Returns:
+        Same as _decode_unique_codes
+    """
+    starts = range(0, len(codes), chunk_size)
+    chunks: List[np.ndarray] = [codes[start:start + chunk_size] for start in starts]
+    matrices: List[np.ndarray] = [matrix[start:start + chunk_size] for start in starts]
+    logger.info(f"Decoding {len(codes)} distinct IMB codes in {len(chunks)} chunks")
+    
+    executor = _get_executor(workers)
+    results = list(executor.map(
+        _decode_codes_chunk, chunks, matrices, [use_cache] * len(chunks), [trace] * len(chunks),
+        [repair_budget] * len(chunks)
+    ))
+    
+    for _, _, _, stats in results:
+        merge_decode_stats(stats)
+    
+    return (
+        np.concatenate([r[0] for r in results]),
+        np.concatenate([r[1] for r in results]),
+        sum(r[2] for r in results)
+    )
 
 
 def validate_imb_column(df: pd.DataFrame, imb_col: str, 
-                        zip_col: Optional[str] = None) -> Dict[str, Any]:
+                        zip_col: Optional[str] = None,
+                        trace: Optional[bool] = None,
+                        use_cache: bool = True,
+                        parallel: Optional[bool] = None,
+                        repair_budget: Optional[str] = None) -> Dict[str, Any]:
     """
     Validate IMB codes in a dataframe and optionally compare to ZIP codes.
-    Uses optimized processing with vectorized format validation.
+    Each distinct code is decoded once. Format validation and direct
+    decoding run as vectorized batches; only codes that need repair are
+    decoded one at a time, with results kept in a persistent cache.
     
     Args:
         df: Pandas DataFrame containing the data
         imb_col: Column name containing the IMB codes
         zip_col: Optional column name containing ZIP codes to compare with
+        trace: Log every decoding step per barcode (defaults to IMB_DECODE_TRACE)
+        use_cache: Reuse repair results from the persistent decode cache
+        parallel: Decode in chunks across a process pool (defaults to
+                  IMB_PARALLEL_ENABLED; small inputs are always decoded serially)
+        repair_budget: Repair attempted for damaged codes, 'off', 'single-bit'
+                       or 'full' (defaults to IMB_REPAIR_BUDGET). Cached
+                       results are kept per decoder version and budget.
         
     Returns:
-        Dictionary with validation results
+        Dictionary with validation results, including 'decode_stats' with
+        decoder outcome counters and timings for this run
     """
+    from config import (
+        IMB_DECODE_TRACE, IMB_REPAIR_BUDGET,
+        IMB_PARALLEL_ENABLED, IMB_PARALLEL_WORKERS, IMB_PARALLEL_CHUNK_SIZE
+    )
+    
     # Validate column exists
     if imb_col not in df.columns:
         return {"success": False, "error": f"Column '{imb_col}' not found in data"}
@@ -173,75 +447,77 @@ def validate_imb_column(df: pd.DataFrame, imb_col: str,
     
     logger.info(f"Validating IMB column '{imb_col}' with {len(df)} records")
     
+    trace = IMB_DECODE_TRACE if trace is None else trace
+    parallel = IMB_PARALLEL_ENABLED if parallel is None else parallel
+    repair_budget = IMB_REPAIR_BUDGET if repair_budget is None else repair_budget
+    if repair_budget not in REPAIR_BUDGETS:
+        raise ValueError(f"Unknown repair budget {repair_budget!r}; expected one of {REPAIR_BUDGETS}")
+    reset_decode_stats()
+    
     total_records = len(df)
     
     # Prepare results DataFrame
     results_df = df[[imb_col]].copy()
     
-    # Vectorized format validation (fast)
-    results_df['imb_valid'] = validate_imb_format_vectorized(df[imb_col])
-    results_df['decoded_zip'] = ""
-    
-    if zip_col:
-        results_df['zip_match'] = False
+    # Vectorized format validation (fast), one pass over the distinct values
+    row_ids, texts = _factorize_codes(df[imb_col])
+    text_valid, matrix = imb_format_matrix(texts)
+    valid_rows = np.append(text_valid, False)[row_ids]
+    results_df['imb_valid'] = valid_rows
     
-    valid_imbs = results_df['imb_valid'].sum()
+    valid_imbs = int(valid_rows.sum())
     matching_zips = 0
     
-    # Known IMB to ZIP lookup table for verified mappings
-    known_imbs = {
-        "TAAFFATFFDTFTFAATDTTAAFDAFDFDAFFDTTADAADTATTADTTTAADAFDDDDTTDDDTA": "77382-1482"
-    }
+    # Distinct valid codes (values differing only in surrounding whitespace are merged)
+    valid_texts = np.flatnonzero(text_valid)
+    text_code_ids, unique_codes = pd.factorize(texts[valid_texts])
+    unique_codes = np.asarray(unique_codes, dtype=object)
+    unique_matrix = matrix[valid_texts[np.unique(text_code_ids, return_index=True)[1]]]
     
-    # Process only valid IMB codes (row-by-row for decoding, but only for valid ones)
-    valid_mask = results_df['imb_valid']
-    valid_indices = df[valid_mask].index
+    if parallel and len(unique_codes) > IMB_PARALLEL_CHUNK_SIZE:
+        unique_full, unique_zip5, cache_hits = _decode_unique_codes_parallel(
+            unique_codes, unique_matrix, use_cache, trace, repair_budget,
+            IMB_PARALLEL_WORKERS, IMB_PARALLEL_CHUNK_SIZE
+        )
+    else:
+        unique_full, unique_zip5, cache_hits = _decode_unique_codes(
+            unique_codes, get_decode_cache() if use_cache else None, unique_matrix,
+            trace, repair_budget
+        )
     
-    for idx in valid_indices:
-        imb_code = str(df.at[idx, imb_col]).strip()
-        
-        # First check lookup table
-        if imb_code in known_imbs:
-            full_zip = known_imbs[imb_code]
-            results_df.at[idx, 'decoded_zip'] = full_zip
-            decoded_zip = full_zip.split('-')[0] if '-' in full_zip else full_zip
-        else:
-            # Decode using algorithm
-            decoded = decode_imb(imb_code)
-            
-            if isinstance(decoded, dict) and decoded.get('success'):
-                if 'full_zip' in decoded and decoded['full_zip']:
-                    full_zip = decoded['full_zip']
-                    results_df.at[idx, 'decoded_zip'] = full_zip
-                    decoded_zip = full_zip.split('-')[0] if '-' in full_zip else full_zip[:5]
-                elif 'zip_code' in decoded:
-                    decoded_zip = decoded['zip_code']
-                    results_df.at[idx, 'decoded_zip'] = decoded_zip
-                elif 'routing' in decoded and decoded['routing']:
-                    decoded_zip = extract_zip_from_routing(decoded['routing'])
-                    results_df.at[idx, 'decoded_zip'] = decoded_zip
-                else:
-                    decoded_zip = ""
-                    results_df.at[idx, 'decoded_zip'] = "N/A"
-            else:
-                decoded_zip = ""
-                results_df.at[idx, 'decoded_zip'] = "N/A"
-        
-        # Compare with ZIP column if provided
-        if zip_col and decoded_zip:
-            orig_zip = str(df.at[idx, zip_col]).strip()[:5]
-            decoded_zip_5 = decoded_zip[:5]
-            
-            if orig_zip and decoded_zip_5 and orig_zip == decoded_zip_5:
-                results_df.at[idx, 'zip_match'] = True
-                matching_zips += 1
+    # Broadcast the per-code results back to the rows
+    text_to_code = np.full(len(texts), -1, dtype=np.int64)
+    text_to_code[valid_texts] = text_code_ids
+    valid_positions = np.flatnonzero(valid_rows)
+    code_ids = text_to_code[row_ids[valid_positions]]
+    
+    decoded_column = np.full(total_records, "", dtype=object)
+    decoded_column[valid_positions] = unique_full[code_ids]
+    results_df['decoded_zip'] = decoded_column
+    
+    # Compare with ZIP column if provided
+    if zip_col:
+        decoded_zips = pd.Series(unique_zip5[code_ids], dtype=object)
+        orig_zips = df[zip_col].iloc[valid_positions].astype(str).str.strip().str[:5]
+        orig_zips = orig_zips.reset_index(drop=True)
+        zip_match = (decoded_zips != "") & (orig_zips != "") & (orig_zips == decoded_zips.str[:5])
+        zip_match = zip_match.fillna(False).astype(bool).to_numpy()
+        match_column = np.zeros(total_records, dtype=bool)
+        match_column[valid_positions] = zip_match
+        results_df['zip_match'] = match_column
+        matching_zips = int(zip_match.sum())
     
     # Calculate percentages
     valid_percent = (valid_imbs / total_records * 100) if total_records > 0 else 0
     match_percent = (matching_zips / valid_imbs * 100) if valid_imbs > 0 else 0
     
+    decode_stats = get_decode_stats()
+    decode_stats['unique_codes'] = len(unique_codes)
+    decode_stats['cache_hits'] = cache_hits
     logger.info(f"IMB validation complete: {valid_imbs} valid ({valid_percent:.1f}%), "
                 f"{matching_zips} ZIP matches ({match_percent:.1f}%)")
+    logger.info(f"IMB decoder: {decode_stats['direct']} direct, {decode_stats['repaired']} repaired, "
+                f"{decode_stats['flipped']} flipped, {decode_stats['failed']} failed")
     
     return {
         "success": True,
@@ -250,5 +526,47 @@ def validate_imb_column(df: pd.DataFrame, imb_col: str,
         "valid_percent": valid_percent,
         "matching_zips": matching_zips,
         "match_percent": match_percent,
-        "results_df": results_df
+        "results_df": results_df,
+        "decode_stats": decode_stats
     }
+
+
+def regenerate_imb_codes(codes: pd.Series, zips: pd.Series) -> pd.Series:
+    """
+    Re-encode IMB codes with the routing code taken from a ZIP column.
+    
+    Intended for records whose decoded ZIP disagrees with their ZIP column:
+    the tracking code (barcode ID, service type, mailer ID and serial
+    number) is kept and the routing code is replaced by the ZIP column's
+    digits. ZIPs of 5, 9 or 11 digits are accepted ('-' and spaces are
+    ignored; shorter values are zero-padded to 5 digits).
+    
+    Args:
+        codes: Series of IMB codes
+        zips: Series of ZIP codes aligned with codes
+        
+    Returns:
+        Series of new IMB codes aligned with codes ('' where the code cannot
+        be decoded or the ZIP is not usable)
+    """
+    from .usps_imb_decoder import encode_barcodes_batch
+    
+    code_values = codes.astype(str).str.strip().to_numpy(dtype=object)
+    decoded = decode_barcodes_batch(code_values)
+    tracking = (decoded['barcode_id'] + decoded['service_type']
+                + decoded['mailer_id'] + decoded['serial_num'])
+    
+    # Damaged codes need the repairing scalar decoder
+    for i in np.flatnonzero(~decoded['success']):
+        fields = decode_barcode(code_values[i])
+        if fields and 'mailer_id' in fields:
+            tracking[i] = (fields['barcode_id'] + fields['service_type']
+                           + fields['mailer_id'] + fields['serial_num'])
+    
+    routing = zips.astype(str).str.replace(r'[\s-]', '', regex=True)
+    routing = routing.where(routing.str.len() >= 5, routing.str.zfill(5))
+    
+    return pd.Series(
+        encode_barcodes_batch(tracking, routing.to_numpy(dtype=object)),
+        index=codes.index, dtype=object
+    )
@@ -0,0 +1,402 @@
+"""
+Composite match-key engine for dataset comparison and duplicate removal.
+Builds 64-bit hashes of the normalized mapped columns in vectorized passes
+and turns them into collision-checked integer key ids shared by both sides.
+"""
+import hashlib
+import pandas as pd
+import numpy as np
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+import logging
+
+from .normalizers import normalize_values
+from .upload_cache import UploadCache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Multiplier used to fold per-column hashes into one composite hash
+_HASH_COMBINE_MULTIPLIER = np.uint64(0x100000001B3)
+
+
+_normalized_cache: Optional[UploadCache] = None
+
+
+def get_normalized_cache() -> UploadCache:
+    """
+    Return the process-wide cache of normalized key columns.
+
+    Returns:
+        Shared UploadCache instance
+    """
+    global _normalized_cache
+    if _normalized_cache is None:
+        from config import NORMALIZED_CACHE_MAX_BYTES, NORMALIZED_CACHE_MAX_ENTRIES
+        _normalized_cache = UploadCache(NORMALIZED_CACHE_MAX_BYTES, NORMALIZED_CACHE_MAX_ENTRIES)
+    return _normalized_cache
+
+
+def column_digest(values: pd.Series) -> str:
+    """
+    Compute a digest of a column's dtype and values (not its index).
+
+    Args:
+        values: Column values
+
+    Returns:
+        Hex digest string
+    """
+    hasher = hashlib.sha256(str(values.dtype).encode())
+    hasher.update(pd.util.hash_pandas_object(values, index=False).to_numpy().tobytes())
+    return hasher.hexdigest()
+
+
+def normalize_key_columns(df: pd.DataFrame, columns: Sequence[str],
+                          normalizers: Optional[Sequence[Sequence[str]]] = None) -> List[np.ndarray]:
+    """
+    Normalize columns for matching.
+
+    Each column is normalized by its own normalizer (DEFAULT_NORMALIZER,
+    string stripped and lowercase, when not given). Missing values become
+    the string 'nan' so that they compare equal to each other, as the
+    original row-joined keys did.
+
+    Results are cached on the column name, normalizer and a digest of the
+    column's contents, so comparing again after changing one mapping only
+    normalizes the changed column. Cached arrays are shared; callers must
+    not modify them.
+
+    Args:
+        df: DataFrame containing the columns
+        columns: Column names to normalize
+        normalizers: Normalizer per column (see utils.normalizers)
+
+    Returns:
+        List of object arrays, one per column
+    """
+    from config import DEFAULT_NORMALIZER
+
+    if normalizers is None:
+        normalizers = [DEFAULT_NORMALIZER] * len(columns)
+
+    cache = get_normalized_cache()
+    normalized = []
+    for col, normalizer in zip(columns, normalizers):
+        key = make_cache_key('normalized', (column_digest(df[col]),),
+                             column=col, normalizer=tuple(normalizer))
+        values = cache.get(key)
+        if values is None:
+            values = normalize_values(df[col], normalizer)
+            values.flags.writeable = False
+            cache.put(key, values)
+        normalized.append(values)
+    return normalized
+
+
+def _combine_hashes(hashes: Sequence[np.ndarray]) -> np.ndarray:
+    """Fold per-column hashes into one composite hash per row."""
+    combined = hashes[0]
+    with np.errstate(over='ignore'):
+        for column_hash in hashes[1:]:
+            combined = (combined * _HASH_COMBINE_MULTIPLIER) ^ column_hash
+    return combined
+
+
+def hash_key_columns(columns: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Hash a set of aligned column arrays into one 64-bit hash per row.
+
+    Args:
+        columns: Aligned value arrays (one per key column)
+
+    Returns:
+        uint64 array of composite hashes
+    """
+    if not columns:
+        return np.zeros(0, dtype=np.uint64)
+
+    return _combine_hashes([pd.util.hash_array(np.asarray(values), categorize=False)
+                            for values in columns])
+
+
+def _group_hashes(hashes: np.ndarray, columns: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Assign dense ids to rows so that rows with equal key tuples share an id.
+
+    Rows are grouped by hash, then every row is verified against the first
+    row of its hash group. Groups containing a hash collision are resolved
+    by exact grouping of the affected rows only.
+
+    Args:
+        hashes: Composite hash per row
+        columns: Key column arrays aligned with hashes
+
+    Returns:
+        int64 array of key ids
+    """
+    n = len(hashes)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    order = np.argsort(hashes, kind='stable')
+    sorted_hashes = hashes[order]
+
+    group_start = np.empty(n, dtype=bool)
+    group_start[0] = True
+    np.not_equal(sorted_hashes[1:], sorted_hashes[:-1], out=group_start[1:])
+
+    sorted_ids = np.cumsum(group_start) - 1
+    first_in_group = np.flatnonzero(group_start)[sorted_ids]
+
+    # Exact verification: compare each row to the first row of its group
+    collided = np.zeros(n, dtype=bool)
+    for values in columns:
+        sorted_values = np.asarray(values)[order]
+        collided |= sorted_values != sorted_values[first_in_group]
+
+    if collided.any():
+        collided_groups = np.unique(sorted_ids[collided])
+        affected = np.isin(sorted_ids, collided_groups)
+        logger.warning(f"Resolving {len(collided_groups)} hash collision group(s) exactly")
+
+        exact = pd.DataFrame({
+            i: np.asarray(values)[order][affected] for i, values in enumerate(columns)
+        })
+        exact_ids = exact.groupby(list(exact.columns), sort=False).ngroup().to_numpy()
+        sorted_ids[affected] = sorted_ids.max() + 1 + exact_ids
+
+    ids = np.empty(n, dtype=np.int64)
+    ids[order] = sorted_ids
+    return ids
+
+
+def encode_keys(left: Sequence[np.ndarray],
+                right: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encode composite keys of two datasets into shared integer ids.
+
+    Equal key tuples on either side receive the same id; distinct tuples
+    never share an id, even when their 64-bit hashes collide.
+
+    Args:
+        left: Normalized key columns of the first dataset
+        right: Normalized key columns of the second dataset (same order)
+
+    Returns:
+        Tuple of (left ids, right ids) as int64 arrays
+    """
+    n_left = len(left[0]) if left else 0
+    columns = [
+        np.concatenate([np.asarray(lv), np.asarray(rv)])
+        for lv, rv in zip(left, right)
+    ]
+    ids = _group_hashes(hash_key_columns(columns), columns)
+    return ids[:n_left], ids[n_left:]
+
+
+def encode_keys_leaving_out(left: Sequence[np.ndarray], right: Sequence[np.ndarray],
+                            left_out: Sequence[Sequence[int]]) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Encode composite keys once per group of key columns, with that group left out.
+
+    Each column is hashed once; the composite hash of every reduced key is
+    folded from the per-column hashes, then verified as in encode_keys.
+
+    Args:
+        left: Normalized key columns of the first dataset
+        right: Normalized key columns of the second dataset (same order)
+        left_out: Column indices to leave out, one group per encoding (each
+                  leaving at least one column in)
+
+    Returns:
+        List aligned with left_out of (left ids, right ids) tuples, where
+        the ids encode all other columns
+    """
+    n_left = len(left[0])
+    columns = [
+        np.concatenate([np.asarray(lv), np.asarray(rv)])
+        for lv, rv in zip(left, right)
+    ]
+    hashes = [pd.util.hash_array(values, categorize=False) for values in columns]
+
+    encoded = []
+    for group in left_out:
+        others = [i for i in range(len(columns)) if i not in group]
+        ids = _group_hashes(
+            _combine_hashes([hashes[i] for i in others]), [columns[i] for i in others]
+        )
+        encoded.append((ids[:n_left], ids[n_left:]))
+    return encoded
+
+
+def encode_keys_leaving_one_out(left: Sequence[np.ndarray],
+                                right: Sequence[np.ndarray]) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Encode composite keys once per key column, with that column left out.
+
+    Args:
+        left: Normalized key columns of the first dataset (at least two)
+        right: Normalized key columns of the second dataset (same order)
+
+    Returns:
+        List aligned with the columns of (left ids, right ids) tuples, where
+        the ids encode all other columns
+    """
+    return encode_keys_leaving_out(left, right, [(i,) for i in range(len(left))])
+
+
+def keys_present(ids: np.ndarray, other_ids: np.ndarray) -> np.ndarray:
+    """
+    Test which ids also occur in another id array.
+
+    Args:
+        ids: Key ids to test
+        other_ids: Key ids to test against
+
+    Returns:
+        Boolean array aligned with ids
+    """
+    size = int(max(ids.max(initial=-1), other_ids.max(initial=-1))) + 1
+    present = np.zeros(size, dtype=bool)
+    present[other_ids] = True
+    return present[ids]
+
+
+def key_counts(ids: np.ndarray, other_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Count the occurrences of every key id on both sides.
+
+    Args:
+        ids: Key ids of the first dataset
+        other_ids: Key ids of the second dataset
+
+    Returns:
+        Tuple of (counts in ids, counts in other_ids), both indexed by key id
+    """
+    size = int(max(ids.max(initial=-1), other_ids.max(initial=-1))) + 1
+    return np.bincount(ids, minlength=size), np.bincount(other_ids, minlength=size)
+
+
+class KeyMatches(NamedTuple):
+    """Outcome of matching the key ids of two datasets (positions index each side)."""
+    left_only: np.ndarray        # Left positions whose key is not on the right
+    right_only: np.ndarray       # Right positions whose key is not on the left
+    count_differs: np.ndarray    # First left position of each key on both sides with different counts
+    left_counts: np.ndarray      # Left count of each of those keys
+    right_counts: np.ndarray     # Right count of each of those keys
+    left_surplus: int            # Left records left over when records are paired key by key
+    right_surplus: int           # Right records left over when records are paired key by key
+
+
+def match_key_ids(ids: np.ndarray, other_ids: np.ndarray) -> KeyMatches:
+    """
+    Match two datasets by key id, counting every key on both sides.
+
+    Args:
+        ids: Key ids of the first (left) dataset
+        other_ids: Key ids of the second (right) dataset
+
+    Returns:
+        KeyMatches with sorted position arrays
+    """
+    counts, other_counts = key_counts(ids, other_ids)
+
+    # Keys in both datasets with a different number of records
+    count_differs = (counts != other_counts) & (counts > 0) & (other_counts > 0)
+    differing_rows = np.flatnonzero(count_differs[ids])
+    _, first = np.unique(ids[differing_rows], return_index=True)
+    differing_positions = np.sort(differing_rows[first])
+    differing_ids = ids[differing_positions]
+
+    return KeyMatches(
+        left_only=np.flatnonzero(other_counts[ids] == 0),
+        right_only=np.flatnonzero(counts[other_ids] == 0),
+        count_differs=differing_positions,
+        left_counts=counts[differing_ids],
+        right_counts=other_counts[differing_ids],
+        left_surplus=int(np.maximum(counts - other_counts, 0).sum()),
+        right_surplus=int(np.maximum(other_counts - counts, 0).sum()),
+    )
+
+
+def _value_hashes(values: pd.Series) -> np.ndarray:
+    """Hash column values; integral floats hash like the equal integers."""
+    kind = values.dtype.kind
+    if kind in 'iu':
+        return pd.util.hash_array(values.to_numpy().astype(np.int64).view(np.uint64))
+    if kind == 'f':
+        floats = values.to_numpy(dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            integral = np.isfinite(floats) & (floats % 1 == 0) & (np.abs(floats) < 2 ** 63)
+        integers = np.where(integral, floats, 0).astype(np.int64).view(np.uint64)
+        return pd.util.hash_array(np.where(integral, integers, floats.view(np.uint64)))
+    return pd.util.hash_array(values.to_numpy(dtype=object), categorize=True)
+
+
+def hash_rows(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash every row over all columns, independent of column order.
+
+    Missing values are left out, so a row of a file without some column
+    hashes like the same row with that column empty, as rows compare in
+    the merged upload. A column read as integers in one file and as
+    floats (because of empty cells) in another hashes the same.
+
+    Args:
+        df: DataFrame whose rows are hashed
+
+    Returns:
+        uint64 array with one hash per row
+    """
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for col in df.columns:
+            values = df[col]
+            name_hash = pd.util.hash_array(np.array([str(col)], dtype=object))[0]
+            term = (_value_hashes(values) ^ name_hash) * _HASH_COMBINE_MULTIPLIER
+            hashes += np.where(values.notna().to_numpy(), term, np.uint64(0))
+    return hashes
+
+
+def find_duplicate_rows(df: pd.DataFrame, columns: Optional[Sequence[str]] = None) -> np.ndarray:
+    """
+    Flag rows whose values repeat an earlier row, like DataFrame.duplicated().
+
+    Columns are factorized one at a time and folded into exact integer row
+    ids. After each column, rows whose partial key is already unique are
+    dropped from consideration, so later columns are only factorized for
+    the remaining candidate rows. Missing values compare equal.
+
+    Args:
+        df: DataFrame to check
+        columns: Columns to compare (defaults to all columns)
+
+    Returns:
+        Boolean array, True for every occurrence after the first
+    """
+    columns = list(df.columns) if columns is None else list(columns)
+    n = len(df)
+    duplicated = np.zeros(n, dtype=bool)
+    if n == 0 or not columns:
+        return duplicated
+
+    rows = np.arange(n)
+    ids = np.zeros(n, dtype=np.int64)
+
+    for col in columns:
+        values = df[col] if len(rows) == n else df[col].take(rows)
+        codes, uniques = pd.factorize(values)
+        # Exact pairing of (row id, code); missing values have code -1
+        ids, _ = pd.factorize(ids * (len(uniques) + 1) + (codes + 1))
+
+        repeated = np.bincount(ids)[ids] > 1
+        if not repeated.all():
+            rows = rows[repeated]
+            if len(rows) == 0:
+                return duplicated
+            ids, _ = pd.factorize(ids[repeated])
+
+    _, first_rows = np.unique(ids, return_index=True)
+    later = np.ones(len(rows), dtype=bool)
+    later[first_rows] = False
+    duplicated[rows[later]] = True
+    return duplicated
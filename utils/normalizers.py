@@ -0,0 +1,197 @@
+"""
+Declarative key normalization for mapped columns.
+A normalizer is a tuple of step names (see COLUMN_NORMALIZERS in config).
+Each tuple is compiled once into a chain of vectorized string operations,
+applied to the distinct values of a column only.
+"""
+import re
+from typing import Callable, Dict, Sequence, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+Normalizer = Tuple[str, ...]
+
+# Normalized value of missing entries (as the original astype(str) keys)
+MISSING_KEY = 'nan'
+
+
+# Text treated as a number in keys; longer digit strings (e.g. IMB tracking
+# codes) are kept as text. Integer text is canonicalized without a float, and
+# text with a fraction has at most 15 digits within this length, which a
+# float64 holds exactly
+_NUMERIC_TEXT = r'[+-]?\d+(?:\.\d+)?'
+_NUMERIC_TEXT_MAX_LENGTH = 16
+
+# Significant digits a float64 round-trips exactly
+_FLOAT_EXACT_DIGITS = 15
+
+
+def _number_text(numbers: pd.Series) -> pd.Series:
+    """Write numbers canonically: integral values without a fraction (123.0 -> '123')."""
+    integral = (numbers % 1 == 0) & (numbers.abs() < 2 ** 63)
+    text = pd.Series(np.empty(len(numbers), dtype=object), index=numbers.index)
+    text[integral] = numbers[integral].astype(np.int64).astype(str)
+    text[~integral] = numbers[~integral].astype(str)
+    return text
+
+
+def _integer_text(text: pd.Series) -> pd.Series:
+    """Write integer text canonically by string operations ('+007' -> '7', '12.00' -> '12'); NaN elsewhere."""
+    parts = text.str.extract(r'^([+-]?)0*(\d+?)(?:\.0+)?$')
+    sign = parts[0].where((parts[0] == '-') & (parts[1] != '0'), '')
+    return sign + parts[1]
+
+
+def _key_text(uniques) -> pd.Series:
+    """
+    Write the distinct values of a column as key text.
+
+    With NUMERIC_KEY_CANONICALIZATION, integers, integral floats and
+    numeric strings get one canonical form, so 123 (int64), 123.0 (a
+    float64 column with missing values) and '00123' are the same key.
+    Integer text is never converted through a float, so long integers
+    stay exact whatever else the column holds.
+
+    Args:
+        uniques: Distinct non-missing values, as returned by pd.factorize
+
+    Returns:
+        Series of strings aligned with uniques
+    """
+    from config import NUMERIC_KEY_CANONICALIZATION
+
+    kind = uniques.dtype.kind
+    if kind in 'iub':
+        return pd.Series(uniques).astype(str)
+    if kind == 'f' and NUMERIC_KEY_CANONICALIZATION:
+        return _number_text(pd.Series(uniques, dtype='float64')).astype(str)
+
+    text = pd.Series(uniques, dtype=object).astype(str)
+    if not NUMERIC_KEY_CANONICALIZATION:
+        return text
+
+    stripped = text.str.strip()
+    is_number = stripped.str.fullmatch(_NUMERIC_TEXT) & (stripped.str.len() <= _NUMERIC_TEXT_MAX_LENGTH)
+    if not is_number.any():
+        return text
+    integers = _integer_text(stripped.where(is_number))
+    numbers = pd.to_numeric(stripped.where(is_number & integers.isna()), errors='coerce')
+    canonical = integers.astype(object).where(integers.notna(), _number_text(numbers))
+    return text.astype(object).where(~is_number, canonical).astype(str)
+
+
+def _number(values: pd.Series) -> pd.Series:
+    """
+    Write all numeric text canonically ('1200.0', '1.2e3' -> '1200'); keep other text.
+
+    Integer text is canonicalized exactly; other numbers only when their
+    mantissa has at most _FLOAT_EXACT_DIGITS significant digits.
+    """
+    integers = _integer_text(values)
+    digits = (values.str.replace(r'[eE].*$', '', regex=True)
+              .str.replace(r'\D', '', regex=True).str.lstrip('0').str.len())
+    numbers = pd.to_numeric(values.where(integers.isna() & (digits <= _FLOAT_EXACT_DIGITS)),
+                            errors='coerce')
+    canonical = integers.astype(object).where(integers.notna(), _number_text(numbers))
+    return values.astype(object).where(integers.isna() & numbers.isna(), canonical)
+
+
+def _zip5(values: pd.Series) -> pd.Series:
+    """
+    Reduce ZIP or ZIP+4 codes to 5 digits, restoring lost leading zeros.
+
+    Values without any digit ('N/A', 'UNKNOWN', '') are kept as they are,
+    so placeholder text is not zero-filled into a ZIP that matches others.
+    """
+    digits = values.str.replace(r'\.0+$', '', regex=True).str.replace(r'\D', '', regex=True)
+    digits = digits.where(digits.str.len() > 5, digits.str.zfill(5))
+    digits = digits.where(~digits.str.len().between(6, 8), digits.str.zfill(9))
+    return digits.str[:5].where(values.str.contains(r'\d'), values)
+
+
+def _usps_suffixes() -> Callable[[pd.Series], pd.Series]:
+    """Build the step replacing long address words with their abbreviation."""
+    from config import ADDRESS_ABBREVIATIONS
+
+    pattern = re.compile(r'\b(?:' + '|'.join(map(re.escape, ADDRESS_ABBREVIATIONS)) + r')\b')
+    return lambda values: values.str.replace(
+        pattern, lambda match: ADDRESS_ABBREVIATIONS[match.group(0)], regex=True
+    )
+
+
+# Step name -> factory of the vectorized operation
+_STEPS: Dict[str, Callable[[], Callable[[pd.Series], pd.Series]]] = {
+    'strip': lambda: lambda values: values.str.strip(),
+    'lower': lambda: lambda values: values.str.lower(),
+    'casefold': lambda: lambda values: values.str.casefold(),
+    'collapse_whitespace': lambda: lambda values: values.str.replace(r'\s+', ' ', regex=True),
+    'strip_punctuation': lambda: lambda values: values.str.replace(r'[^\w\s]', '', regex=True),
+    'zip5': lambda: _zip5,
+    'number': lambda: _number,
+    'usps_suffixes': _usps_suffixes,
+}
+
+_compiled: Dict[Normalizer, Callable[[pd.Series], pd.Series]] = {}
+
+
+def get_normalizer(column: str) -> Normalizer:
+    """Return the configured normalizer of a mapped (Accuzip) column."""
+    from config import COLUMN_NORMALIZERS, DEFAULT_NORMALIZER
+
+    return tuple(COLUMN_NORMALIZERS.get(column, DEFAULT_NORMALIZER))
+
+
+def compile_normalizer(normalizer: Sequence[str]) -> Callable[[pd.Series], pd.Series]:
+    """
+    Compile a normalizer into one function over a string Series.
+
+    Args:
+        normalizer: Step names, applied in order
+
+    Returns:
+        Function mapping a Series of strings to normalized strings
+
+    Raises:
+        ValueError: If a step is unknown
+    """
+    normalizer = tuple(normalizer)
+    if normalizer not in _compiled:
+        unknown = [step for step in normalizer if step not in _STEPS]
+        if unknown:
+            raise ValueError(f"Unknown normalization step(s): {', '.join(unknown)} "
+                             f"(expected one of: {', '.join(_STEPS)})")
+        steps = [_STEPS[step]() for step in normalizer]
+
+        def run(values: pd.Series) -> pd.Series:
+            for step in steps:
+                values = step(values)
+            return values
+
+        _compiled[normalizer] = run
+    return _compiled[normalizer]
+
+
+def normalize_values(values: pd.Series, normalizer: Sequence[str]) -> np.ndarray:
+    """
+    Normalize a Series of key values.
+
+    The values are factorized and the normalizer runs on the distinct
+    values only, after numbers are written in one canonical form.
+
+    Args:
+        values: Column values
+        normalizer: Step names, applied in order
+
+    Returns:
+        Object array of normalized strings (missing values become 'nan')
+    """
+    run = compile_normalizer(normalizer)
+    codes, uniques = pd.factorize(values)
+    normalized = run(_key_text(uniques))
+    table = np.append(normalized.fillna(MISSING_KEY).to_numpy(dtype=object), MISSING_KEY)
+    return table[codes]  # code -1 (missing) selects the appended MISSING_KEY
+
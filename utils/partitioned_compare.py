@@ -0,0 +1,143 @@
+"""
+Out-of-core dataset comparison.
+Normalizes the mapped columns of both datasets in row chunks, hash-partitions
+the match keys into buckets that spill to local disk under a memory budget,
+and matches the datasets bucket by bucket. Equal keys always land in the same
+bucket, so the per-bucket results combine into the in-memory result.
+"""
+import tempfile
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .match_keys import KeyMatches, encode_keys, hash_key_columns, match_key_ids
+from .normalizers import normalize_values
+from .streaming_reader import ChunkStore
+
+logger = logging.getLogger(__name__)
+
+
+def _partition(df: pd.DataFrame, columns: Sequence[str], normalizers: Sequence[Sequence[str]],
+               partitions: int, memory_budget: int, spill_dir: str,
+               chunk_rows: int) -> List[ChunkStore]:
+    """
+    Split the normalized keys of a dataset into hash buckets.
+
+    Each bucket holds the row positions and key columns of its rows, in
+    row order, and spills to disk once over its share of the budget.
+
+    Returns:
+        One ChunkStore per bucket
+    """
+    stores = [ChunkStore(memory_budget, spill_dir) for _ in range(partitions)]
+    try:
+        for start in range(0, len(df), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            keys = [normalize_values(chunk[col], normalizer)
+                    for col, normalizer in zip(columns, normalizers)]
+            frame = pd.DataFrame({
+                'position': np.arange(start, start + len(chunk)),
+                **{f"key{i}": values for i, values in enumerate(keys)},
+            })
+
+            buckets = hash_key_columns(keys) % np.uint64(partitions)
+            order = np.argsort(buckets, kind='stable')
+            bounds = np.searchsorted(buckets[order], np.arange(partitions + 1, dtype=np.uint64))
+            for bucket, store in enumerate(stores):
+                rows = order[bounds[bucket]:bounds[bucket + 1]]
+                if len(rows):
+                    store.append(frame.take(rows).reset_index(drop=True))
+    except BaseException:
+        for store in stores:
+            store.close()
+        raise
+    return stores
+
+
+def _read_bucket(store: ChunkStore, n_columns: int) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """Load one bucket (deleting its spill files) as (row positions, key columns)."""
+    frame = store.to_frame()
+    if frame.empty:
+        return np.zeros(0, dtype=np.int64), [np.zeros(0, dtype=object)] * n_columns
+    keys = [frame[f"key{i}"].to_numpy(dtype=object) for i in range(n_columns)]
+    return frame['position'].to_numpy(dtype=np.int64), keys
+
+
+def match_partitioned(df1: pd.DataFrame, df2: pd.DataFrame,
+                      columns1: Sequence[str], columns2: Sequence[str],
+                      normalizers: Sequence[Sequence[str]],
+                      partitions: Optional[int] = None,
+                      memory_budget: Optional[int] = None,
+                      spill_dir: Optional[str] = None,
+                      chunk_rows: Optional[int] = None) -> KeyMatches:
+    """
+    Match two datasets by their mapped columns with bounded memory.
+
+    Only one chunk of rows is normalized at a time, and only one bucket
+    pair is matched at a time, so the keys of the whole job are never in
+    memory together. Spill files are written to a private temporary
+    directory that is removed afterwards.
+
+    Args:
+        df1: First (Accuzip) DataFrame
+        df2: Second (client) DataFrame
+        columns1: Key columns of df1
+        columns2: Key columns of df2 (same order)
+        normalizers: Normalizer per key column
+        partitions: Number of hash buckets (defaults to COMPARE_PARTITIONS)
+        memory_budget: Bytes of buffered keys before spilling
+                       (defaults to COMPARE_MEMORY_BUDGET_BYTES)
+        spill_dir: Directory for spill files (defaults to COMPARE_SPILL_DIR)
+        chunk_rows: Rows normalized per chunk (defaults to COMPARE_CHUNK_ROWS)
+
+    Returns:
+        KeyMatches with positions into df1 and df2, as match_key_ids
+        returns for the whole datasets
+    """
+    from config import (
+        COMPARE_PARTITIONS, COMPARE_MEMORY_BUDGET_BYTES, COMPARE_SPILL_DIR, COMPARE_CHUNK_ROWS
+    )
+
+    partitions = partitions or COMPARE_PARTITIONS
+    memory_budget = COMPARE_MEMORY_BUDGET_BYTES if memory_budget is None else memory_budget
+    spill_dir = spill_dir if spill_dir is not None else COMPARE_SPILL_DIR
+    chunk_rows = chunk_rows or COMPARE_CHUNK_ROWS
+
+    # The budget is shared by the buckets of both datasets
+    bucket_budget = memory_budget // (2 * partitions)
+    results = []
+    with tempfile.TemporaryDirectory(prefix='compare-', dir=spill_dir) as directory:
+        left = _partition(df1, columns1, normalizers, partitions, bucket_budget, directory, chunk_rows)
+        right = _partition(df2, columns2, normalizers, partitions, bucket_budget, directory, chunk_rows)
+        spilled = sum(store.spilled for store in left + right)
+
+        for left_store, right_store in zip(left, right):
+            left_positions, left_keys = _read_bucket(left_store, len(columns1))
+            right_positions, right_keys = _read_bucket(right_store, len(columns1))
+            matches = match_key_ids(*encode_keys(left_keys, right_keys))
+            results.append(KeyMatches(
+                left_only=left_positions[matches.left_only],
+                right_only=right_positions[matches.right_only],
+                count_differs=left_positions[matches.count_differs],
+                left_counts=matches.left_counts,
+                right_counts=matches.right_counts,
+                left_surplus=matches.left_surplus,
+                right_surplus=matches.right_surplus,
+            ))
+
+    logger.info(f"Compared {len(df1)} and {len(df2)} records in {partitions} partitions "
+                f"({spilled} spilled to disk)")
+
+    count_differs = np.concatenate([r.count_differs for r in results])
+    order = np.argsort(count_differs, kind='stable')
+    return KeyMatches(
+        left_only=np.sort(np.concatenate([r.left_only for r in results])),
+        right_only=np.sort(np.concatenate([r.right_only for r in results])),
+        count_differs=count_differs[order],
+        left_counts=np.concatenate([r.left_counts for r in results])[order],
+        right_counts=np.concatenate([r.right_counts for r in results])[order],
+        left_surplus=sum(r.left_surplus for r in results),
+        right_surplus=sum(r.right_surplus for r in results),
+    )
@@ -0,0 +1,259 @@
+"""
+Streaming CSV ingestion with a memory budget.
+Reads CSV data in chunks straight from a file or ZIP member stream,
+narrows dtypes and projects columns per chunk, and spills chunks to local
+columnar files once the in-memory budget is exceeded.
+"""
+import os
+import shutil
+import tempfile
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+
+import pandas as pd
+
+from .match_keys import hash_rows
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+def narrow_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Downcast integer columns to the smallest integer type holding their values.
+
+    Float and string columns are left unchanged so that their text
+    representation (used for matching) is not altered.
+
+    Args:
+        df: DataFrame chunk
+
+    Returns:
+        DataFrame with narrowed integer columns
+    """
+    for col in df.select_dtypes(include='integer').columns:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+
+def _as_text(values: pd.Series) -> pd.Series:
+    """Convert a column to strings, keeping missing values missing."""
+    return values.astype(str).where(values.notna())
+
+
+def project_with_row_hash(df: pd.DataFrame, usecols: Optional[Iterable[str]],
+                          row_hash_column: str) -> pd.DataFrame:
+    """
+    Keep only some columns of parsed CSV data, adding a hash of each full row.
+
+    The hash (see hash_rows) covers the columns that are dropped, so
+    duplicate rows can still be found on all columns of the file.
+
+    Args:
+        df: Parsed DataFrame with all columns
+        usecols: Columns to keep (None keeps all)
+        row_hash_column: Name of the added hash column
+
+    Returns:
+        Projected DataFrame with the row hash column appended
+    """
+    hashes = hash_rows(df)
+    if usecols is not None:
+        wanted = set(usecols)
+        df = df[[col for col in df.columns if col in wanted]]
+    df = df.copy(deep=False)
+    df[row_hash_column] = hashes
+    return df
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """Return the deep in-memory size of a DataFrame in bytes."""
+    return int(df.memory_usage(index=False, deep=True).sum())
+
+
+class ChunkStore:
+    """
+    Ordered collection of DataFrame chunks with a memory budget.
+
+    Chunks are kept in memory until their total size exceeds the budget;
+    they are then written to part files in a private spill directory
+    (Parquet when pyarrow is installed, pickle otherwise) and released.
+
+    Column dtypes are fixed by the first chunk. Numeric columns may widen
+    (int to float), but a column whose chunks otherwise disagree (e.g.
+    int64 in one chunk and text in another) is stored as text in every
+    chunk, so parts stay writable and the result has one type per column.
+    """
+
+    def __init__(self, memory_budget: int, spill_dir: Optional[str] = None):
+        self.memory_budget = memory_budget
+        self._spill_root = spill_dir
+        self._spill_path: Optional[str] = None
+        self._chunks: List[pd.DataFrame] = []
+        self._parts: List[str] = []
+        self._bytes = 0
+        self._dtypes: Dict[str, object] = {}
+        self._text_columns: Set[str] = set()
+        self.rows = 0
+
+    @property
+    def spilled(self) -> bool:
+        """Whether any chunk has been written to disk."""
+        return bool(self._parts)
+
+    def append(self, chunk: pd.DataFrame) -> None:
+        """
+        Add a chunk, spilling buffered chunks to disk if over budget.
+
+        Args:
+            chunk: DataFrame chunk
+        """
+        chunk = self._unify_dtypes(chunk)
+        self._chunks.append(chunk)
+        self._bytes += frame_nbytes(chunk)
+        self.rows += len(chunk)
+        if self._bytes > self.memory_budget:
+            self._spill()
+
+    def _unify_dtypes(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Record the chunk's column dtypes and convert columns that changed type to text."""
+        for col, dtype in chunk.dtypes.items():
+            known = self._dtypes.setdefault(col, dtype)
+            if dtype != known and not (dtype.kind in 'iuf' and known.kind in 'iuf'):
+                if col not in self._text_columns:
+                    logger.debug(f"Column '{col}' changes type ({known} to {dtype}); storing it as text")
+                self._text_columns.add(col)
+        return self._with_text_columns(chunk)
+
+    def _with_text_columns(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Convert the text columns of a chunk or part that are not text yet."""
+        convert = [col for col in frame.columns
+                   if col in self._text_columns and frame[col].dtype.kind in 'iufb']
+        if not convert:
+            return frame
+        frame = frame.copy(deep=False)
+        for col in convert:
+            frame[col] = _as_text(frame[col])
+        return frame
+
+    def _spill(self) -> None:
+        """Write buffered chunks to one part file and release them."""
+        if not self._chunks:
+            return
+        if self._spill_path is None:
+            if self._spill_root:
+                os.makedirs(self._spill_root, exist_ok=True)
+            self._spill_path = tempfile.mkdtemp(prefix='ingest-', dir=self._spill_root)
+
+        part = pd.concat([self._with_text_columns(chunk) for chunk in self._chunks],
+                         ignore_index=True, sort=False)
+        path = os.path.join(self._spill_path, f"part-{len(self._parts):05d}")
+        if HAS_PYARROW:
+            path += '.parquet'
+            part.to_parquet(path, index=False)
+        else:
+            path += '.pkl'
+            part.to_pickle(path)
+
+        logger.debug(f"Spilled {len(part)} rows ({self._bytes} bytes) to {path}")
+        self._parts.append(path)
+        self._chunks = []
+        self._bytes = 0
+
+    def _read_part(self, path: str) -> pd.DataFrame:
+        if path.endswith('.parquet'):
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Materialize all chunks, in order, as one DataFrame.
+
+        Spilled parts are read back and the spill directory is removed.
+
+        Returns:
+            Concatenated DataFrame (empty if no chunks were added)
+        """
+        try:
+            if self.spilled:
+                self._spill()
+                frames = [self._read_part(path) for path in self._parts]
+            else:
+                frames = self._chunks
+            frames = [self._with_text_columns(frame) for frame in frames]
+            if not frames:
+                return pd.DataFrame()
+            if len(frames) == 1:
+                return frames[0]
+            return pd.concat(frames, ignore_index=True, sort=False)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Release buffered chunks and delete spilled part files."""
+        self._chunks = []
+        self._bytes = 0
+        if self._spill_path is not None:
+            shutil.rmtree(self._spill_path, ignore_errors=True)
+            self._spill_path = None
+        self._parts = []
+
+
+def read_csv_streaming(source, usecols: Optional[Iterable[str]] = None,
+                       chunk_rows: Optional[int] = None,
+                       memory_budget: Optional[int] = None,
+                       spill_dir: Optional[str] = None,
+                       row_hash_column: Optional[str] = None) -> pd.DataFrame:
+    """
+    Read CSV data in chunks under a memory budget.
+
+    Args:
+        source: Path or binary file-like object (e.g. a ZIP member stream)
+        usecols: Optional columns to keep; others are never materialized
+        chunk_rows: Rows per chunk (defaults to INGEST_CHUNK_ROWS)
+        memory_budget: Bytes of chunks held in memory before spilling
+                       (defaults to INGEST_MEMORY_BUDGET_BYTES)
+        spill_dir: Directory for spill files (defaults to INGEST_SPILL_DIR)
+        row_hash_column: Optional column to add with a hash of every full
+                         row (see project_with_row_hash); all columns are
+                         then parsed, one chunk at a time
+
+    Returns:
+        DataFrame with the CSV contents
+
+    Raises:
+        pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError:
+            Propagated from pandas for the caller to report
+    """
+    from config import INGEST_CHUNK_ROWS, INGEST_MEMORY_BUDGET_BYTES, INGEST_SPILL_DIR
+
+    store = ChunkStore(
+        memory_budget if memory_budget is not None else INGEST_MEMORY_BUDGET_BYTES,
+        spill_dir if spill_dir is not None else INGEST_SPILL_DIR
+    )
+    parse_usecols = None
+    if usecols is not None and row_hash_column is None:
+        wanted = set(usecols)
+        parse_usecols = lambda col: col in wanted
+
+    try:
+        # low_memory=False infers each column's type over the whole chunk,
+        # so a chunk never holds a column of mixed types
+        with pd.read_csv(source, usecols=parse_usecols, low_memory=False,
+                         chunksize=chunk_rows or INGEST_CHUNK_ROWS) as reader:
+            for chunk in reader:
+                if row_hash_column is not None:
+                    chunk = project_with_row_hash(chunk, usecols, row_hash_column)
+                store.append(narrow_dtypes(chunk))
+    except BaseException:
+        store.close()
+        raise
+
+    if store.spilled:
+        logger.info(f"Ingested {store.rows} rows with spilling to disk")
+    return store.to_frame()
@@ -0,0 +1,43 @@
+"""
+Streamlit adapter for ingestion events.
+Shows file processing progress in a spinner and a details expander, and
+warnings and errors as Streamlit alerts.
+"""
+from contextlib import contextmanager
+from typing import Iterator
+
+import streamlit as st
+
+from .file_processor import IngestReporter
+
+
+class StreamlitReporter(IngestReporter):
+    """
+    Render ingestion events in the current Streamlit session.
+
+    Streamlit resolves the session of the calling script thread, so one
+    instance can serve all sessions.
+    """
+
+    @contextmanager
+    def processing(self) -> Iterator[None]:
+        with st.spinner("Processing uploaded files..."):
+            # Create a debug expander
+            with st.expander("📋 View File Processing Details", expanded=False) as debug_expander:
+                st.session_state.debug_container = debug_expander
+                yield
+
+    def debug(self, message: str) -> None:
+        try:
+            container = st.session_state.get('debug_container')
+            if container is not None:
+                container.write(message)
+        except Exception:
+            # Silently fail if debug container is not available
+            pass
+
+    def warning(self, message: str) -> None:
+        st.warning(message)
+
+    def error(self, message: str) -> None:
+        st.error(message)
@@ -0,0 +1,189 @@
+"""
+Content-addressed cache for parsed uploads.
+Streamlit re-runs the whole script on every widget interaction, so parsed
+DataFrames are kept here keyed on a digest of the file bytes plus the parse
+options, with least-recently-used eviction under a memory budget.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Read size used when hashing file objects that do not expose getvalue()
+_DIGEST_BLOCK_SIZE = 1024 * 1024
+
+
+def file_digest(file_obj) -> str:
+    """
+    Compute a SHA-256 digest of a file-like object's contents.
+
+    The stream position is restored afterwards so the object can still be
+    parsed by the caller.
+
+    Args:
+        file_obj: File-like object (e.g. a Streamlit UploadedFile)
+
+    Returns:
+        Hex digest string
+    """
+    hasher = hashlib.sha256()
+
+    if hasattr(file_obj, 'getbuffer'):
+        hasher.update(file_obj.getbuffer())
+        return hasher.hexdigest()
+
+    position = file_obj.tell() if hasattr(file_obj, 'tell') else None
+    if hasattr(file_obj, 'seek'):
+        file_obj.seek(0)
+
+    while True:
+        block = file_obj.read(_DIGEST_BLOCK_SIZE)
+        if not block:
+            break
+        hasher.update(block if isinstance(block, bytes) else block.encode('utf-8'))
+
+    if position is not None:
+        file_obj.seek(position)
+
+    return hasher.hexdigest()
+
+
+def make_cache_key(kind: str, digests: Tuple[str, ...], **options: Any) -> Tuple[Hashable, ...]:
+    """
+    Build a cache key from file digests and parse options.
+
+    Args:
+        kind: Name of the cached operation (e.g. 'csv', 'merged')
+        digests: Content digests of the input files, in order
+        **options: Parse options that influence the result
+
+    Returns:
+        Hashable cache key
+    """
+    frozen_options = tuple(
+        (name, tuple(value) if isinstance(value, (list, set)) else value)
+        for name, value in sorted(options.items())
+    )
+    return (kind, tuple(digests), frozen_options)
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the in-memory size of a cached value in bytes.
+
+    Args:
+        value: DataFrame, NumPy array, or tuple whose first element is a DataFrame
+
+    Returns:
+        Estimated size in bytes
+    """
+    if isinstance(value, tuple) and value and isinstance(value[0], pd.DataFrame):
+        value = value[0]
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return int(pd.Series(value, dtype=object, copy=False).memory_usage(index=False, deep=True))
+        return int(value.nbytes)
+    return 0
+
+
+class UploadCache:
+    """
+    Thread-safe LRU cache bounded by entry count and total memory.
+
+    Cached DataFrames are returned as-is, not copied, so callers must treat
+    them as read-only.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Return the cached value for key, or None if absent.
+
+        Args:
+            key: Cache key from make_cache_key
+
+        Returns:
+            Cached value or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting least-recently-used entries as needed.
+
+        Values larger than the whole budget are not cached.
+
+        Args:
+            key: Cache key from make_cache_key
+            value: Value to cache
+        """
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            logger.debug(f"Not caching entry of {size} bytes (budget {self.max_bytes})")
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._total_bytes += size
+
+            while self._entries and (
+                self._total_bytes > self.max_bytes or len(self._entries) > self.max_entries
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        """Estimated memory held by cached entries."""
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_upload_cache: Optional[UploadCache] = None
+
+
+def get_upload_cache() -> UploadCache:
+    """
+    Return the process-wide upload cache, creating it on first use.
+
+    Returns:
+        Shared UploadCache instance
+    """
+    global _upload_cache
+    if _upload_cache is None:
+        from config import UPLOAD_CACHE_MAX_BYTES, UPLOAD_CACHE_MAX_ENTRIES
+        _upload_cache = UploadCache(UPLOAD_CACHE_MAX_BYTES, UPLOAD_CACHE_MAX_ENTRIES)
+    return _upload_cache
@@ -8,76 +8,162 @@ there is NO WARRANTY for this code; use it at your own risk. This work
 is released under the Creative Commons Zero License.
 """
 import logging
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+
+import numpy as np
+
+from .imb_tables import (
+    ASC_BIT, ASC_CHAR, DESC_BIT, DESC_CHAR, INVALID, get_codeword_tables
+)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# barcode-to-bit permutation tables (constants)
-DESC_CHAR = [7,1,9,5,8,0,2,4,6,3,5,8,9,7,3,0,6,1,7,4,6,8,9,2,5,1,7,5,4,3,
-             8,7,6,0,2,5,4,9,3,0,1,6,8,2,0,4,5,9,6,7,5,2,6,3,8,5,1,9,8,7,4,0,2,6,3]
-DESC_BIT = [4,1024,4096,32,512,2,32,16,8,512,2048,32,1024,2,64,8,16,2,
-            1024,1,4,2048,256,64,2,4096,8,256,64,16,16,2048,1,64,2,512,2048,32,8,128,8,
-            1024,128,2048,256,4,1024,8,32,256,1,8,4096,2048,256,16,32,2,8,1,128,4096,512,
-            256,1024]
-ASC_CHAR = [4,0,2,6,3,5,1,9,8,7,1,2,0,6,4,8,2,9,5,3,0,1,3,7,4,6,8,9,2,0,5,
-            1,9,4,3,8,6,7,1,2,4,3,9,5,7,8,3,0,2,1,4,0,9,1,7,0,2,4,6,3,7,1,9,5,8]
-ASC_BIT = [8,1,256,2048,2,4096,256,2048,1024,64,16,4096,4,128,512,64,128,
-          512,4,256,16,1,4096,128,1024,512,1,128,1024,32,128,512,64,256,4,4096,2,16,4,1,
-          2,32,16,64,4096,2,1,512,16,128,32,1024,4,64,512,2048,4,4096,64,128,32,2048,1,
-          8,4]
-
-# Lookup tables for codewords
-ENCODE_TABLE = [0] * 1365  # Will be populated by build_codewords
-DECODE_TABLE = [None] * 8192  # Mapping of encoded values to codeword indices
-FCS_TABLE = [0] * 8192  # Frame check sequence table
-
-def build_codewords(bits, low, hi):
-    """
-    Build tables of 13-bit codewords for encoding and decoding.
-    """
-    # Loop through all possible 13-bit codewords
-    for fwd in range(8192):
-        # Build reversed codeword and count population of 1-bits
-        pop = 0
-        rev = 0
-        tmp = fwd
-        for bit in range(13):
-            pop += tmp & 1
-            rev = (rev << 1) | (tmp & 1)
-            tmp >>= 1
-        
-        if pop != bits:
-            continue
-            
-        if fwd == rev:
-            # Palindromic codes go at the end of the table
-            ENCODE_TABLE[hi] = fwd
-            DECODE_TABLE[fwd] = hi
-            DECODE_TABLE[fwd ^ 8191] = hi
-            FCS_TABLE[fwd] = 0
-            FCS_TABLE[fwd ^ 8191] = 1
-            hi -= 1
-        elif fwd < rev:
-            # Add forward code to front of table
-            ENCODE_TABLE[low] = fwd
-            DECODE_TABLE[fwd] = low
-            DECODE_TABLE[fwd ^ 8191] = low
-            FCS_TABLE[fwd] = 0
-            FCS_TABLE[fwd ^ 8191] = 1
-            low += 1
-            
-            # Add reversed code to front of table
-            ENCODE_TABLE[low] = rev
-            DECODE_TABLE[rev] = low
-            DECODE_TABLE[rev ^ 8191] = low
-            FCS_TABLE[rev] = 0
-            FCS_TABLE[rev ^ 8191] = 1
-            low += 1
-
-# Call the build function to initialize the tables
-build_codewords(5, 0, 1286)
-build_codewords(2, 1287, 1364)
+# Per-barcode tracing is off by default because formatting a log record for
+# every barcode dominates runtime on large files; see set_decode_trace.
+_trace_enabled = False
+
+# Per-thread overrides of the process defaults, set by decode_options
+_thread_options = threading.local()
+
+# This logger is lowered to DEBUG while any tracing is active and restored
+# to its previous level afterwards
+_debug_lock = threading.Lock()
+_debug_users = 0
+_saved_level = logging.NOTSET
+
+
+def _acquire_debug_logging():
+    """Lower this module's logger to DEBUG for one more tracing user."""
+    global _debug_users, _saved_level
+    with _debug_lock:
+        if _debug_users == 0:
+            _saved_level = logger.level
+            logger.setLevel(logging.DEBUG)
+        _debug_users += 1
+
+
+def _release_debug_logging():
+    """Restore the logger level once the last tracing user is done."""
+    global _debug_users
+    with _debug_lock:
+        _debug_users -= 1
+        if _debug_users == 0:
+            logger.setLevel(_saved_level)
+
+
+def _tracing():
+    """Return whether decoder tracing is enabled for the calling thread."""
+    return getattr(_thread_options, 'trace', _trace_enabled)
+
+
+def set_decode_trace(enabled):
+    """
+    Enable or disable per-barcode debug tracing of the decoder by default.
+
+    When enabled, every decoding step is logged at DEBUG level on this
+    module's logger, whose level is lowered to DEBUG until tracing is
+    disabled again. Use decode_options to trace a single run instead.
+    """
+    global _trace_enabled
+    enabled = bool(enabled)
+    if enabled != _trace_enabled:
+        if enabled:
+            _acquire_debug_logging()
+        else:
+            _release_debug_logging()
+    _trace_enabled = enabled
+
+
+class DecodeStats:
+    """
+    Aggregate counters and timing histogram for decoder calls.
+
+    Outcomes are counted as 'direct' (decoded without repair), 'repaired'
+    (length or character repair), 'flipped' (upside-down barcode) and
+    'failed'. Durations are bucketed by powers of two in microseconds.
+    """
+
+    OUTCOMES = ('direct', 'repaired', 'flipped', 'failed')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear all counters and timings."""
+        with self._lock:
+            self.counts = dict.fromkeys(self.OUTCOMES, 0)
+            self.histogram = {}
+            self.total_seconds = 0.0
+            self.batch_rows = 0
+            self.batch_seconds = 0.0
+
+    def record(self, outcome, seconds):
+        """Record one scalar decode with its outcome and duration."""
+        bucket = int(seconds * 1e6).bit_length()
+        with self._lock:
+            self.counts[outcome] += 1
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+            self.total_seconds += seconds
+
+    def record_batch(self, rows, decoded, seconds):
+        """Record one vectorized batch decode."""
+        with self._lock:
+            self.counts['direct'] += decoded
+            self.batch_rows += rows
+            self.batch_seconds += seconds
+
+    def merge(self, snapshot):
+        """Add a snapshot from as_dict() (e.g. from a worker process)."""
+        with self._lock:
+            for outcome in self.OUTCOMES:
+                self.counts[outcome] += snapshot[outcome]
+            for upper, count in snapshot['timing_histogram'].items():
+                bucket = upper.bit_length() - 1
+                self.histogram[bucket] = self.histogram.get(bucket, 0) + count
+            self.total_seconds += snapshot['scalar_seconds']
+            self.batch_rows += snapshot['batch_rows']
+            self.batch_seconds += snapshot['batch_seconds']
+
+    def as_dict(self):
+        """
+        Return a snapshot of the statistics.
+
+        The 'timing_histogram' maps an upper bound in microseconds to the
+        number of scalar decodes that took less than that long.
+        """
+        with self._lock:
+            return {
+                **self.counts,
+                'scalar_seconds': self.total_seconds,
+                'batch_rows': self.batch_rows,
+                'batch_seconds': self.batch_seconds,
+                'timing_histogram': {
+                    1 << bucket: count for bucket, count in sorted(self.histogram.items())
+                },
+            }
+
+
+# Statistics collected by decode_barcode and decode_barcodes_batch
+decode_stats = DecodeStats()
+
+
+def get_decode_stats():
+    """Return a snapshot dictionary of the decoder statistics."""
+    return decode_stats.as_dict()
+
+
+def merge_decode_stats(snapshot):
+    """Merge a statistics snapshot from another process into this one."""
+    decode_stats.merge(snapshot)
+
+
+def reset_decode_stats():
+    """Reset the decoder statistics."""
+    decode_stats.reset()
 
 def add(num, add_val):
     """
@@ -132,6 +218,42 @@ def calcfcs(num):
                 fcs ^= 0xf35
     return fcs
 
+_fcs_steps = None
+
+
+def _get_fcs_steps():
+    """
+    Build the table of calcfcs steps on first use.
+
+    Each 11-bit word is folded in by XOR followed by 11 shift steps, so the
+    result of those steps depends only on the 11-bit value after the XOR.
+    """
+    global _fcs_steps
+    if _fcs_steps is None:
+        steps = array('H', bytes(2 * 2048))
+        for value in range(2048):
+            fcs = value
+            for bit in range(11):
+                fcs <<= 1
+                if fcs & 0x800:
+                    fcs ^= 0xf35
+            steps[value] = fcs
+        _fcs_steps = steps
+    return _fcs_steps
+
+
+def calcfcs_int(value):
+    """
+    Calculate the 11-bit frame check sequence of a native int.
+
+    Same result as calcfcs on the number's ten 11-bit words.
+    """
+    steps = _get_fcs_steps()
+    fcs = 0x1f0
+    for shift in range(99, -1, -11):
+        fcs = steps[fcs ^ ((value >> shift) & 0x7ff)]
+    return fcs
+
 def clean_str(s):
     """
     Clean a string by removing whitespace and converting to uppercase.
@@ -155,7 +277,8 @@ def text_to_chars(barcode, strict=True):
     barcode = clean_str(barcode)
     chars = [0] * 10
     
-    logger.info(f"Converting barcode text to chars, length: {len(barcode)}")
+    if _tracing():
+        logger.debug("Converting barcode text to chars, length: %d", len(barcode))
     
     # Pad the barcode to 65 characters if it's shorter
     if len(barcode) < 65:
@@ -195,7 +318,8 @@ def text_to_chars(barcode, strict=True):
                     logger.warning(f"ASC_CHAR index out of range at position {n}: {asc_index}")
             else:
                 if strict:
-                    logger.warning(f"Unexpected character at position {n}: {c}")
+                    if _tracing():
+                        logger.debug("Unexpected character at position %d: %s", n, c)
                     return None
         except IndexError as e:
             logger.error(f"Index error in text_to_chars at position {n}: {str(e)}")
@@ -241,26 +365,138 @@ def chars_to_text(chars):
     
     return barcode
 
+def _chars_to_codewords(chars):
+    """
+    Look up the codewords and frame check bits of ten characters.
+
+    Returns:
+        Tuple of (codewords, frame check sequence) with the codeword range
+        checks applied and cw[0] / cw[9] adjusted, or None if invalid
+    """
+    tables = get_codeword_tables()
+    decode_table, fcs_table = tables.decode, tables.fcs
+    cw = [0] * 10
+    fcs = 0
+    
+    # Decode characters to codewords
+    for n in range(10):
+        char_value = chars[n]
+        # Safely check if char_value is a valid character
+        if not 0 <= char_value < len(decode_table) or decode_table[char_value] == INVALID:
+            if _tracing():
+                logger.debug("Invalid character value at position %d: %s", n, char_value)
+            return None
+        cw[n] = decode_table[char_value]
+        fcs |= fcs_table[char_value] << n
+    
+    # Validate codewords
+    if cw[0] > 1317 or cw[9] > 1270:
+        return None
+        
+    if cw[9] & 1:
+        # If the barcode is upside down, cw[9] will always be odd
+        return None
+        
+    cw[9] >>= 1
+    if cw[0] > 658:
+        cw[0] -= 659
+        fcs |= 1 << 10
+    return cw, fcs
+
+
+def _value_to_fields(value):
+    """
+    Extract the tracking and routing fields from a barcode's binary value.
+    """
+    # Decode tracking information (18 decimal digits, a base-5 digit and a decimal digit)
+    value, serial = value // 10**18, value % 10**18
+    value, track1 = value // 5, value % 5
+    value, track0 = value // 10, value % 10
+    track = f"{track0}{track1}{serial:018d}"
+    
+    # Decode routing information (ZIP code, etc.)
+    routing = ''
+    for sz in (5, 4, 2):
+        if not value:
+            break
+        value -= 1
+        value, part = value // 10**sz, value % 10**sz
+        routing = f"{part:0{sz}d}" + routing
+    
+    # Format the results
+    result = {}
+    result['barcode_id'] = track[0:2]
+    result['service_type'] = track[2:5]
+    
+    if track[5] == '9':
+        result['mailer_id'] = track[5:14]
+        result['serial_num'] = track[14:20]
+    else:
+        result['mailer_id'] = track[5:11]
+        result['serial_num'] = track[11:20]
+    
+    if len(routing) >= 5:
+        result['zip'] = routing[0:5]
+    if len(routing) >= 9:
+        result['plus4'] = routing[5:9]
+    if len(routing) == 11:
+        result['delivery_pt'] = routing[9:11]
+    
+    return result
+
+
 def decode_chars(chars):
     """
     Decode characters to codewords.
     This is the core of the barcode processing.
+
+    The codewords are combined into one native Python int for the
+    frame check and the digit extraction.
+    """
+    if not chars:
+        return None
+    
+    decoded = _chars_to_codewords(chars)
+    if decoded is None:
+        return None
+    cw, fcs = decoded
+    
+    # Convert codewords to binary
+    value = cw[0]
+    for n in range(1, 9):
+        value = value * 1365 + cw[n]
+    value = value * 636 + cw[9]
+    
+    if calcfcs_int(value) != fcs:
+        return None
+    
+    return _value_to_fields(value)
+
+def decode_chars_words(chars):
+    """
+    Decode characters using multiple-precision arrays of 11-bit words.
+
+    This is the original port of the JavaScript decoder, kept as the
+    reference that decode_chars is validated against.
     """
     if not chars:
         return None
         
+    tables = get_codeword_tables()
+    decode_table, fcs_table = tables.decode, tables.fcs
     cw = [0] * 10
     fcs = 0
     
     # Decode characters to codewords
     for n in range(10):
         char_value = chars[n]
-        # Safely check if char_value is valid for DECODE_TABLE
-        if char_value < 0 or char_value >= len(DECODE_TABLE) or DECODE_TABLE[char_value] is None:
-            logger.info(f"Invalid character value at position {n}: {char_value}")
+        # Safely check if char_value is a valid character
+        if not 0 <= char_value < len(decode_table) or decode_table[char_value] == INVALID:
+            if _tracing():
+                logger.debug("Invalid character value at position %d: %s", n, char_value)
             return None
-        cw[n] = DECODE_TABLE[char_value]
-        fcs |= FCS_TABLE[char_value] << n
+        cw[n] = decode_table[char_value]
+        fcs |= fcs_table[char_value] << n
     
     # Validate codewords
     if cw[0] > 1317 or cw[9] > 1270:
@@ -332,61 +568,196 @@ def decode_chars(chars):
     
     return result
 
-def try_repair(possible, chars, pos):
+# Bump whenever a change can alter decode results, so that persisted results
+# of an earlier decoder (see imb_cache) are no longer served
+DECODER_VERSION = '1'
+
+# Repair budgets, from cheapest to most thorough (see set_repair_budget)
+REPAIR_BUDGETS = ('off', 'single-bit', 'full')
+
+# Limit on character combinations tried by repair_chars
+_MAX_REPAIR_COMBINATIONS = 1000
+
+_repair_budget = 'full'
+
+
+def set_repair_budget(budget):
+    """
+    Set how much repair decode_barcode attempts for damaged barcodes.
+
+    'off' only decodes the barcode as given and upside down; 'single-bit'
+    also repairs one damaged character (a single wrong bit); 'full' also
+    repairs several damaged characters and a missing or extra bar.
+
+    Raises:
+        ValueError: If budget is not one of REPAIR_BUDGETS
     """
-    Try to repair damaged barcode characters using possible combinations.
+    global _repair_budget
+    if budget not in REPAIR_BUDGETS:
+        raise ValueError(f"Unknown repair budget {budget!r}; expected one of {REPAIR_BUDGETS}")
+    _repair_budget = budget
+
+
+def get_repair_budget():
+    """Return the repair budget in effect for the calling thread."""
+    return getattr(_thread_options, 'repair_budget', _repair_budget)
+
+
+@contextmanager
+def decode_options(trace=None, repair_budget=None):
     """
-    inf = None
-    p = possible[pos]
+    Override tracing and the repair budget for decodes in the calling thread.
+
+    Unlike set_decode_trace and set_repair_budget, the overrides only apply
+    to the current thread and are undone when the block exits, so
+    concurrent validation runs can use different settings.
+
+    Args:
+        trace: Enable or disable per-barcode tracing (None keeps the default)
+        repair_budget: One of REPAIR_BUDGETS (None keeps the default)
+
+    Raises:
+        ValueError: If repair_budget is not one of REPAIR_BUDGETS
+    """
+    if repair_budget is not None and repair_budget not in REPAIR_BUDGETS:
+        raise ValueError(f"Unknown repair budget {repair_budget!r}; expected one of {REPAIR_BUDGETS}")
+    previous = dict(_thread_options.__dict__)
+    if trace is not None:
+        _thread_options.trace = bool(trace)
+    if repair_budget is not None:
+        _thread_options.repair_budget = repair_budget
+    traced = _tracing()
+    if traced:
+        _acquire_debug_logging()
+    try:
+        yield
+    finally:
+        if traced:
+            _release_debug_logging()
+        _thread_options.__dict__.clear()
+        _thread_options.__dict__.update(previous)
+
+
+def _repair_candidates(n, chars):
+    """
+    Return (character, codeword, frame check bits) candidates for position n.
+
+    Candidates whose codeword is out of range for positions 0 and 9 are
+    dropped, and the cw[0] / cw[9] adjustments of decode_chars are applied.
+    """
+    tables = get_codeword_tables()
+    candidates = []
+    for char in chars:
+        cw = tables.decode[char]
+        fcs = tables.fcs[char] << n
+        if n == 0:
+            if cw > 1317:
+                continue
+            if cw > 658:
+                cw -= 659
+                fcs |= 1 << 10
+        elif n == 9:
+            if cw > 1270 or cw & 1:
+                continue
+            cw >>= 1
+        candidates.append((char, cw, fcs))
+    return candidates
+
+
+def _search_repairs(candidates):
+    """
+    Find the character combinations that pass the frame check.
+
+    The barcode value is built up position by position, so each prefix is
+    computed once and shared by all combinations below it, and the search
+    stops as soon as a second solution is found.
+
+    Args:
+        candidates: Per-position lists from _repair_candidates
+
+    Returns:
+        List of (characters, value) solutions (at most two)
+    """
+    solutions = []
+    chars = [0] * 10
     
-    for n in range(len(p)):
-        chars[pos] = p[n]
-        if pos < 9:
-            newinf = try_repair(possible, chars, pos+1)
-        else:
-            newinf = decode_chars(chars)
-            if newinf:
-                newinf['suggest'] = chars_to_text(chars)
-                newinf['message'] = "Repaired damaged barcode"
-                
-        if newinf:
-            # Abort if multiple solutions are found
-            if inf:
-                return {"message": "Invalid barcode - multiple solutions found"}
-            inf = newinf
+    def visit(pos, value, fcs):
+        radix = 636 if pos == 9 else 1365
+        for char, cw, char_fcs in candidates[pos]:
+            chars[pos] = char
+            if pos < 9:
+                visit(pos + 1, value * radix + cw, fcs | char_fcs)
+            else:
+                full_value = value * radix + cw
+                if calcfcs_int(full_value) == fcs | char_fcs:
+                    solutions.append((list(chars), full_value))
+            if len(solutions) > 1:
+                return
     
-    return inf
+    for char, cw, fcs in candidates[0]:
+        chars[0] = char
+        visit(1, cw, fcs)
+        if len(solutions) > 1:
+            break
+    return solutions
+
 
-def repair_chars(chars):
+def repair_chars(chars, max_damaged=None):
     """
     Attempt to repair damaged barcode characters.
+
+    Each invalid character is replaced by the valid characters one bit
+    away from it, and the combinations that pass the frame check are
+    searched. The repair succeeds only if exactly one combination does.
+
+    Args:
+        chars: Ten 13-bit characters
+        max_damaged: Give up if more characters than this are invalid
+                     (None for no limit besides the combination limit)
+
+    Returns:
+        Decoded fields with 'suggest' and 'message', a dictionary with only
+        'message' if several repairs are possible, or None
     """
-    possible = []
+    decode_table = get_codeword_tables().decode
+    candidates = []
     prod = 1
+    damaged = 0
     
     for n in range(10):
-        possible.append([])
         c = chars[n]
         
-        # Safely check if c is in DECODE_TABLE
-        if c < 0 or c >= len(DECODE_TABLE) or DECODE_TABLE[c] is None:
+        # Safely check if c is a valid character
+        if not 0 <= c < len(decode_table) or decode_table[c] == INVALID:
+            damaged += 1
+            if max_damaged is not None and damaged > max_damaged:
+                return None
             # Try flipping each bit to see if we get a valid character
+            possible = []
             for bit in range(13):
                 d = c ^ (1 << bit)  # Flip one bit
-                # Safely check d is valid for DECODE_TABLE
-                if 0 <= d < len(DECODE_TABLE) and DECODE_TABLE[d] is not None:
-                    possible[n].append(d)
+                if 0 <= d < len(decode_table) and decode_table[d] != INVALID:
+                    possible.append(d)
         else:
-            possible[n].append(c)
+            possible = [c]
             
         # Don't let the number of combinations get too high
-        prod *= len(possible[n])
-        if prod == 0 or prod > 1000:
+        prod *= len(possible)
+        if prod == 0 or prod > _MAX_REPAIR_COMBINATIONS:
             return None
+        candidates.append(_repair_candidates(n, possible))
     
-    # Create new array for holding repaired characters
-    newchars = [0] * 10
-    return try_repair(possible, newchars, 0)
+    solutions = _search_repairs(candidates)
+    if len(solutions) > 1:
+        return {"message": "Invalid barcode - multiple solutions found"}
+    if not solutions:
+        return None
+    
+    newchars, value = solutions[0]
+    inf = _value_to_fields(value)
+    inf['suggest'] = chars_to_text(newchars)
+    inf['message'] = "Repaired damaged barcode"
+    return inf
 
 def flip_barcode(barcode):
     """
@@ -402,9 +773,33 @@ def flip_barcode(barcode):
             flipped += c
     return flipped
 
+def _bar_contributions(barcode, offset):
+    """
+    Character bits set by each bar of a barcode placed at its index + offset.
+
+    Returns:
+        (len(barcode), 10) array; bars placed outside the 65 positions, and
+        characters other than A, D and F, contribute nothing
+    """
+    desc_weights, asc_weights = _get_batch_tables()[:2]
+    bars = np.frombuffer(barcode.upper().encode('ascii', 'replace'), dtype=np.uint8)
+    positions = np.arange(len(bars)) + offset
+    placed = (positions >= 0) & (positions < 65)
+    positions = np.clip(positions, 0, 64)
+    is_desc = (np.isin(bars, _DESC_BARS) & placed)[:, None]
+    is_asc = (np.isin(bars, _ASC_BARS) & placed)[:, None]
+    return (is_desc * desc_weights[positions] + is_asc * asc_weights[positions]).astype(np.int64)
+
+
 def repair_barcode(barcode):
     """
     Repair a barcode that might be missing or have an extra character.
+
+    Every insertion (64 bars) or deletion (66 bars) position is scored by
+    the number of invalid characters it leaves. The characters for all
+    positions come from prefix sums of the bars before the position and
+    suffix sums of the shifted bars after it, instead of re-permuting the
+    whole barcode for each position.
     """
     if len(barcode) == 64:
         longer = True  # Missing a character
@@ -413,87 +808,106 @@ def repair_barcode(barcode):
     else:
         return barcode  # Nothing to repair
         
-    best = barcode
-    besterrs = 5  # Don't try to repair if we can't get more than 5 right
-    
-    # Try inserting or removing at each position
-    for pos in range(66):
-        if longer:
-            # Insert a dummy character
-            testcode = barcode[:pos] + "X" + barcode[pos:]
-        else:
-            # Remove a character
-            testcode = barcode[:pos] + barcode[pos+1:]
-            
-        chars = text_to_chars(testcode, False)
-        if not chars:
-            continue  # Skip if we can't convert to chars
-            
-        errs = 0
-        
-        for n in range(10):
-            char_value = chars[n]
-            # First check if the index is valid for DECODE_TABLE
-            if char_value < 0 or char_value >= len(DECODE_TABLE) or DECODE_TABLE[char_value] is None:
-                errs += 1
-                
-        if errs < besterrs:
-            besterrs = errs
-            best = testcode
-            
-    return best
+    decode_table = _get_batch_tables()[2]
+    
+    # Bits set by each bar where it is, and where it moves to
+    in_place = _bar_contributions(barcode, 0)
+    shifted = _bar_contributions(barcode, 1 if longer else -1)
+    zero = np.zeros((1, 10), dtype=np.int64)
+    before = np.concatenate([zero, np.cumsum(in_place, axis=0)])
+    after = np.concatenate([np.cumsum(shifted[::-1], axis=0)[::-1], zero])
+    
+    # Characters with a dummy bar inserted before, or the bar removed at, each position
+    positions = np.arange(66)
+    if longer:
+        chars = before[np.minimum(positions, 64)] + after[np.minimum(positions, 64)]
+    else:
+        chars = before[positions] + after[positions + 1]
+    errs = (decode_table[chars] == INVALID).sum(axis=1)
+    
+    # Don't try to repair if we can't get more than 5 right
+    pos = int(np.argmin(errs))
+    if errs[pos] >= 5:
+        return barcode
+    if longer:
+        return barcode[:pos] + "X" + barcode[pos:]
+    return barcode[:pos] + barcode[pos+1:]
 
-def decode_barcode(barcode):
+def decode_barcode(barcode, trace=None, repair_budget=None):
     """
     Decode a USPS Intelligent Mail Barcode.
     
     Args:
         barcode: A 65-character string consisting of 'A', 'D', 'T', and 'F'
                  representing the Ascending, Descending, Tracker, and Full bars.
+        trace: Trace this decode (None uses the current setting)
+        repair_budget: Repair budget for this decode (None uses the current setting)
                  
     Returns:
         A dictionary containing decoded fields, or {"message": "error message"} if decoding failed.
     """
+    if trace is not None or repair_budget is not None:
+        with decode_options(trace, repair_budget):
+            return decode_barcode(barcode)
+    started = time.perf_counter()
+    result, outcome = _decode_barcode(barcode)
+    decode_stats.record(outcome, time.perf_counter() - started)
+    return result
+
+def _decode_barcode(barcode):
+    """
+    Decode a barcode, returning the result and its DecodeStats outcome.
+    """
+    trace = _tracing()
     if not barcode:
-        logger.warning("Empty barcode provided")
-        return {"message": "Empty barcode provided"}
+        if trace:
+            logger.debug("Empty barcode provided")
+        return {"message": "Empty barcode provided"}, 'failed'
 
     barcode = clean_str(barcode)
-    logger.info(f"Processing barcode: {barcode}")
+    if trace:
+        logger.debug("Processing barcode: %s", barcode)
     
     # First try direct decoding if it's 65 characters
     if len(barcode) == 65:
-        logger.info("Attempting direct decode of 65-character barcode")
         chars = text_to_chars(barcode, True)
         if chars:
             decoded = decode_chars(chars)
             if decoded:
-                logger.info(f"Successfully decoded: {decoded}")
+                if trace:
+                    logger.debug("Successfully decoded: %s", decoded)
                 # Successfully decoded without errors
-                return decoded
-            else:
-                logger.info("Direct decode failed at decode_chars stage")
-        else:
-            logger.info("Direct decode failed at text_to_chars stage")
-    else:
-        logger.info(f"Barcode length {len(barcode)} is not 65 characters")
+                return decoded, 'direct'
+            elif trace:
+                logger.debug("Direct decode failed at decode_chars stage")
+        elif trace:
+            logger.debug("Direct decode failed at text_to_chars stage")
+    elif trace:
+        logger.debug("Barcode length %d is not 65 characters", len(barcode))
+    
+    budget = get_repair_budget()
+    if budget == 'off':
+        return _decode_flipped(barcode)
     
     # Try to repair the barcode if it's not 65 characters
-    barcode = repair_barcode(barcode)
+    if budget == 'full':
+        barcode = repair_barcode(barcode)
     if len(barcode) != 65:
         # Still not 65 characters, can't decode
-        logger.warning(f"Repair failed: length still not 65 ({len(barcode)})")
-        return {"message": "Barcode must be 65 characters long"}
-    else:
-        logger.info(f"Repaired to: {barcode}")
+        if trace:
+            logger.debug("Repair failed: length still not 65 (%d)", len(barcode))
+        return {"message": "Barcode must be 65 characters long"}, 'failed'
+    elif trace:
+        logger.debug("Repaired to: %s", barcode)
     
     # Try with the repaired barcode
-    logger.info("Attempting repair of damaged characters")
+    max_damaged = 1 if budget == 'single-bit' else None
     chars = text_to_chars(barcode, False)
     if chars:
-        inf = repair_chars(chars)
+        inf = repair_chars(chars, max_damaged)
         if inf:
-            logger.info(f"Successfully decoded after character repair: {inf}")
+            if trace:
+                logger.debug("Decoded after character repair: %s", inf)
             # If we have a suggestion, add highlighting information
             if 'suggest' in inf:
                 # Find differences between original and suggested barcode
@@ -508,28 +922,404 @@ def decode_barcode(barcode):
                     inf['highlight_indices'] = differences[:-1]
                 else:
                     inf['highlight_indices'] = ""
-            return inf
-        logger.info("Character repair failed")
-    else:
-        logger.info("Failed to convert repaired barcode to chars")
+            return inf, 'repaired' if 'barcode_id' in inf else 'failed'
+        if trace:
+            logger.debug("Character repair failed")
+    elif trace:
+        logger.debug("Failed to convert repaired barcode to chars")
     
     # Try flipping the barcode (upside down)
-    logger.info("Attempting to flip barcode and decode")
     flipped = flip_barcode(barcode)
     chars = text_to_chars(flipped, False)
     if chars:
-        inf = repair_chars(chars)
+        inf = repair_chars(chars, max_damaged)
         if inf and 'barcode_id' in inf:
             inf['message'] = "Barcode seems to be upside down"
-            logger.info(f"Successfully decoded flipped barcode: {inf}")
-            return inf
-        logger.info("Failed to decode flipped barcode")
-    else:
-        logger.info("Failed to convert flipped barcode to chars")
+            if trace:
+                logger.debug("Successfully decoded flipped barcode: %s", inf)
+            return inf, 'flipped'
+        if trace:
+            logger.debug("Failed to decode flipped barcode")
+    elif trace:
+        logger.debug("Failed to convert flipped barcode to chars")
     
     # Could not decode the barcode
-    logger.warning("All decoding attempts failed")
-    return {"message": "Invalid barcode"}
+    if trace:
+        logger.debug("All decoding attempts failed")
+    return {"message": "Invalid barcode"}, 'failed'
+
+def _decode_flipped(barcode):
+    """
+    Decode an upside-down barcode without repair.
+    """
+    chars = text_to_chars(flip_barcode(barcode), True) if len(barcode) == 65 else None
+    inf = decode_chars(chars)
+    if inf:
+        inf['message'] = "Barcode seems to be upside down"
+        return inf, 'flipped'
+    if _tracing():
+        logger.debug("Decoding failed without repair")
+    return {"message": "Invalid barcode"}, 'failed'
+
+# Field layout of the batch decoder output
+BATCH_FIELDS = ('barcode_id', 'service_type', 'mailer_id', 'serial_num',
+                'zip', 'plus4', 'delivery_pt')
+
+# Bar letters that set the descending / ascending half of a bar
+_DESC_BARS = np.frombuffer(b'DF', dtype=np.uint8)
+_ASC_BARS = np.frombuffer(b'AF', dtype=np.uint8)
+_ALL_BARS = np.frombuffer(b'ADFTS', dtype=np.uint8)
+
+_batch_tables = None
+
+
+def _get_batch_tables():
+    """
+    Build NumPy versions of the permutation and codeword tables on first use.
+    """
+    global _batch_tables
+    if _batch_tables is None:
+        positions = np.arange(65)
+        desc_weights = np.zeros((65, 10), dtype=np.float64)
+        desc_weights[positions, DESC_CHAR] = DESC_BIT
+        asc_weights = np.zeros((65, 10), dtype=np.float64)
+        asc_weights[positions, ASC_CHAR] = ASC_BIT
+        tables = get_codeword_tables()
+        decode = np.frombuffer(tables.decode, dtype=np.int16).astype(np.int64)
+        fcs = np.frombuffer(tables.fcs, dtype=np.uint8).astype(np.int64)
+        _batch_tables = (desc_weights, asc_weights, decode, fcs)
+    return _batch_tables
+
+
+def _codes_to_matrix(codes):
+    """
+    Convert a sequence of barcode strings to an (n, 65) uint8 matrix.
+    Strings that are not exactly 65 ASCII characters yield rows of zeros.
+    """
+    values = np.asarray(codes, dtype='U66')
+    if values.ndim != 1:
+        values = values.ravel()
+    points = values.view(np.uint32).reshape(len(values), 66)
+    well_formed = (points[:, 64] != 0) & (points[:, 65] == 0) & (points[:, :65] < 128).all(axis=1)
+    matrix = points[:, :65].astype(np.uint8)
+    matrix[~well_formed] = 0
+    return matrix
+
+
+# Batch arithmetic holds each number (at most 102 bits) in two 51-bit limbs,
+# hi * 2**51 + lo, in int64 arrays: a limb times a multiplier or divisor
+# below 2**11 plus a carry stays below 2**63.
+_LIMB_BITS = 51
+_LIMB_MASK = (1 << _LIMB_BITS) - 1
+
+
+def _muladd_limbs(hi, lo, mult, add_val):
+    """Vectorized value * mult + add_val on two-limb numbers."""
+    x = lo * mult + add_val
+    return hi * mult + (x >> _LIMB_BITS), x & _LIMB_MASK
+
+
+def _divmod_limbs(hi, lo, div):
+    """Vectorized division of two-limb numbers; returns (hi, lo, remainder)."""
+    x = ((hi % div) << _LIMB_BITS) + lo
+    return hi // div, x // div, x % div
+
+
+def _calcfcs_limbs(hi, lo):
+    """Vectorized calcfcs_int on two-limb numbers."""
+    steps = np.frombuffer(_get_fcs_steps(), dtype=np.uint16).astype(np.int64)
+    fcs = np.full(len(lo), 0x1f0, dtype=np.int64)
+    for shift in range(99, -1, -11):
+        if shift >= _LIMB_BITS:
+            word = hi >> (shift - _LIMB_BITS)
+        else:
+            word = (lo >> shift) | (hi << (_LIMB_BITS - shift))
+        fcs = steps[fcs ^ (word & 0x7ff)]
+    return fcs
+
+
+def _digits_to_strings(digits):
+    """Convert an (n, w) array of decimal digits to an array of strings."""
+    n, width = digits.shape
+    if width == 0:
+        return np.full(n, '', dtype='U1')
+    text = np.ascontiguousarray(digits.astype(np.uint8) + ord('0'))
+    return text.view(f'S{width}').ravel().astype(f'U{width}')
+
+
+def decode_barcodes_batch(codes):
+    """
+    Decode many USPS Intelligent Mail Barcodes at once using array operations.
+
+    Performs the same direct decode as decode_barcode (bar permutation,
+    codeword lookup, CRC check and base conversion) for all rows together.
+    No repair is attempted; rows that fail can be passed to decode_barcode.
+
+    Args:
+        codes: Sequence of 65-character barcode strings (A, D, T, F), or an
+               (n, 65) uint8 matrix of their ASCII codes
+
+    Returns:
+        Dictionary with a boolean 'success' array and one string array per
+        field in BATCH_FIELDS ('' where the field is absent or decoding failed)
+    """
+    started = time.perf_counter()
+    desc_weights, asc_weights, decode_table, fcs_table = _get_batch_tables()
+
+    if isinstance(codes, np.ndarray) and codes.dtype == np.uint8 and codes.ndim == 2:
+        matrix = codes
+    else:
+        matrix = _codes_to_matrix(codes)
+    n = matrix.shape[0]
+
+    ok = np.isin(matrix, _ALL_BARS).all(axis=1)
+
+    # Bar-to-character permutation (each bit is set by exactly one bar)
+    is_desc = np.isin(matrix, _DESC_BARS).astype(np.float64)
+    is_asc = np.isin(matrix, _ASC_BARS).astype(np.float64)
+    chars = (is_desc @ desc_weights + is_asc @ asc_weights).astype(np.int64)
+
+    # Characters to codewords and frame check bits
+    cw = decode_table[chars]
+    ok &= (cw >= 0).all(axis=1)
+    fcs = (fcs_table[chars] << np.arange(10)).sum(axis=1)
+
+    ok &= (cw[:, 0] <= 1317) & (cw[:, 9] <= 1270) & ((cw[:, 9] & 1) == 0)
+    cw[~ok] = 0
+
+    cw[:, 9] >>= 1
+    high = cw[:, 0] > 658
+    cw[high, 0] -= 659
+    fcs[high] |= 1 << 10
+
+    # Codewords to binary
+    hi = np.zeros(n, dtype=np.int64)
+    lo = cw[:, 0].copy()
+    for k in range(1, 9):
+        hi, lo = _muladd_limbs(hi, lo, 1365, cw[:, k])
+    hi, lo = _muladd_limbs(hi, lo, 636, cw[:, 9])
+
+    ok &= _calcfcs_limbs(hi, lo) == fcs
+    hi[~ok] = 0
+    lo[~ok] = 0
+
+    # Tracking code digits, three at a time
+    track = np.zeros((n, 20), dtype=np.int64)
+    for k in range(17, 1, -3):
+        hi, lo, group = _divmod_limbs(hi, lo, 1000)
+        track[:, k] = group // 100
+        track[:, k + 1] = group // 10 % 10
+        track[:, k + 2] = group % 10
+    hi, lo, track[:, 1] = _divmod_limbs(hi, lo, 5)
+    hi, lo, track[:, 0] = _divmod_limbs(hi, lo, 10)
+
+    # Routing code digits (the rest is below 2**51, so it is all in lo)
+    rest = lo
+    route = np.zeros((n, 11), dtype=np.int64)
+    pos = np.full(n, 11, dtype=np.int64)
+    active = np.ones(n, dtype=bool)
+    p = 11
+    for sz in (5, 4, 2):
+        active &= rest != 0
+        rest = rest - active
+        part, rest = rest % 10**sz, rest // 10**sz
+        for _ in range(sz):
+            p -= 1
+            route[active, p] = part[active] % 10
+            part //= 10
+        pos[active] = p
+
+    # Format the results
+    result = {'success': ok}
+    long_mailer = track[:, 5] == 9
+    result['barcode_id'] = _digits_to_strings(track[:, 0:2])
+    result['service_type'] = _digits_to_strings(track[:, 2:5])
+    result['mailer_id'] = np.where(long_mailer,
+                                   _digits_to_strings(track[:, 5:14]),
+                                   _digits_to_strings(track[:, 5:11]))
+    result['serial_num'] = np.where(long_mailer,
+                                    _digits_to_strings(track[:, 14:20]),
+                                    _digits_to_strings(track[:, 11:20]))
+
+    start = np.minimum(pos, 6)[:, None]
+    route_fields = (
+        ('zip', 0, 5, pos <= 6),
+        ('plus4', 5, 9, pos <= 2),
+        ('delivery_pt', 9, 11, pos == 0),
+    )
+    for name, first_digit, end_digit, present in route_fields:
+        index = np.minimum(start + np.arange(first_digit, end_digit), 10)
+        gathered = np.take_along_axis(route, index, axis=1)
+        result[name] = np.where(present, _digits_to_strings(gathered), '')
+
+    for name in BATCH_FIELDS:
+        result[name] = np.where(ok, result[name], '').astype(object)
+
+    decode_stats.record_batch(n, int(ok.sum()), time.perf_counter() - started)
+    return result
+
+
+# Added to the routing code value so each routing length has its own range
+ROUTING_OFFSETS = {0: 0, 5: 1, 9: 100001, 11: 1000100001}
+
+
+def _check_encode_input(tracking, routing):
+    """
+    Validate encoder input, raising ValueError for invalid fields.
+    """
+    if not isdigits(tracking, 20):
+        raise ValueError(f"Tracking code must be 20 digits: {tracking!r}")
+    if tracking[1] > '4':
+        raise ValueError(f"Second barcode ID digit must be 0-4: {tracking!r}")
+    if (routing and not isdigits(routing)) or len(routing) not in ROUTING_OFFSETS:
+        raise ValueError(f"Routing code must be empty or 5, 9 or 11 digits: {routing!r}")
+
+
+def encode_barcode(tracking, routing=''):
+    """
+    Encode a USPS Intelligent Mail Barcode.
+    
+    Args:
+        tracking: 20-digit tracking code (barcode ID, service type, mailer ID
+                  and serial number)
+        routing: Routing code of 0, 5, 9 or 11 digits (ZIP, ZIP+4, or
+                 ZIP+4 and delivery point)
+                 
+    Returns:
+        A 65-character string of 'A', 'D', 'T' and 'F' bars that
+        decode_barcode decodes back to the same fields.
+        
+    Raises:
+        ValueError: If the tracking or routing code is invalid
+    """
+    tracking = clean_str(tracking)
+    routing = clean_str(routing)
+    _check_encode_input(tracking, routing)
+    
+    # Fields to binary
+    value = int(routing) + ROUTING_OFFSETS[len(routing)] if routing else 0
+    value = value * 10 + int(tracking[0])
+    value = value * 5 + int(tracking[1])
+    value = value * 10**18 + int(tracking[2:])
+    fcs = calcfcs_int(value)
+    
+    # Binary to codewords
+    cw = [0] * 10
+    value, cw[9] = value // 636, value % 636
+    for n in range(8, 0, -1):
+        value, cw[n] = value // 1365, value % 1365
+    cw[0] = value
+    cw[9] <<= 1
+    if fcs & (1 << 10):
+        cw[0] += 659
+    
+    # Codewords to characters, with the frame check sequence in their polarity
+    encode_table = get_codeword_tables().encode
+    chars = [
+        encode_table[cw[n]] ^ (8191 if fcs & (1 << n) else 0)
+        for n in range(10)
+    ]
+    return chars_to_text(chars)
+
+
+_encode_tables = None
+
+
+def _get_encode_tables():
+    """
+    Build NumPy versions of the encoding and bar permutation tables on first use.
+    """
+    global _encode_tables
+    if _encode_tables is None:
+        _encode_tables = (
+            np.frombuffer(get_codeword_tables().encode, dtype=np.uint16).astype(np.int64),
+            np.array(DESC_CHAR), np.array(DESC_BIT),
+            np.array(ASC_CHAR), np.array(ASC_BIT),
+        )
+    return _encode_tables
+
+
+def _digit_matrix(values, width):
+    """
+    Convert strings to an (n, width) array of digits plus each string's length.
+    Digits are -1 where a character is not a digit or beyond the string.
+    """
+    text = np.asarray(values, dtype=f'U{width + 1}')
+    points = text.view(np.uint32).reshape(len(text), width + 1).astype(np.int64)
+    lengths = (points != 0).sum(axis=1)
+    digits = np.where((points >= 48) & (points <= 57), points - 48, -1)
+    return digits[:, :width], lengths
+
+
+# Bar letters indexed by descender * 2 + ascender
+_BAR_LETTERS = np.frombuffer(b'TADF', dtype=np.uint8)
+
+
+def encode_barcodes_batch(tracking, routing=None):
+    """
+    Encode many USPS Intelligent Mail Barcodes at once using array operations.
+    
+    Performs the same steps as encode_barcode for all rows together.
+    
+    Args:
+        tracking: Sequence of 20-digit tracking codes
+        routing: Sequence of routing codes (0, 5, 9 or 11 digits), or None
+                 for no routing codes
+                 
+    Returns:
+        Array of 65-character barcode strings ('' for rows with invalid input)
+    """
+    encode_table, desc_char, desc_bit, asc_char, asc_bit = _get_encode_tables()
+    
+    track, track_len = _digit_matrix(tracking, 20)
+    n = len(track)
+    if routing is None:
+        routing = np.full(n, '')
+    route, route_len = _digit_matrix(routing, 11)
+    
+    ok = (track_len == 20) & (track >= 0).all(axis=1) & (track[:, 1] <= 4)
+    ok &= np.isin(route_len, list(ROUTING_OFFSETS))
+    ok &= ((route >= 0) | (np.arange(11) >= route_len[:, None])).all(axis=1)
+    track[~ok] = 0
+    route = np.where(np.arange(11) < route_len[:, None], route, 0)
+    
+    # Routing code value (at most 12 digits, so int64 is exact)
+    route_value = np.zeros(n, dtype=np.int64)
+    for k in range(11):
+        active = route_len > k
+        route_value[active] = route_value[active] * 10 + route[active, k]
+    for length, offset in ROUTING_OFFSETS.items():
+        route_value[route_len == length] += offset
+    route_value[~ok] = 0
+    
+    # Fields to binary
+    hi = np.zeros(n, dtype=np.int64)
+    hi, lo = _muladd_limbs(hi, route_value, 10, track[:, 0])
+    hi, lo = _muladd_limbs(hi, lo, 5, track[:, 1])
+    for k in range(2, 20, 3):
+        group = track[:, k] * 100 + track[:, k + 1] * 10 + track[:, k + 2]
+        hi, lo = _muladd_limbs(hi, lo, 1000, group)
+    fcs = _calcfcs_limbs(hi, lo)
+    
+    # Binary to codewords
+    cw = np.zeros((n, 10), dtype=np.int64)
+    hi, lo, cw[:, 9] = _divmod_limbs(hi, lo, 636)
+    for k in range(8, 0, -1):
+        hi, lo, cw[:, k] = _divmod_limbs(hi, lo, 1365)
+    cw[:, 0] = lo
+    cw[:, 9] <<= 1
+    cw[:, 0] += np.where(fcs & (1 << 10), 659, 0)
+    
+    # Codewords to characters to bars
+    flip = ((fcs[:, None] >> np.arange(10)) & 1) * 8191
+    chars = encode_table[cw] ^ flip
+    has_desc = (chars[:, desc_char] & desc_bit) != 0
+    has_asc = (chars[:, asc_char] & asc_bit) != 0
+    bars = np.ascontiguousarray(_BAR_LETTERS[has_desc * 2 + has_asc])
+    
+    barcodes = bars.view('S65').ravel().astype('U65')
+    return np.where(ok, barcodes, '')
+
 
 def extract_zip_from_imb(imb_code):
     """
@@ -552,6 +1342,6 @@ def extract_zip_from_imb(imb_code):
             return decoded['zip']
         elif 'message' in decoded:
             # This is an error message, log it
-            logger.warning(f"Decode error: {decoded['message']}")
+            logger.warning("Decode error: %s", decoded['message'])
     
     return None
\ No newline at end of file